@@ -31,10 +31,17 @@ def init_session_state():
         st.session_state.file_info = {}
     if "retriever" not in st.session_state:
         st.session_state.retriever = None
+    if "corpus" not in st.session_state:
+        st.session_state.corpus = None
     if "conversation" not in st.session_state:
         st.session_state.conversation = None
     if "token_usage" not in st.session_state:
         st.session_state.token_usage = {"total_tokens": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    if "response_cache_enabled" not in st.session_state:
+        st.session_state.response_cache_enabled = True
+    if "response_cache_threshold" not in st.session_state:
+        from config import RESPONSE_CACHE_THRESHOLD
+        st.session_state.response_cache_threshold = RESPONSE_CACHE_THRESHOLD
     if "api_keys" not in st.session_state:
         st.session_state.api_keys = {
             "openai": None,
@@ -0,0 +1,97 @@
+# Benchmark TokenTextSplitter vs RecursiveCharacterTextSplitter
+#
+# Contoh:
+#   python benchmarks/bench_text_splitter.py --size-mb 50 --baseline-size-mb 5
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+VOCABULARY = (
+    "pendapatan laba bersih kuartal perusahaan meningkat menurun risiko strategi ekspansi "
+    "pasar pelanggan produk margin biaya operasional investasi dividen aset liabilitas "
+    "INV-2023-0042 SKU-1234 Rp 1.250.000 15,3% tahun fiskal 2023 revenue growth EBITDA"
+).split()
+
+def generate_text(size_mb, seed=0):
+    """Teks bisnis sintetis: paragraf, baris header/tabel, dan kalimat"""
+    rng = random.Random(seed)
+    paragraphs = []
+    size = 0
+    while size < size_mb * 1024 * 1024:
+        sentences = [" ".join(rng.choices(VOCABULARY, k=rng.randint(5, 30))) + "."
+                     for _ in range(rng.randint(1, 8))]
+        paragraph = " ".join(sentences)
+        if rng.random() < 0.2:
+            paragraph = "LAPORAN KEUANGAN - HALAMAN {}\n".format(len(paragraphs)) + paragraph
+        if rng.random() < 0.1:
+            paragraph += "\n" + "\n".join(" | ".join(rng.choices(VOCABULARY, k=6)) for _ in range(5))
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+def token_stats(chunks):
+    from utils.embedding_pipeline import count_tokens
+
+    sample = chunks[:20000]
+    tokens = [count_tokens(chunk) for chunk in sample]
+    return {
+        "min": min(tokens),
+        "mean": round(statistics.mean(tokens), 1),
+        "max": max(tokens),
+        "stdev": round(statistics.pstdev(tokens), 1)
+    }
+
+def run(name, splitter, text):
+    start = time.perf_counter()
+    chunks = splitter.split_text(text)
+    elapsed = time.perf_counter() - start
+    size_mb = len(text) / (1024 * 1024)
+    print(f"{name:<34} {size_mb:6.1f} MB {elapsed:8.2f} s {size_mb / elapsed:8.2f} MB/s "
+          f"{len(chunks):>9} chunks  token/chunk {token_stats(chunks)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TokenTextSplitter vs RecursiveCharacterTextSplitter")
+    parser.add_argument("--size-mb", type=float, default=50, help="Ukuran teks untuk TokenTextSplitter")
+    parser.add_argument("--baseline-size-mb", type=float, default=5,
+                        help="Ukuran teks untuk RecursiveCharacterTextSplitter (0 untuk melewati)")
+    parser.add_argument("--chunk-tokens", type=int, default=128)
+    parser.add_argument("--overlap-tokens", type=int, default=12)
+    args = parser.parse_args()
+
+    from utils.embedding_pipeline import get_token_encoding
+    from utils.text_splitter import TokenTextSplitter
+
+    if get_token_encoding() is None:
+        print("Peringatan: tiktoken tidak tersedia, jumlah token diperkirakan 4 karakter/token")
+
+    text = generate_text(args.size_mb)
+    run("TokenTextSplitter", TokenTextSplitter(args.chunk_tokens, args.overlap_tokens), text)
+
+    if args.baseline_size_mb:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+        # Ukuran karakter setara (~4 karakter per token), seperti konfigurasi lama 500/50
+        baseline = RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_tokens * 4,
+            chunk_overlap=args.overlap_tokens * 4,
+            separators=["\n\n", "\n", ".", " ", ""]
+        )
+        run("RecursiveCharacterTextSplitter", baseline, text[:int(args.baseline_size_mb * 1024 * 1024)])
+
+        # Splitter rekursif dengan panjang diukur dalam token (setara from_tiktoken_encoder)
+        from utils.embedding_pipeline import count_tokens
+        token_baseline = RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_tokens,
+            chunk_overlap=args.overlap_tokens,
+            length_function=count_tokens,
+            separators=["\n\n", "\n", ".", " ", ""]
+        )
+        run("RecursiveCharacterTextSplitter+tok", token_baseline, text[:int(args.baseline_size_mb * 1024 * 1024) // 5])
+
+if __name__ == "__main__":
+    main()
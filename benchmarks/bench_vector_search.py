@@ -0,0 +1,56 @@
+# Benchmark latensi pencarian vektor: satu indeks vs ShardedIndex (paralel per shard)
+#
+# Contoh:
+#   python benchmarks/bench_vector_search.py --sizes 500000 2000000 4000000 --dim 128 --shard-size 500000
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def measure(index, queries, k):
+    """Latensi per query (ms) untuk query satu per satu, seperti retriever"""
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark satu indeks FAISS vs ShardedIndex")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500000, 1000000, 2000000])
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--shard-size", type=int, default=500000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--compression", default="float16")
+    args = parser.parse_args()
+
+    import utils.vector_index as vector_index
+
+    vector_index.SHARD_SIZE = args.shard_size
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+    print(f"Thread pencarian shard: {vector_index.SEARCH_THREADS}")
+
+    for size in args.sizes:
+        vectors = rng.standard_normal((size, args.dim), dtype=np.float32)
+        for allow_shards in (False, True):
+            params = vector_index.choose_index_params(size, args.dim, args.compression, allow_shards=allow_shards)
+            start = time.perf_counter()
+            index = vector_index.build_faiss_index(vectors, params)
+            build_time = time.perf_counter() - start
+            median, p95 = measure(index, queries, args.k)
+            print(f"{size:>9} vektor  {params['factory']:<28} build {build_time:7.1f} s  "
+                  f"p50 {median:7.2f} ms  p95 {p95:7.2f} ms")
+            del index
+        del vectors
+
+if __name__ == "__main__":
+    main()
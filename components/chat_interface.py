@@ -9,6 +9,9 @@ from langchain.callbacks import get_openai_callback
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Kata kunci permintaan pencarian web (jawabannya bergantung waktu sehingga tidak di-cache)
+WEB_SEARCH_KEYWORDS = ["cari di internet", "search online", "cari online"]
+
 def format_response(text: str) -> str:
     """Memformat respons untuk tampilan yang lebih baik"""
     # Pastikan heading memiliki spasi setelah tanda #
@@ -56,11 +59,191 @@ def build_prompt_with_history(query: str, history: list = None, max_history: int
     
     return prompt
 
-def process_query(query: str):
-    """Memproses kueri dan menangani output."""
+def invoke_llm(prompt: str, on_token=None):
+    """
+    Menjalankan LLM sesi untuk satu prompt
+    
+    Args:
+        prompt: Prompt lengkap
+        on_token: Fungsi opsional yang dipanggil dengan teks jawaban sejauh ini
+            setiap kali token baru datang (streaming)
+    """
+    llm = st.session_state.llm
+    if not on_token:
+        return llm.invoke(prompt)
+    
+    from utils.streaming import TokenStreamHandler, stream_kwargs
+    
+    handler = TokenStreamHandler(on_token)
+    result = llm.invoke(prompt, config={"callbacks": [handler]}, **stream_kwargs(llm))
+    handler.flush()
+    return result
+
+def answer_from_summaries(query: str, on_token=None):
+    """
+    Menjawab pertanyaan tentang keseluruhan dokumen dari pohon ringkasan
+    
+    Ringkasan dokumen dan bagian dihitung di background, sehingga jawaban cukup
+    dengan satu panggilan LLM, bukan hanya dari beberapa chunk hasil retrieval.
+    Pohon dijadwalkan pada pertanyaan seluruh dokumen pertama; sampai selesai,
+    pertanyaan dijawab dari retrieval biasa.
+    
+    Args:
+        query: Pertanyaan pengguna
+        on_token: Fungsi opsional untuk menampilkan jawaban secara bertahap
+    
+    Returns:
+        Tuple (respons, []) atau None jika bukan pertanyaan seluruh dokumen atau
+        ringkasan belum tersedia untuk semua file
+    """
+    from utils.summary_tree import build_summary_context, get_or_schedule_summary_trees, is_whole_document_question
+    
+    corpus = st.session_state.get("corpus")
+    if not corpus or not len(corpus) or not is_whole_document_question(query):
+        return None
+    
+    trees = get_or_schedule_summary_trees(corpus.files, st.session_state.get("llm"))
+    if trees is None:
+        return None
+    
+    logger.info(f"Menjawab dari pohon ringkasan {len(trees)} dokumen")
+    prompt = f"""
+    Kamu adalah AI Business Consultant Pro yang profesional dan membantu.
+    
+    Berikut ringkasan dokumen yang diunggah pengguna (ringkasan keseluruhan dan per bagian):
+    
+    {build_summary_context(trees)}
+    
+    Pertanyaan pengguna: {query}
+    
+    Jawab berdasarkan ringkasan di atas secara komprehensif dan terstruktur.
+    Sebutkan bagian atau halaman yang relevan jika tersedia.
+    Format respons menggunakan Markdown untuk meningkatkan keterbacaan.
+    """
+    
+    with get_openai_callback() as cb:
+        result = invoke_llm(prompt, on_token)
+        
+        # Update token usage
+        if "token_usage" not in st.session_state:
+            st.session_state.token_usage = {"total_tokens": 0, "prompt_tokens": 0, "completion_tokens": 0}
+            
+        st.session_state.token_usage["prompt_tokens"] += cb.prompt_tokens
+        st.session_state.token_usage["completion_tokens"] += cb.completion_tokens
+        st.session_state.token_usage["total_tokens"] += cb.total_tokens
+    
+    response = format_response(result.content if hasattr(result, 'content') else str(result))
+    response += "\n\n**Sumber:** ringkasan dokumen\n"
+    for tree in trees:
+        response += f"- {tree['filename']}\n"
+    return response, []
+
+def is_web_search_query(query: str) -> bool:
+    """Cek apakah pengguna meminta pencarian web"""
+    return any(keyword in query.lower() for keyword in WEB_SEARCH_KEYWORDS)
+
+def get_response_cache_context(query: str):
+    """
+    Lingkup dan fungsi embedding untuk cache jawaban semantik
+    
+    Pertanyaan tentang dokumen di-embed dengan model embedding korpus (vektornya
+    ikut di-cache sehingga dipakai ulang oleh retriever), sedangkan chat tanpa
+    dokumen memakai embedding lokal. Lingkup memuat kunci indeks tiap file
+    (parameter chunking), mode RAG, seluruh riwayat sesi ini, dan untuk
+    pertanyaan seluruh dokumen, file yang pohon ringkasannya sudah tersedia.
+    
+    Returns:
+        Tuple (scope, embed)
+    """
+    from config import RAG_MODE
+    from utils.embedding_cache import get_embedding_model_name
+    from utils.response_cache import build_scope, get_local_embeddings
+    from utils.summary_tree import get_summary_tree, is_whole_document_question
+    
+    corpus = st.session_state.get("corpus")
+    file_processed = st.session_state.get("file_processed", False)
+    if file_processed and corpus is not None and len(corpus):
+        document_keys = [entry["info"].get("store_key") or file_hash for file_hash, entry in corpus.files.items()]
+        embeddings = corpus.embeddings
+        embed = lambda text: corpus.retrieval_cache.embed_query(text, embeddings)
+    else:
+        store_key = st.session_state.get("file_info", {}).get("store_key") if file_processed else None
+        document_keys = [store_key] if store_key else []
+        embeddings = get_local_embeddings()
+        embed = embeddings.embed_query
+    
+    # Pertanyaan saat ini sudah ditambahkan ke riwayat sebelum diproses
+    history = list(st.session_state.get("history", []))
+    if history and tuple(history[-1]) == ("user", query):
+        history = history[:-1]
+    
+    # Jawaban pertanyaan seluruh dokumen berubah setelah pohon ringkasan selesai dibangun
+    summary_keys = []
+    if document_keys and is_whole_document_question(query):
+        summary_keys = [key for key in document_keys if get_summary_tree(key) is not None]
+    
+    scope = build_scope(
+        document_keys,
+        st.session_state.get("current_provider", "openai"),
+        st.session_state.get("current_model"),
+        get_embedding_model_name(embeddings),
+        history,
+        st.session_state.get("rag_mode", RAG_MODE) if document_keys else None,
+        summary_keys
+    )
+    return scope, embed
+
+def process_query(query: str, on_token=None):
+    """
+    Memproses kueri dan menangani output.
+    
+    Pertanyaan yang cukup mirip dengan pertanyaan sebelumnya untuk dokumen, model,
+    dan konteks percakapan yang sama dijawab dari cache jawaban semantik tanpa
+    memanggil LLM.
+    
+    Args:
+        query: Pertanyaan pengguna
+        on_token: Fungsi opsional yang dipanggil dengan teks jawaban sejauh ini
+            selama LLM mengirim token (chat biasa, RAG, dan ringkasan dokumen)
+    
+    Returns:
+        Tuple (respons lengkap beserta sumber, source_docs) setelah stream selesai
+    """
+    if (is_web_search_query(query) or not st.session_state.get("llm")
+            or not st.session_state.get("response_cache_enabled", True)):
+        return generate_response(query, on_token)
+    
+    from config import RESPONSE_CACHE_THRESHOLD
+    from utils.response_cache import get_response_cache
+    
+    cache = get_response_cache()
+    try:
+        scope, embed = get_response_cache_context(query)
+        cached = cache.lookup(scope, query, embed,
+                              st.session_state.get("response_cache_threshold", RESPONSE_CACHE_THRESHOLD))
+    except Exception as e:
+        logger.error(f"Error membaca cache jawaban: {str(e)}")
+        return generate_response(query, on_token)
+    
+    if cached:
+        (response, source_docs), similarity = cached
+        logger.info(f"Jawaban dari cache (similarity {similarity:.3f})")
+        return response, source_docs
+    
+    response, source_docs = generate_response(query, on_token)
+    # Pesan error tidak disimpan agar pertanyaan yang sama dicoba ulang
+    if not response.startswith("⚠️"):
+        try:
+            cache.store(scope, query, (response, source_docs), embed)
+        except Exception as e:
+            logger.error(f"Error menyimpan cache jawaban: {str(e)}")
+    return response, source_docs
+
+def generate_response(query: str, on_token=None):
+    """Menghasilkan jawaban dengan LLM (pencarian web, ringkasan dokumen, RAG, atau chat biasa)."""
     try:
         # Deteksi jika ada permintaan pencarian web
-        if any(keyword in query.lower() for keyword in ["cari di internet", "search online", "cari online"]):
+        if is_web_search_query(query):
             try:
                 from utils.web_search import search_and_summarize
                 return search_and_summarize(query), []
@@ -68,6 +251,15 @@ def process_query(query: str):
                 logger.error(f"Error pada pencarian web: {str(e)}")
                 return f"⚠️ Gagal melakukan pencarian web: {str(e)}", []
         
+        # Pertanyaan tentang keseluruhan dokumen dijawab dari pohon ringkasan (jika sudah dibangun)
+        if st.session_state.get("file_processed", False) and st.session_state.get("llm"):
+            try:
+                summary_answer = answer_from_summaries(query, on_token)
+                if summary_answer:
+                    return summary_answer
+            except Exception as e:
+                logger.error(f"Error menjawab dari ringkasan dokumen: {str(e)}")
+        
         # Jika ada file yang diproses, gunakan ConversationalRetrievalChain
         if st.session_state.get("file_processed", False) and st.session_state.get("conversation"):
             try:
@@ -75,11 +267,19 @@ def process_query(query: str):
                     # Log untuk debugging
                     logger.info("Menggunakan ConversationalRetrievalChain dengan RAG")
                     
+                    # Token jawaban dikirim bertahap lewat callback (lihat init_chain)
+                    handler = None
+                    if on_token:
+                        from utils.streaming import TokenStreamHandler
+                        handler = TokenStreamHandler(on_token)
+                    
                     # Kirim pertanyaan dengan konteks
                     result = st.session_state.conversation({
                         "question": query, 
                         "chat_history": [(h[0], h[1]) for h in st.session_state.get("history", [])][-10:] if st.session_state.get("history") else []
-                    })
+                    }, callbacks=[handler] if handler else None)
+                    if handler:
+                        handler.flush()
                     
                     # Update token usage
                     if "token_usage" not in st.session_state:
@@ -128,7 +328,7 @@ def process_query(query: str):
                 logger.info(f"Menggunakan LLM langsung dengan {len(history)} riwayat chat")
                 
                 # Jalankan LLM
-                result = st.session_state.llm.invoke(prompt)
+                result = invoke_llm(prompt, on_token)
                 
                 # Update token usage
                 if "token_usage" not in st.session_state:
@@ -192,15 +392,20 @@ def render_chat_interface():
                 
             st.session_state.history.append(("user", user_input))
             
-            # Proses pertanyaan
-            with st.spinner("🧠 AI sedang menganalisis..."):
-                response, source_docs = process_query(user_input)
+            # Proses pertanyaan, token jawaban ditampilkan bertahap di pesan asisten
+            with st.chat_message("assistant"):
+                placeholder = st.empty()
+                placeholder.markdown("🧠 _AI sedang menganalisis..._")
+                response, source_docs = process_query(
+                    user_input,
+                    on_token=lambda text: placeholder.markdown(format_response(text) + " ▌")
+                )
                 
                 # Tambahkan respons ke history
                 st.session_state.history.append(("assistant", response))
                 
-                # Tampilkan respons
-                with st.chat_message("assistant"):
+                # Respons lengkap (dengan sumber) menggantikan teks sementara
+                with placeholder.container():
                     st.markdown(response)
                     
                     # Add Text-to-Speech option
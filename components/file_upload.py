@@ -3,7 +3,6 @@ import logging
 import os
 from langchain.chains import ConversationalRetrievalChain
 from langchain.prompts import PromptTemplate
-from utils.file_processing import process_file, get_secure_temp_file
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +42,20 @@ def init_chain(retriever):
     )
 
     try:
+        from config import RAG_MODE
+        from utils.streaming import stream_kwargs
+        
+        # Mode satu panggilan: chunk dan riwayat dikemas dalam anggaran token, tanpa panggilan perumusan ulang
+        if st.session_state.get("rag_mode", RAG_MODE) == "single":
+            from utils.rag_chain import BudgetedRAGChain
+            logger.info("Menginisialisasi RAG satu panggilan dengan retriever")
+            return BudgetedRAGChain(
+                llm=st.session_state.llm,
+                retriever=retriever,
+                prompt=prompt,
+                llm_kwargs=stream_kwargs(st.session_state.llm)
+            )
+        
         # Log untuk debugging
         logger.info("Menginisialisasi ConversationalRetrievalChain dengan retriever")
         
@@ -55,6 +68,9 @@ def init_chain(retriever):
             return_source_documents=True,
             verbose=True
         )
+        
+        # Hanya langkah jawaban akhir yang di-stream ke UI (bukan perumusan ulang pertanyaan)
+        chain.combine_docs_chain.llm_chain.llm_kwargs = stream_kwargs(st.session_state.llm)
 
         # Log sukses
         logger.info("ConversationalRetrievalChain berhasil diinisialisasi")
@@ -65,58 +81,335 @@ def init_chain(retriever):
         st.error(f"❌ Gagal menginisialisasi chain: {str(e)}")
         return None
 
+def refresh_corpus_chain(new_conversation=False):
+    """Perbarui retriever, chain, dan file_info setelah korpus berubah"""
+    corpus = st.session_state.get("corpus")
+    st.session_state.retriever = corpus.as_retriever() if corpus else None
+    
+    if not st.session_state.retriever:
+        st.session_state.file_processed = False
+        st.session_state.file_info = {}
+        st.session_state.conversation = None
+        return True
+    
+    st.session_state.file_processed = True
+    st.session_state.file_info = corpus.summary()
+    
+    if new_conversation:
+        # Reset memory untuk percakapan baru dengan dokumen
+        from utils.llm_providers import init_memory
+        st.session_state.memory = init_memory(st.session_state.llm)
+        st.session_state.history = []
+    
+    # Initialize conversation chain
+    st.session_state.conversation = init_chain(st.session_state.retriever)
+    return st.session_state.conversation is not None
+
+def get_or_create_corpus(embedding_backend=None):
+    """
+    Korpus sesi ini; dibuat baru jika belum ada atau masih kosong
+    
+    Args:
+        embedding_backend: Backend embedding (default: pilihan di pengaturan)
+        
+    Returns:
+        DocumentCorpus, atau None jika embedding gagal diinisialisasi
+    """
+    from utils.embeddings import get_default_embedding_backend
+    from utils.file_processing import get_embeddings, get_openai_api_key
+    
+    corpus = st.session_state.get("corpus")
+    if corpus is not None and len(corpus):
+        return corpus
+    
+    backend = embedding_backend or st.session_state.get("embedding_backend") or get_default_embedding_backend(get_openai_api_key())
+    if corpus is not None and corpus.embedding_backend == backend:
+        return corpus
+    
+    from utils.corpus import DocumentCorpus
+    try:
+        corpus = st.session_state.corpus = DocumentCorpus(
+            get_embeddings(backend),
+            embedding_backend=backend,
+            vector_compression=st.session_state.get("vector_compression", "float16")
+        )
+    except Exception as e:
+        logger.error(f"Error inisialisasi embedding: {str(e)}")
+        st.error(f"❌ Gagal menginisialisasi embedding: {str(e)}")
+        return None
+    return corpus
+
+def collect_ingestion_jobs(session_id):
+    """
+    Menggabungkan hasil job ingestion yang sudah selesai ke korpus sesi
+    
+    Returns:
+        True jika ada job yang diambil (UI perlu dirender ulang)
+    """
+    from utils.ingestion_jobs import get_job_manager
+    
+    jobs = get_job_manager().collect(session_id)
+    if not jobs:
+        return False
+    
+    notices = st.session_state.setdefault("ingestion_notices", [])
+    using_partial = st.session_state.get("file_info", {}).get("partial", False)
+    # Percakapan yang dimulai dengan indeks parsial dilanjutkan, tidak direset
+    was_empty = (not st.session_state.get("corpus") or len(st.session_state.corpus) == 0) and not using_partial
+    added = 0
+    
+    for job in jobs:
+        if job.status == "failed":
+            notices.append(("error", f"❌ Gagal memproses {job.filename}: {job.error}"))
+            continue
+        if job.status != "done":
+            continue
+        
+        corpus = get_or_create_corpus(job.embedding_backend)
+        if corpus is None:
+            notices.append(("error", f"❌ Gagal menambahkan {job.filename}: embedding tidak dapat diinisialisasi"))
+            continue
+        if corpus.embedding_backend != job.embedding_backend:
+            notices.append(("error", f"❌ {job.filename} diproses dengan embedding berbeda dari korpus, silakan proses ulang"))
+            continue
+        try:
+            corpus.add_built_file(job.file_hash, *job.result)
+            added += 1
+        except Exception as e:
+            logger.error(f"Error menambahkan {job.filename} ke korpus: {str(e)}")
+            notices.append(("error", f"❌ Gagal menambahkan {job.filename}: {str(e)}"))
+    
+    if added:
+        if refresh_corpus_chain(new_conversation=was_empty):
+            notices.append(("success", f"✅ {added} dokumen berhasil diproses dan siap digunakan untuk konsultasi!"))
+        else:
+            notices.append(("error", "❌ Gagal menginisialisasi conversation chain. Coba lagi atau periksa API key."))
+    elif using_partial:
+        # Job yang indeks parsialnya dipakai gagal/dibatalkan: kembali ke korpus (atau tanpa dokumen)
+        refresh_corpus_chain()
+    return True
+
+def use_partial_index(session_id):
+    """
+    Memakai indeks parsial job yang sedang berjalan selama korpus sesi masih kosong
+    
+    Halaman awal dokumen besar sudah bisa ditanyakan sebelum seluruh file selesai
+    diproses; retriever diganti setiap job menerbitkan snapshot yang lebih besar.
+    
+    Returns:
+        True jika retriever sesi diganti (UI perlu dirender ulang)
+    """
+    from utils.ingestion_jobs import get_job_manager
+    
+    corpus = st.session_state.get("corpus")
+    if corpus is not None and len(corpus):
+        return False
+    
+    snapshots = [(job, job.partial) for job in get_job_manager().jobs_for_session(session_id)
+                 if job.partial is not None and not job.finished]
+    if not snapshots:
+        return False
+    job, (vectorstore, chunk_count) = max(snapshots, key=lambda snapshot: snapshot[1][1])
+    
+    # Kunci unik per snapshot agar cache jawaban tidak tercampur dengan indeks lengkap
+    store_key = f"partial-{job.job_id}-{chunk_count}"
+    file_info = st.session_state.get("file_info") or {}
+    if file_info.get("store_key") == store_key:
+        return False
+    
+    if not st.session_state.get("file_processed", False):
+        from utils.llm_providers import init_memory
+        st.session_state.memory = init_memory(st.session_state.llm)
+        st.session_state.history = []
+    
+    st.session_state.retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 5})
+    st.session_state.file_processed = True
+    st.session_state.file_info = {
+        "filename": f"{job.filename} (sebagian, {chunk_count} chunks)",
+        "chunk_count": chunk_count,
+        "store_key": store_key,
+        "partial": True
+    }
+    st.session_state.conversation = init_chain(st.session_state.retriever)
+    return True
+
+def render_ingestion_jobs(session_id):
+    """Panel progres job ingestion; di-poll tiap detik selama masih ada job sesi ini"""
+    from utils.ingestion_jobs import JOB_STATUSES, get_job_manager
+    
+    manager = get_job_manager()
+    for kind, message in st.session_state.pop("ingestion_notices", []):
+        getattr(st, kind)(message)
+    
+    def jobs_panel():
+        # Hasil digabung di thread script; rerun seluruh app agar chat memakai korpus baru
+        if collect_ingestion_jobs(session_id) or use_partial_index(session_id):
+            st.rerun()
+        
+        for job in manager.jobs_for_session(session_id):
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                progress_text = f"{JOB_STATUSES[job.status]} **{job.filename}**"
+                if job.total:
+                    progress_text += f": halaman/baris {job.done}/{job.total}"
+                st.progress(job.progress, text=progress_text)
+            with col2:
+                if not job.finished and st.button("✖️ Batal", key=f"cancel_{job.job_id}"):
+                    manager.cancel(job.job_id)
+    
+    run_every = 1.0 if manager.jobs_for_session(session_id) else None
+    st.fragment(jobs_panel, run_every=run_every)()
+
 def render_file_upload():
     """Render file upload UI"""
     st.subheader("📂 Unggah Dokumen")
     
-    uploaded_file = st.file_uploader(
-        "📎 Unggah file (PDF, TXT, CSV) untuk analisis AI", 
-        type=["pdf", "txt", "csv"],
-        accept_multiple_files=False,
-        help="Unggah dokumen untuk dianalisis oleh AI. Dokumen akan dipecah dan diubah menjadi basis pengetahuan."
+    uploaded_files = st.file_uploader(
+        "📎 Unggah file (PDF, TXT, CSV, Excel, Word, HTML) untuk analisis AI", 
+        type=["pdf", "txt", "csv", "xlsx", "xlsm", "docx", "html", "htm"],
+        accept_multiple_files=True,
+        help="Unggah satu atau beberapa dokumen untuk dianalisis oleh AI. Dokumen akan dipecah dan ditambahkan ke basis pengetahuan."
     )
     
+    # Pengaturan pemrosesan dokumen
+    with st.expander("⚙️ Pengaturan Pemrosesan", expanded=False):
+        from utils.embeddings import EMBEDDING_BACKENDS, get_default_embedding_backend
+        from utils.file_processing import get_openai_api_key
+        from utils.pdf_extraction import PDF_BACKENDS
+        
+        # Backend embedding ditetapkan per korpus
+        corpus = st.session_state.get("corpus")
+        if corpus and len(corpus):
+            st.caption(f"🧬 Embedding korpus: **{EMBEDDING_BACKENDS.get(corpus.embedding_backend, corpus.embedding_backend)}** "
+                       "(hapus semua file untuk mengganti)")
+        else:
+            if "embedding_backend" not in st.session_state:
+                st.session_state.embedding_backend = get_default_embedding_backend(get_openai_api_key())
+            st.selectbox(
+                "🧬 Backend embedding:",
+                options=list(EMBEDDING_BACKENDS.keys()),
+                format_func=lambda x: EMBEDDING_BACKENDS[x],
+                key="embedding_backend",
+                help="Embedding lokal berjalan di CPU tanpa jaringan dan tanpa biaya; OpenAI memberikan kualitas semantik lebih baik."
+            )
+            from utils.vector_index import VECTOR_COMPRESSION
+            st.selectbox(
+                "🗜️ Kompresi vektor (korpus besar):",
+                options=list(VECTOR_COMPRESSION.keys()),
+                format_func=lambda x: VECTOR_COMPRESSION[x],
+                key="vector_compression",
+                help="Korpus kecil memakai indeks exact (Flat). Mulai 20 ribu chunk dipakai indeks IVF dengan kompresi ini, dan mulai 200 ribu chunk IVF-PQ."
+            )
+        st.selectbox(
+            "📄 Backend ekstraksi PDF:",
+            options=list(PDF_BACKENDS.keys()),
+            format_func=lambda x: PDF_BACKENDS[x],
+            key="pdf_backend",
+            help="PyMuPDF mengekstrak halaman secara paralel di semua core CPU dan jauh lebih cepat untuk PDF besar."
+        )
+        st.selectbox(
+            "📊 Mode CSV:",
+            options=["grouped", "row"],
+            format_func=lambda x: {"grouped": "Blok baris (hemat embedding)", "row": "Satu dokumen per baris"}[x],
+            key="csv_mode",
+            help="Mode blok menggabungkan beberapa baris beserta nama kolomnya menjadi satu chunk."
+        )
+        st.checkbox(
+            "📋 Tambahkan ringkasan per kolom (CSV)",
+            key="csv_column_summaries",
+            help="Statistik tiap kolom (total, rata-rata, nilai terbanyak) ditambahkan sebagai dokumen tersendiri."
+        )
+        from config import PDF_TABLE_EXTRACTION
+        st.checkbox(
+            "🧮 Ekstrak tabel PDF",
+            value=PDF_TABLE_EXTRACTION,
+            key="extract_pdf_tables",
+            help="Tabel di setiap halaman PDF dideteksi dan disimpan sebagai DataFrame untuk perhitungan angka yang pasti. "
+                 "Menambah waktu proses PDF besar secara signifikan."
+        )
+        st.checkbox(
+            "🧹 Buang chunk duplikat (header, footer, disclaimer)",
+            value=True,
+            key="deduplicate_chunks",
+            help="Chunk yang hampir identik hanya di-embed sekali; halaman sumbernya tetap dicatat."
+        )
+        from config import SUMMARY_TREE_ENABLED
+        if SUMMARY_TREE_ENABLED:
+            st.checkbox(
+                "🧾 Bangun ringkasan dokumen saat upload",
+                key="build_summary_tree",
+                help="Ringkasan per bagian dan ringkasan keseluruhan dibuat dengan LLM (beberapa panggilan per dokumen) "
+                     "sehingga pertanyaan seperti \"ringkas laporan ini\" dijawab dari seluruh dokumen dalam satu panggilan. "
+                     "Tanpa opsi ini ringkasan baru dibangun saat pertanyaan seluruh dokumen pertama."
+            )
+        
+        from config import RAG_MODE
+        from utils.rag_chain import RAG_MODES
+        if "rag_mode" not in st.session_state:
+            st.session_state.rag_mode = RAG_MODE
+        st.selectbox(
+            "🔗 Mode tanya jawab dokumen:",
+            options=list(RAG_MODES.keys()),
+            format_func=lambda x: RAG_MODES[x],
+            key="rag_mode",
+            on_change=refresh_corpus_chain,
+            help="Mode satu panggilan mengemas chunk dan riwayat percakapan dalam anggaran token dan hanya merumuskan ulang "
+                 "pertanyaan lanjutan, sehingga latensi dan token prompt per giliran jauh lebih kecil."
+        )
+    
+    # Hanya file yang belum ada di korpus dan belum sedang diproses yang perlu diproses
+    from utils.file_processing import get_file_hash
+    from utils.ingestion_jobs import get_job_manager
+    from utils.upload_store import get_upload_session_id
+    session_id = get_upload_session_id()
+    manager = get_job_manager()
+    pending_hashes = {job.file_hash for job in manager.jobs_for_session(session_id)}
+    corpus = st.session_state.get("corpus")
+    new_files = [f for f in uploaded_files or []
+                 if (not corpus or get_file_hash(f) not in corpus) and get_file_hash(f) not in pending_hashes]
+    
     col1, col2 = st.columns([1, 3])
     
     with col1:
-        process_button = st.button("✅ Proses File", type="primary", disabled=not uploaded_file)
+        process_button = st.button("✅ Proses File", type="primary", disabled=not new_files)
     
     with col2:
-        if uploaded_file:
-            st.write(f"File dipilih: **{uploaded_file.name}**")
-    
-    if process_button and uploaded_file:
-        # Proses file
-        with st.spinner("🔍 Menganalisis dokumen... Mohon tunggu"):
-            st.session_state.retriever = process_file(
-                uploaded_file,
-                chunk_size=st.session_state.get("chunk_size", 500),
-                chunk_overlap=st.session_state.get("chunk_overlap", 50)
-            )
+        if new_files:
+            st.write(f"File baru dipilih: **{', '.join(f.name for f in new_files)}**")
+    
+    if process_button and new_files:
+        corpus = get_or_create_corpus()
+        if corpus is not None:
+            from utils.file_processing import get_embeddings
             
-            if st.session_state.retriever:
-                st.session_state.file_processed = True
-                
-                # Reset memory untuk percakapan baru dengan dokumen
-                from utils.llm_providers import init_memory
-                st.session_state.memory = init_memory(st.session_state.llm)
-                
-                # Simpan informasi file
-                st.session_state.file_info = st.session_state.file_info or {}
-                st.session_state.file_info["filename"] = uploaded_file.name
-                
-                # Initialize conversation chain
-                st.session_state.conversation = init_chain(st.session_state.retriever)
-                
-                if st.session_state.conversation:
-                    st.success("✅ Dokumen berhasil diproses dan siap digunakan untuk konsultasi!")
-                    # Reset riwayat chat untuk memulai percakapan baru dengan dokumen
-                    st.session_state.history = []
-                else:
-                    st.error("❌ Gagal menginisialisasi conversation chain. Coba lagi atau periksa API key.")
+            # Tiap file diproses sebagai job background (paralel); chat tetap bisa dipakai
+            for uploaded_file in new_files:
+                try:
+                    manager.submit(
+                        session_id,
+                        uploaded_file,
+                        get_embeddings(corpus.embedding_backend),
+                        embedding_backend=corpus.embedding_backend,
+                        chunk_size=st.session_state.get("chunk_size", 128),
+                        chunk_overlap=st.session_state.get("chunk_overlap", 12),
+                        embedding_concurrency=st.session_state.get("embedding_concurrency", 4),
+                        pdf_backend=st.session_state.get("pdf_backend", "pymupdf"),
+                        csv_mode=st.session_state.get("csv_mode", "grouped"),
+                        csv_column_summaries=st.session_state.get("csv_column_summaries", False),
+                        deduplicate=st.session_state.get("deduplicate_chunks", True),
+                        extract_tables=st.session_state.get("extract_pdf_tables"),
+                        vector_compression=corpus.vector_compression,
+                        summary_llm=st.session_state.get("llm") if st.session_state.get("build_summary_tree") else None
+                    )
+                except Exception as e:
+                    logger.error(f"Error mendaftarkan file {uploaded_file.name}: {str(e)}")
+                    st.error(f"❌ Gagal memproses {uploaded_file.name}: {str(e)}")
+    
+    render_ingestion_jobs(session_id)
     
     # Tampilkan informasi file jika sudah diproses
-    if st.session_state.get("file_processed", False) and st.session_state.get("file_info"):
+    if (st.session_state.get("file_processed", False) and st.session_state.get("file_info")
+            and not st.session_state.file_info.get("partial")):
         st.subheader("📊 Informasi Dokumen")
         info = st.session_state.file_info
         
@@ -124,7 +417,7 @@ def render_file_upload():
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("📄 Nama File", info["filename"])
+            st.metric("📄 Jumlah File", info.get("file_count", 1))
             st.metric("📏 Ukuran", f"{info.get('size_mb', 'N/A')} MB")
         
         with col2:
@@ -135,19 +428,59 @@ def render_file_upload():
             st.metric("⏱️ Waktu Proses", f"{info.get('processing_time', 'N/A')} detik")
             estimated_queries = info.get("chunk_count", 10) * 2
             st.metric("🔍 Estimasi Kapasitas Query", f"~{estimated_queries} pertanyaan")
+        
+        # Statistik cache embedding
+        if info.get("loaded_from_store"):
+            st.caption("💾 Indeks dimuat dari penyimpanan (dokumen ini pernah diproses dengan pengaturan yang sama)")
+        elif "embedding_cache_hits" in info:
+            st.caption(
+                f"♻️ Cache embedding: {info['embedding_cache_hits']} hit, "
+                f"{info['embedding_cache_misses']} miss (hanya miss yang dikirim ke API embedding)"
+            )
+        if info.get("chunk_store_mb") is not None and info.get("chunk_count"):
+            st.caption(f"🗃️ Penyimpanan chunk: {info['chunk_store_mb']} MB untuk {info['chunk_count']} chunks")
+        if info.get("duplicate_chunks"):
+            st.caption(f"🧹 {info['duplicate_chunks']} chunk duplikat tidak di-embed ulang")
+        if info.get("index_params"):
+            index_params = info["index_params"]
+            st.caption(f"🗂️ Indeks vektor: {index_params.get('factory', index_params.get('type'))}"
+                       + (f" (nprobe={index_params['nprobe']})" if index_params.get("nprobe") else ""))
+        
+        # Daftar dokumen di korpus dengan tombol hapus
+        from utils.summary_tree import get_summary_status
+        summary_labels = {"queued": "⏳ ringkasan menunggu", "running": "⚙️ ringkasan diproses",
+                          "done": "🧾 ringkasan siap", "failed": "❌ ringkasan gagal"}
+        for file_hash, file_info in list(info.get("files", {}).items()):
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                summary_status = summary_labels.get(get_summary_status(file_info.get("store_key")))
+                st.write(f"📄 **{file_info['filename']}** — {file_info.get('chunk_count', 0)} chunks"
+                         + (f" — {summary_status}" if summary_status else ""))
+            with col2:
+                if st.button("🗑️ Hapus", key=f"remove_{file_hash}"):
+                    st.session_state.corpus.remove_file(file_hash)
+                    refresh_corpus_chain()
+                    st.rerun()
             
         st.info("💡 Dokumen Anda telah dikonversi menjadi basis pengetahuan AI. Anda sekarang dapat mengajukan pertanyaan tentang isinya di tab Chat.")
 
-        # Visualisasi jika file adalah CSV
-        if info["filename"].lower().endswith('.csv') and uploaded_file is not None:
-            import pandas as pd
+        # Visualisasi jika ada file CSV
+        processed_hashes = info.get("files", {})
+        csv_files = [f for f in uploaded_files or []
+                     if f.name.lower().endswith('.csv') and get_file_hash(f) in processed_hashes]
+        if csv_files:
+            from utils.file_processing import load_csv_dataframe
             from utils.visualization import create_visualization
             
             st.subheader("📈 Visualisasi Data")
             
+            csv_names = [f.name for f in csv_files]
+            selected_csv = st.selectbox("Pilih file CSV:", csv_names) if len(csv_files) > 1 else csv_names[0]
+            uploaded_file = csv_files[csv_names.index(selected_csv)]
+            
             try:
-                # Load CSV file
-                df = pd.read_csv(get_secure_temp_file(uploaded_file))
+                # Load CSV file (di-cache berdasarkan hash isi, tidak di-parse ulang tiap rerun)
+                df = load_csv_dataframe(uploaded_file)
                 
                 # Display data sample
                 st.write("Preview Data:")
@@ -157,3 +490,31 @@ def render_file_upload():
                 create_visualization(df)
             except Exception as e:
                 st.error(f"Gagal memvisualisasikan data: {str(e)}")
+        
+        # Tabel yang diekstrak dari PDF (total dan rasio dihitung langsung dari DataFrame)
+        pdf_tables = {}
+        for file_hash, file_info in processed_hashes.items():
+            if file_info.get("table_count"):
+                from utils.pdf_tables import load_pdf_tables
+                tables = load_pdf_tables(file_hash)
+                if tables:
+                    pdf_tables[file_info["filename"]] = tables
+        if pdf_tables:
+            from utils.pdf_tables import to_financial_frame
+            from utils.visualization import visualize_financial_data
+            
+            st.subheader("📑 Tabel dari PDF")
+            
+            pdf_names = list(pdf_tables)
+            selected_pdf = st.selectbox("Pilih file PDF:", pdf_names, key="pdf_table_file") if len(pdf_names) > 1 else pdf_names[0]
+            tables = pdf_tables[selected_pdf]
+            labels = [f"Halaman {table['page'] + 1} — tabel {table['table_index'] + 1}" for table in tables]
+            selected_table = st.selectbox("Pilih tabel:", range(len(tables)), format_func=labels.__getitem__,
+                                          key="pdf_table_index")
+            
+            try:
+                df = tables[min(selected_table, len(tables) - 1)]["df"]
+                st.dataframe(df)
+                visualize_financial_data(to_financial_frame(df))
+            except Exception as e:
+                st.error(f"Gagal memvisualisasikan tabel: {str(e)}")
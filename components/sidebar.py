@@ -84,6 +84,29 @@ def render_sidebar():
             total_cost = prompt_cost + completion_cost
             st.write(f"💰 **Estimasi Biaya:** ${total_cost:.4f}")
         
+        # Cache jawaban semantik (dipakai bersama semua sesi)
+        st.subheader("⚡ Cache Jawaban")
+        from utils.response_cache import get_response_cache
+        
+        st.toggle("Gunakan jawaban tersimpan untuk pertanyaan serupa", key="response_cache_enabled")
+        threshold = st.slider(
+            "Ambang kemiripan pertanyaan",
+            min_value=0.80,
+            max_value=1.00,
+            step=0.01,
+            key="response_cache_threshold",
+            help="Semakin rendah ambang, semakin banyak pertanyaan yang dijawab dari cache (lebih hemat, tetapi risiko jawaban kurang tepat lebih besar)."
+        )
+        cache_stats = get_response_cache().stats()
+        lookups = cache_stats["hits"] + cache_stats["misses"]
+        if lookups:
+            col1, col2 = st.columns(2)
+            col1.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+            col2.metric("Hit", f"{cache_stats['hits']:,} / {lookups:,}")
+            st.caption(f"Perkiraan hit rate pada ambang {threshold:.2f} untuk pertanyaan terakhir: "
+                       f"{get_response_cache().estimated_hit_rate(threshold):.0%} · "
+                       f"{cache_stats['entries']:,} jawaban tersimpan")
+        
         # Control Buttons
         st.subheader("🔄 Kontrol")
         col1, col2 = st.columns(2)
@@ -97,6 +120,8 @@ def render_sidebar():
         with col2:
             if st.button("🗑️ Clear Files", key="clear", use_container_width=True):
                 st.session_state.retriever = None
+                st.session_state.corpus = None
+                st.session_state.conversation = None
                 st.session_state.file_processed = False
                 st.session_state.file_info = {}
                 from utils.file_processing import cleanup_temp_files
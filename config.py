@@ -0,0 +1,71 @@
+# Konfigurasi global aplikasi
+import os
+from pathlib import Path
+
+# Direktori data persisten (cache embedding, indeks, upload, dll).
+# Default di direktori cache milik user (bukan /tmp yang bisa ditulis user lain); dibuat dengan mode 0700.
+APP_DATA_DIR = Path(os.getenv(
+    "AI_CONSULTANT_DATA_DIR",
+    Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "ai_business_consultant"
+))
+
+# Cache embedding berbasis konten
+EMBEDDING_CACHE_PATH = APP_DATA_DIR / "embedding_cache.sqlite3"
+# Batas ukuran cache embedding; jika terlewati, vektor yang paling lama tidak dipakai dibuang
+EMBEDDING_CACHE_MAX_MB = int(os.getenv("AI_CONSULTANT_EMBEDDING_CACHE_MAX_MB", "1024"))
+
+# Penyimpanan indeks FAISS persisten (dikunci dengan hash file + parameter)
+INDEX_STORE_DIR = APP_DATA_DIR / "indexes"
+# Batas memori indeks tersimpan yang dimuat dan dipakai bersama antar sesi (LRU, ukuran file di disk)
+LOADED_INDEX_CACHE_MB = int(os.getenv("AI_CONSULTANT_LOADED_INDEX_CACHE_MB", "1024"))
+
+# Tabel hasil ekstraksi PDF (DataFrame per halaman), disimpan di samping indeks
+TABLE_STORE_DIR = INDEX_STORE_DIR / "tables"
+# Ekstraksi tabel menjalankan deteksi tabel di setiap halaman PDF (lambat untuk PDF besar), jadi opt-in:
+# AI_CONSULTANT_PDF_TABLES=1 mengaktifkannya secara default, atau pilih per upload di sidebar
+PDF_TABLE_EXTRACTION = os.getenv("AI_CONSULTANT_PDF_TABLES", "0") == "1"
+
+# File upload sementara (per sesi, nama berdasarkan hash isi), di bawah APP_DATA_DIR dengan mode 0700.
+# "Clear Files" hanya menghapus subdirektori sesi, bukan cache embedding/indeks di APP_DATA_DIR.
+UPLOAD_DIR = APP_DATA_DIR / "uploads"
+# Kuota disk global untuk semua sesi; file yang paling lama tidak dipakai dihapus lebih dulu
+UPLOAD_QUOTA_MB = int(os.getenv("AI_CONSULTANT_UPLOAD_QUOTA_MB", "2048"))
+# File yang baru dipakai dalam rentang ini tidak dihapus (mungkin sedang diproses)
+UPLOAD_MIN_AGE_SECONDS = int(os.getenv("AI_CONSULTANT_UPLOAD_MIN_AGE_SECONDS", "900"))
+
+# Jumlah file yang diproses paralel di background (dipakai bersama semua sesi)
+INGESTION_WORKERS = int(os.getenv("AI_CONSULTANT_INGESTION_WORKERS", "2"))
+# Hasil job yang tidak pernah diambil (sesi ditutup) dibuang setelah rentang ini
+INGESTION_RESULT_TTL_SECONDS = int(os.getenv("AI_CONSULTANT_INGESTION_RESULT_TTL_SECONDS", "3600"))
+
+# Pohon ringkasan dokumen dibangun di background saat pertanyaan seluruh dokumen pertama ("ringkas laporan ini"),
+# bukan saat upload; 0 untuk menonaktifkan (pertanyaan seluruh dokumen dijawab dari retrieval biasa)
+SUMMARY_TREE_ENABLED = os.getenv("AI_CONSULTANT_SUMMARY_TREE", "1") != "0"
+# Jumlah pohon ringkasan (dan status job gagal) yang disimpan di memori proses; pohon lain dibaca ulang dari disk
+SUMMARY_TREE_CACHE_ENTRIES = int(os.getenv("AI_CONSULTANT_SUMMARY_TREE_CACHE_ENTRIES", "64"))
+# Jumlah dokumen yang diringkas bersamaan di background
+SUMMARY_WORKERS = int(os.getenv("AI_CONSULTANT_SUMMARY_WORKERS", "1"))
+# Batas panggilan LLM paralel per dokumen saat membangun ringkasan
+SUMMARY_LLM_CONCURRENCY = int(os.getenv("AI_CONSULTANT_SUMMARY_LLM_CONCURRENCY", "4"))
+
+# Cache jawaban semantik: ambang cosine similarity pertanyaan agar jawaban tersimpan dipakai ulang
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("AI_CONSULTANT_RESPONSE_CACHE_THRESHOLD", "0.95"))
+# Jumlah pertanyaan tersimpan per lingkup (set dokumen + model) dan jumlah lingkup dalam memori
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("AI_CONSULTANT_RESPONSE_CACHE_MAX_ENTRIES", "512"))
+RESPONSE_CACHE_MAX_SCOPES = int(os.getenv("AI_CONSULTANT_RESPONSE_CACHE_MAX_SCOPES", "256"))
+
+# Cache panggilan LLM dengan prompt persis sama (semua provider), memori + SQLite
+LLM_CACHE_ENABLED = os.getenv("AI_CONSULTANT_LLM_CACHE", "1") != "0"
+LLM_CACHE_PATH = APP_DATA_DIR / "llm_cache.sqlite3"
+# Entri yang lebih tua dari TTL tidak dipakai lagi; jika melewati batas ukuran, entri yang paling lama tidak dipakai dibuang
+LLM_CACHE_TTL_SECONDS = int(os.getenv("AI_CONSULTANT_LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+LLM_CACHE_MAX_MB = int(os.getenv("AI_CONSULTANT_LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("AI_CONSULTANT_LLM_CACHE_MEMORY_ENTRIES", "256"))
+
+# Mode RAG default: "conversational" (ConversationalRetrievalChain, perilaku awal) atau "single" (satu panggilan
+# LLM per giliran, opt-in lewat AI_CONSULTANT_RAG_MODE=single atau pilihan mode di sidebar). Mode "single" memotong
+# chunk dan riwayat sesuai anggaran token di bawah, sehingga jawabannya bisa berbeda dari mode conversational.
+RAG_MODE = os.getenv("AI_CONSULTANT_RAG_MODE", "conversational")
+# Anggaran token (tiktoken) untuk chunk hasil retrieval dan riwayat percakapan di prompt RAG
+RAG_CONTEXT_TOKENS = int(os.getenv("AI_CONSULTANT_RAG_CONTEXT_TOKENS", "1500"))
+RAG_HISTORY_TOKENS = int(os.getenv("AI_CONSULTANT_RAG_HISTORY_TOKENS", "600"))
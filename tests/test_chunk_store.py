@@ -0,0 +1,53 @@
+import pytest
+from langchain_core.documents import Document
+
+from utils.chunk_store import ColumnarDocstore, IdArray
+
+
+def _add(docstore, count, start=0):
+    ids = docstore.new_ids(count)
+    docstore.add({doc_id: Document(page_content=f"chunk {start + i}",
+                                   metadata={"source": "laporan.pdf", "page": start + i, "pages": [1, 2]})
+                  for i, doc_id in enumerate(ids)})
+    return ids
+
+
+def test_ids_are_integer_ranges():
+    docstore = ColumnarDocstore()
+    assert _add(docstore, 3) == range(0, 3)
+    assert _add(docstore, 2, start=3) == range(3, 5)
+    assert docstore.search(4) == Document(page_content="chunk 4",
+                                          metadata={"source": "laporan.pdf", "page": 4, "pages": [1, 2]})
+    # ID string lama ("4") tetap dikenali
+    assert docstore.search("4").page_content == "chunk 4"
+    with pytest.raises(ValueError):
+        docstore.add({7: Document(page_content="loncat")})
+
+
+def test_delete_and_compact_roundtrip():
+    docstore = ColumnarDocstore()
+    ids = _add(docstore, 3000)
+    docstore.delete(list(ids[:2500]))
+    # Lebih dari separuh terhapus: buffer dan kolom dipadatkan
+    assert len(docstore._alive) == 500
+    assert len(docstore) == 500
+    assert 10 not in docstore
+    assert docstore.search(10) == "ID 10 not found."
+    assert docstore.search(2999).metadata["page"] == 2999
+    assert docstore.get_text(2500) == "chunk 2500"
+
+    new_ids = _add(docstore, 2, start=3000)
+    assert new_ids == range(3000, 3002)
+    assert docstore.search(3001).page_content == "chunk 3001"
+
+
+def test_id_array_behaves_like_label_mapping():
+    ids = IdArray([10, 11, 12])
+    ids.update({3: 13, 4: 14})
+    assert len(ids) == 5 and ids[4] == 14 and ids.get(9) is None
+    assert list(ids.items()) == [(0, 10), (1, 11), (2, 12), (3, 13), (4, 14)]
+    with pytest.raises(ValueError):
+        ids.update({9: 99})
+
+    ids.compact(~ids.mask_of({11, 13}))
+    assert list(ids.values()) == [10, 12, 14]
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.documents import Document
+
+from utils.deduplication import ChunkDeduplicator
+
+
+class _Store:
+    """Vectorstore minimal: label FAISS -> id docstore"""
+
+    def __init__(self, docs):
+        ids = [str(i) for i in range(len(docs))]
+        self.docstore = InMemoryDocstore(dict(zip(ids, docs)))
+        self.index_to_docstore_id = dict(enumerate(ids))
+
+
+def _csv_rows(count):
+    return [
+        Document(page_content=f"tanggal: 2023-01-01\nproduk: SKU-1234\njumlah: {1000 + i}",
+                 metadata={"source": "penjualan.csv", "row": i})
+        for i in range(count)
+    ]
+
+
+def test_csv_rows_with_different_values_are_kept():
+    deduplicator = ChunkDeduplicator()
+    kept = list(deduplicator.filter(_csv_rows(200)))
+    assert len(kept) == 200
+    assert deduplicator.duplicate_count == 0
+
+
+def test_exact_duplicate_rows_are_recorded_with_row_refs():
+    rows = _csv_rows(3) + [Document(page_content=_csv_rows(1)[0].page_content,
+                                    metadata={"source": "penjualan.csv", "row": 7})]
+    deduplicator = ChunkDeduplicator()
+    kept = list(deduplicator.filter(rows))
+    assert [doc.metadata["row"] for doc in kept] == [0, 1, 2]
+
+    store = _Store(kept)
+    deduplicator.apply(store)
+    metadata = store.docstore.search("0").metadata
+    assert metadata["duplicate_count"] == 1
+    assert metadata["duplicate_refs"] == [{"source": "penjualan.csv", "row": 7}]
+    assert "pages" not in metadata
+
+
+def test_near_duplicate_text_chunks_are_merged_with_page_refs():
+    text = " ".join(f"kata{i}" for i in range(60))
+    docs = [
+        Document(page_content=text, metadata={"source": "laporan.pdf", "page": 1}),
+        Document(page_content=text + " tambahan", metadata={"source": "laporan.pdf", "page": 5}),
+        Document(page_content="isi yang sama sekali berbeda tentang risiko pasar",
+                 metadata={"source": "laporan.pdf", "page": 6}),
+    ]
+    deduplicator = ChunkDeduplicator()
+    kept = list(deduplicator.filter(docs))
+    assert len(kept) == 2
+
+    store = _Store(kept)
+    deduplicator.apply(store)
+    metadata = store.docstore.search("0").metadata
+    assert metadata["pages"] == [1, 5]
+    assert metadata["duplicate_refs"] == [{"source": "laporan.pdf", "page": 5}]
+
+
+def test_signature_is_stable_across_processes():
+    code = ("from utils.deduplication import ChunkDeduplicator; "
+            "print(ChunkDeduplicator()._signature('Laporan keuangan PT Contoh tahun 2023 halaman satu').tolist())")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = {
+        subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True,
+                       env={**os.environ, "PYTHONHASHSEED": seed}).stdout
+        for seed in ("1", "2")
+    }
+    assert len(outputs) == 1
+    assert outputs.pop().strip() == str(ChunkDeduplicator()._signature(
+        "Laporan keuangan PT Contoh tahun 2023 halaman satu").tolist())
@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+
+from utils.embedding_cache import CachedEmbeddings, EmbeddingStore, close_embedding_store, get_embedding_store
+
+
+class CountingEmbeddings:
+    model = "counting"
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        return [[float(len(text)), 1.0, 0.0, 0.0] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_instances_share_one_connection_per_path(tmp_path):
+    path = tmp_path / "cache.sqlite3"
+    backend = CountingEmbeddings()
+    first = CachedEmbeddings(backend, cache_path=path)
+    second = CachedEmbeddings(backend, cache_path=path)
+    assert first.store is second.store
+
+    first.embed_documents(["alpha", "beta"])
+    assert second.embed_documents(["alpha", "beta"]) == first.embed_documents(["alpha", "beta"])
+    assert backend.calls == 2
+    assert second.hits == 2 and second.misses == 0
+
+    # close() pada satu instance tidak menutup koneksi yang dipakai instance lain
+    first.close()
+    assert second.store is first.store
+    assert second.embed_documents(["beta"]) == [[4.0, 1.0, 0.0, 0.0]]
+
+    close_embedding_store(path)
+    # Koneksi dibuka ulang saat dipakai lagi
+    assert second.embed_documents(["alpha"]) == [[5.0, 1.0, 0.0, 0.0]]
+    assert backend.calls == 2
+    close_embedding_store(path)
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    # Muat tiga vektor (16 byte vektor + 3 byte kunci)
+    store = EmbeddingStore(tmp_path / "cache.sqlite3", max_bytes=3 * (16 + 3))
+    vector = np.ones(4, dtype=np.float32)
+    for key in ("k01", "k02", "k03"):
+        store.store([(key, vector)])
+    store.lookup(["k01"])
+    # Penulisan ke-21 memicu pengecekan ukuran: k02 dan k03 paling lama tidak dipakai
+    for i in range(4, 22):
+        store.store([(f"k{i:02d}", vector)])
+    remaining = set(store.lookup([f"k{i:02d}" for i in range(1, 22)]))
+    assert "k02" not in remaining and "k03" not in remaining
+    assert store.stats()["bytes"] <= store.max_bytes
+    store.close()
+
+
+def test_old_cache_schema_is_upgraded(tmp_path):
+    import sqlite3
+
+    path = tmp_path / "cache.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+    conn.execute("INSERT INTO embeddings VALUES (?, ?)", ("old", np.ones(4, dtype=np.float32).tobytes()))
+    conn.commit()
+    conn.close()
+
+    store = get_embedding_store(path)
+    assert store.stats() == {"entries": 1, "bytes": 19}
+    assert list(store.lookup(["old"])) == ["old"]
+    close_embedding_store(path)
+
+
+def test_concurrent_jobs_on_same_cache_path(tmp_path, monkeypatch):
+    import io
+
+    from utils import file_processing
+    from utils.ingestion_jobs import IngestionJobManager
+
+    path = tmp_path / "cache.sqlite3"
+    started = threading.Barrier(2)
+
+    def fake_build(uploaded_file, embeddings, progress_callback=None, **kwargs):
+        started.wait(timeout=10)
+        # Job kedua tetap embedding setelah job pertama selesai
+        rounds = 5 if uploaded_file.name == "a.txt" else 200
+        for i in range(rounds):
+            embeddings.embed_documents([f"{uploaded_file.name} chunk {i}-{j}" for j in range(20)])
+        return uploaded_file.name
+
+    monkeypatch.setattr(file_processing, "build_file_vectorstore", fake_build)
+    manager = IngestionJobManager(max_workers=2)
+    jobs = []
+    for name in ("a.txt", "b.txt"):
+        upload = io.BytesIO(name.encode())
+        upload.name, upload.size = name, len(name)
+        jobs.append(manager.submit("sesi", upload, CachedEmbeddings(CountingEmbeddings(), cache_path=path)))
+    for job in jobs:
+        assert job.wait(timeout=30)
+    assert [(job.status, job.error) for job in jobs] == [("done", None), ("done", None)]
+    assert get_embedding_store(path).stats()["entries"] == (5 + 200) * 20
+    close_embedding_store(path)
@@ -0,0 +1,37 @@
+from langchain_core.documents import Document
+
+from utils.embedding_pipeline import build_vectorstore_incrementally, get_rate_limiter, snapshot_vectorstore
+from utils.embeddings import HashingEmbeddings
+
+
+def _chunks(count):
+    return (Document(page_content=f"halaman {i} tentang pendapatan kuartal", metadata={"page": i})
+            for i in range(count))
+
+
+def test_snapshot_is_not_changed_by_later_windows():
+    snapshots = []
+    vectorstore, total = build_vectorstore_incrementally(
+        _chunks(25), HashingEmbeddings(), window_size=10,
+        on_window=lambda partial, count: snapshots.append((snapshot_vectorstore(partial), count))
+    )
+    assert total == 25 and vectorstore.index.ntotal == 25
+    assert [(snapshot.index.ntotal, count) for snapshot, count in snapshots] == [(10, 10), (20, 20), (25, 25)]
+
+    first = snapshots[0][0]
+    pages = {doc.metadata["page"] for doc in first.similarity_search("pendapatan", k=20)}
+    assert pages <= set(range(10))
+
+
+def test_progress_is_reported_per_batch():
+    progress = []
+    build_vectorstore_incrementally(_chunks(600), HashingEmbeddings(), window_size=512,
+                                    max_concurrency=1, progress_callback=lambda done, total: progress.append((done, total)))
+    # Jendela 512 chunk dibagi beberapa batch (maks. 256 chunk), lalu jendela sisa 88 chunk
+    assert progress == [(256, 512), (512, 512), (88, 88)]
+
+
+def test_rate_limiter_is_shared_per_provider():
+    first = get_rate_limiter(HashingEmbeddings(), 2)
+    assert get_rate_limiter(HashingEmbeddings(), 6) is first
+    assert first.max_concurrency >= 6
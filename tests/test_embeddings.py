@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from utils.embedding_cache import get_embedding_model_name
+from utils.embeddings import EmbeddingProviderFactory, HashingEmbeddings, get_default_embedding_backend
+
+
+def test_local_backend_is_deterministic_and_normalized():
+    embeddings = EmbeddingProviderFactory.get_provider("local")
+    assert isinstance(embeddings, HashingEmbeddings)
+    docs = np.asarray(embeddings.embed_documents(["Pendapatan naik 10%", "Beban operasional turun"]))
+    assert docs.shape == (2, 1024)
+    assert np.allclose(np.linalg.norm(docs, axis=1), 1.0)
+    # Vektor query sama dengan vektor dokumen untuk teks yang sama, juga di instance lain
+    assert np.allclose(HashingEmbeddings().embed_query("Pendapatan naik 10%"), docs[0])
+
+
+def test_local_backend_ranks_similar_text_higher():
+    embeddings = HashingEmbeddings()
+    query = np.asarray(embeddings.embed_query("pendapatan kuartal tiga"))
+    similar, other = np.asarray(embeddings.embed_documents(["Pendapatan kuartal 3 naik", "Risiko nilai tukar"]))
+    assert query @ similar > query @ other
+
+
+def test_model_name_depends_on_backend_parameters():
+    assert get_embedding_model_name(HashingEmbeddings()) != get_embedding_model_name(HashingEmbeddings(n_features=512))
+    assert get_embedding_model_name(HashingEmbeddings()) == get_embedding_model_name(HashingEmbeddings())
+
+
+def test_openai_backend_requires_openai_key():
+    with pytest.raises(ValueError):
+        EmbeddingProviderFactory.get_provider("openai")
+    embeddings = EmbeddingProviderFactory.get_provider("openai", api_key="sk-test")
+    assert type(embeddings).__name__ == "OpenAIEmbeddings"
+    with pytest.raises(ValueError):
+        EmbeddingProviderFactory.get_provider("tidak-ada")
+
+
+def test_default_backend_falls_back_to_local_without_openai_key():
+    assert get_default_embedding_backend("sk-test") == "openai"
+    assert get_default_embedding_backend(None) == "local"
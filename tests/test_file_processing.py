@@ -0,0 +1,103 @@
+import io
+
+import pytest
+
+from utils import file_processing, index_store, upload_store
+from utils.embedding_cache import CachedEmbeddings, close_embedding_store
+from utils.embeddings import HashingEmbeddings
+
+
+def _pdf_upload(name="laporan.pdf"):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for i in range(2):
+        doc.new_page().insert_text((72, 72), f"Halaman {i + 1}. Pendapatan Rp 1.250.000")
+    upload = io.BytesIO(doc.tobytes())
+    upload.name, upload.size = name, len(upload.getvalue())
+    return upload
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_store, "APP_DATA_DIR", tmp_path)
+    monkeypatch.setattr(index_store, "INDEX_STORE_DIR", tmp_path / "indexes")
+    monkeypatch.setattr(index_store, "_loaded_indexes", index_store.OrderedDict())
+    monkeypatch.setattr(index_store, "_lexical_indexes", {})
+    extracted = []
+    monkeypatch.setattr(file_processing, "_extract_file_tables",
+                        lambda uploaded_file, file_hash, session_id=None: extracted.append(file_hash) or 3)
+    path = tmp_path / "cache.sqlite3"
+    yield extracted, CachedEmbeddings(HashingEmbeddings(), cache_path=path)
+    close_embedding_store(path)
+
+
+@pytest.mark.parametrize("setting, extract_tables, expected", [
+    (False, None, False),
+    (True, None, True),
+    (True, False, False),
+    (False, True, True),
+])
+def test_pdf_table_extraction_follows_setting(stores, monkeypatch, setting, extract_tables, expected):
+    import config
+
+    extracted, embeddings = stores
+    monkeypatch.setattr(config, "PDF_TABLE_EXTRACTION", setting)
+    _, info = file_processing.build_file_vectorstore(_pdf_upload(), embeddings, pdf_backend="pypdf",
+                                                     extract_tables=extract_tables, session_id="sesi")
+    assert info["chunk_count"] >= 1
+    assert bool(extracted) == expected
+    assert ("table_count" in info) == expected
+
+
+def _csv_upload(name="penjualan.csv", rows=50):
+    data = "tanggal,produk,penjualan\n" + "".join(f"2023-01-{i % 28 + 1:02d},SKU-{i},{1000 + i}\n" for i in range(rows))
+    upload = io.BytesIO(data.encode("utf-8"))
+    upload.name, upload.size = name, len(upload.getvalue())
+    upload.file_id = f"{name}-{rows}"
+    return upload
+
+
+def test_file_buffer_shares_upload_bytes():
+    upload = _csv_upload()
+    first, second = file_processing.get_file_buffer(upload), file_processing.get_file_buffer(upload)
+    assert first.getvalue() is upload.getvalue()
+    first.read(10)
+    # Tiap pembaca punya posisi sendiri
+    assert second.read(7) == b"tanggal"
+
+
+def test_csv_dataframe_is_parsed_once_per_content():
+    upload = _csv_upload(rows=20)
+    df = file_processing.load_csv_dataframe(upload)
+    assert list(df.columns) == ["tanggal", "produk", "penjualan"] and len(df) == 20
+    assert file_processing.load_csv_dataframe(upload) is df
+    # Isi sama dengan nama lain memakai DataFrame yang sama
+    assert file_processing.load_csv_dataframe(_csv_upload("salinan.csv", rows=20)) is df
+
+
+def test_csv_is_indexed_from_memory_without_upload_file(stores, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_store, "UPLOAD_DIR", tmp_path / "uploads")
+    _, embeddings = stores
+    _, info = file_processing.build_file_vectorstore(_csv_upload(), embeddings, session_id="sesi")
+    assert info["doc_count"] == 50 and info["chunk_count"] >= 1
+    assert not (tmp_path / "uploads").exists()
+
+
+@pytest.mark.parametrize("name", ["laporan.docx", "laporan.html"])
+def test_docx_and_html_report_progress(stores, name):
+    from tests.test_loaders import _docx, _docx_paragraph
+
+    _, embeddings = stores
+    if name.endswith(".docx"):
+        data = _docx(*(_docx_paragraph(f"Bab {i}", "Heading1") + _docx_paragraph(f"Isi bab {i}.") for i in range(5)))
+    else:
+        data = io.BytesIO("".join(f"<h1>Bab {i}</h1><p>Isi bab {i}.</p>" for i in range(5)).encode("utf-8"))
+    upload = io.BytesIO(data.getvalue())
+    upload.name, upload.size = name, len(upload.getvalue())
+
+    progress = []
+    _, info = file_processing.build_file_vectorstore(upload, embeddings, session_id="sesi",
+                                                     progress_callback=lambda done, total: progress.append((done, total)))
+    assert info["doc_count"] == 5
+    assert progress and all(total == 5 for _, total in progress)
+    assert progress[-1] == (5, 5)
@@ -0,0 +1,55 @@
+import pandas as pd
+import pytest
+from langchain_community.vectorstores import FAISS
+
+from utils import index_store, pdf_tables
+from utils.embeddings import HashingEmbeddings
+
+
+@pytest.fixture
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_store, "APP_DATA_DIR", tmp_path)
+    monkeypatch.setattr(index_store, "INDEX_STORE_DIR", tmp_path / "indexes")
+    monkeypatch.setattr(index_store, "_loaded_indexes", index_store.OrderedDict())
+    monkeypatch.setattr(index_store, "_loaded_bytes", 0)
+    return tmp_path
+
+
+def _vectorstore(texts):
+    return FAISS.from_texts(texts, HashingEmbeddings(),
+                            metadatas=[{"source": "laporan.pdf", "page": i} for i in range(len(texts))])
+
+
+def test_saved_index_roundtrips_without_pickle(store_dir):
+    vectorstore = _vectorstore(["pendapatan naik", "biaya turun", "risiko pasar"])
+    index_store.save_vectorstore("kunci", vectorstore, {"filename": "laporan.pdf"})
+    assert not list(store_dir.rglob("*.pkl"))
+    assert (store_dir.stat().st_mode & 0o777) == 0o700
+
+    loaded, metadata = index_store.load_vectorstore("kunci", HashingEmbeddings())
+    assert metadata == {"filename": "laporan.pdf"}
+    doc = loaded.similarity_search("risiko pasar", k=1)[0]
+    assert doc.page_content == "risiko pasar" and doc.metadata == {"source": "laporan.pdf", "page": 2}
+
+
+def test_loaded_indexes_are_evicted_by_size(store_dir, monkeypatch):
+    for key in ("a", "b", "c"):
+        index_store.save_vectorstore(key, _vectorstore([f"dokumen {key} {i}" for i in range(50)]))
+    monkeypatch.setattr(index_store, "LOADED_INDEX_CACHE_MB", 0)
+    for key in ("a", "b", "c"):
+        assert index_store.load_vectorstore(key, HashingEmbeddings()) is not None
+    # Batas 0 MB: hanya indeks yang terakhir dimuat yang dipertahankan
+    assert list(index_store._loaded_indexes) == ["c"]
+    assert index_store._loaded_bytes == index_store._loaded_indexes["c"][-1]
+
+
+def test_pdf_tables_roundtrip_as_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_tables, "APP_DATA_DIR", tmp_path)
+    monkeypatch.setattr(pdf_tables, "TABLE_STORE_DIR", tmp_path / "tables")
+    df = pd.DataFrame({"pos": ["Pendapatan", "Laba"], "2023": [1250000.0, None]})
+    pdf_tables.save_pdf_tables("hash", [{"page": 3, "table_index": 0, "bbox": (1.0, 2.0, 3.0, 4.0), "df": df}])
+    pdf_tables._loaded_tables.pop("hash", None)
+
+    table = pdf_tables.load_pdf_tables("hash")[0]
+    assert table["page"] == 3 and table["bbox"] == [1.0, 2.0, 3.0, 4.0]
+    pd.testing.assert_frame_equal(table["df"], df)
@@ -0,0 +1,32 @@
+import io
+
+from utils import file_processing, ingestion_jobs
+from utils.ingestion_jobs import IngestionJobManager
+
+
+def _upload(name):
+    upload = io.BytesIO(name.encode())
+    upload.name, upload.size = name, len(name)
+    return upload
+
+
+def test_expired_results_are_pruned_without_new_submit(monkeypatch):
+    monkeypatch.setattr(file_processing, "build_file_vectorstore", lambda uploaded_file, *args, **kwargs: uploaded_file.name)
+    manager = IngestionJobManager(max_workers=1)
+    job = manager.submit("sesi-lama", _upload("a.txt"), embeddings=None)
+    assert job.wait(timeout=10)
+    assert manager.get(job.job_id) is job
+
+    # Sesi tidak pernah mengambil hasilnya: setelah TTL, job dibuang saat registry dibaca sesi lain
+    monkeypatch.setattr(ingestion_jobs, "INGESTION_RESULT_TTL_SECONDS", -1)
+    assert manager.jobs_for_session("sesi-lain") == []
+    assert manager.get(job.job_id) is None
+
+
+def test_collect_removes_finished_jobs(monkeypatch):
+    monkeypatch.setattr(file_processing, "build_file_vectorstore", lambda uploaded_file, *args, **kwargs: uploaded_file.name)
+    manager = IngestionJobManager(max_workers=1)
+    job = manager.submit("sesi", _upload("a.txt"), embeddings=None)
+    assert job.wait(timeout=10)
+    assert [collected.result for collected in manager.collect("sesi")] == ["a.txt"]
+    assert manager.jobs_for_session("sesi") == []
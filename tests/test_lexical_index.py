@@ -0,0 +1,49 @@
+from utils.lexical_index import BM25Index, tokenize
+
+
+def _index():
+    index = BM25Index()
+    index.add(["a", "b", "c", "d"], [
+        "Invoice INV-2023-0042 jatuh tempo bulan depan",
+        "Laporan tahunan 2023 menunjukkan pendapatan naik",
+        "Invoice INV-2023-0043 sudah dibayar",
+        "Rencana ekspansi ke Surabaya",
+    ])
+    return index
+
+
+def test_tokenize_keeps_whole_identifier_and_parts():
+    assert tokenize("INV-2023-0042 lunas") == ["inv-2023-0042", "lunas", "inv", "2023", "0042"]
+
+
+def test_whole_identifier_query_ignores_its_parts():
+    results = _index().search("INV-2023-0042")
+    assert [doc_key for doc_key, _ in results] == ["a"]
+
+
+def test_unknown_identifier_falls_back_to_parts():
+    results = dict(_index().search("INV-2023-9999"))
+    assert set(results) == {"a", "b", "c"}
+
+
+def test_removed_documents_are_not_returned():
+    index = _index()
+    index.remove(["a"])
+    assert len(index) == 3
+    assert index.search("INV-2023-0042") == []
+    assert [doc_key for doc_key, _ in index.search("invoice")] == ["c"]
+
+    index.add(["e"], ["Invoice INV-2023-0042 diterbitkan ulang"])
+    assert [doc_key for doc_key, _ in index.search("INV-2023-0042")] == ["e"]
+
+
+def test_compaction_keeps_results():
+    index = BM25Index()
+    keys = [f"doc{i}" for i in range(3000)]
+    index.add(keys, [f"baris {i} produk SKU-{i % 7} jumlah {i}" for i in range(3000)])
+    index.remove(keys[:2000])
+    # Dokumen yang dihapus dipadatkan dari posting list
+    assert len(index._doc_keys) == 1000
+    results = index.search("SKU-3", k=3)
+    assert len(results) == 3
+    assert all(int(doc_key[3:]) >= 2000 and int(doc_key[3:]) % 7 == 3 for doc_key, _ in results)
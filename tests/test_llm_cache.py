@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.outputs import Generation
+
+from utils import llm_cache
+from utils.llm_cache import LLMCallCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def _cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=clock.time))
+    return LLMCallCache(cache_path=tmp_path / "llm.sqlite3", **kwargs), clock
+
+
+def test_entries_expire_after_ttl_in_memory_and_on_disk(tmp_path, monkeypatch):
+    cache, clock = _cache(tmp_path, monkeypatch, ttl_seconds=60)
+    cache.update("prompt", "model-a", [Generation(text="jawaban")])
+    assert cache.lookup("prompt", "model-a")[0].text == "jawaban"
+    assert cache.lookup("prompt", "model-b") is None
+
+    # Instance baru (proses lain) membaca dari disk
+    other = LLMCallCache(cache_path=tmp_path / "llm.sqlite3", ttl_seconds=60)
+    assert other.lookup("prompt", "model-a")[0].text == "jawaban"
+    assert other.stats()["disk_hits"] == 1
+
+    clock.now += 61
+    assert cache.lookup("prompt", "model-a") is None
+    assert cache.stats()["disk_entries"] == 0
+    cache.close()
+    other.close()
+
+
+def test_cached_generations_are_copies(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch)
+    cache.update("prompt", "model", [Generation(text="asli")])
+    first = cache.lookup("prompt", "model")
+    first[0].text = "diubah"
+    assert cache.lookup("prompt", "model")[0].text == "asli"
+    cache.close()
+
+
+def test_size_limit_evicts_least_recently_used(tmp_path, monkeypatch):
+    # Ukuran dicek pada penulisan ke-1 dan ke-3
+    monkeypatch.setattr(llm_cache, "_EVICTION_INTERVAL", 2)
+    cache, clock = _cache(tmp_path, monkeypatch, memory_entries=1)
+    cache.update("lama", "model", [Generation(text="x" * 200)])
+    size = cache._conn.execute("SELECT size FROM llm_calls").fetchone()[0]
+    cache.max_bytes = 2 * size
+    clock.now += 1
+    cache.update("baru", "model", [Generation(text="y" * 200)])
+    clock.now += 1
+    # "lama" dibaca lagi sehingga "baru" yang paling lama tidak dipakai
+    assert cache.lookup("lama", "model")[0].text == "x" * 200
+    clock.now += 1
+    cache.update("ketiga", "model", [Generation(text="z" * 200)])
+
+    keys = {row[0] for row in cache._conn.execute("SELECT key FROM llm_calls")}
+    assert llm_cache.llm_cache_key("baru", "model") not in keys
+    assert {llm_cache.llm_cache_key(prompt, "model") for prompt in ("lama", "ketiga")} <= keys
+    assert cache.stats()["memory_entries"] == 1
+    cache.close()
+
+
+def test_identical_chat_calls_hit_the_cache(tmp_path, monkeypatch):
+    cache, _ = _cache(tmp_path, monkeypatch)
+    llm = FakeListChatModel(responses=["pertama", "kedua"], cache=cache)
+    assert llm.invoke("Ringkas laporan").content == "pertama"
+    assert llm.invoke("Ringkas laporan").content == "pertama"
+    assert llm.invoke("Pertanyaan lain").content == "kedua"
+    assert cache.stats()["memory_hits"] == 1
+    cache.close()
@@ -0,0 +1,147 @@
+import io
+import zipfile
+
+from utils.embedding_pipeline import count_tokens
+from utils.loaders import (get_xlsx_row_count, iter_csv_row_groups, iter_docx_sections, iter_html_sections,
+                           iter_xlsx_row_groups)
+
+_W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def _docx_paragraph(text, style=None):
+    style = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+    return f"<w:p>{style}<w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def _docx(*body):
+    """DOCX minimal: hanya word/document.xml yang dibaca loader"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {_W}><w:body>{''.join(body)}</w:body></w:document>")
+    buffer.seek(0)
+    return buffer
+
+
+def _docx_table(rows):
+    cells = "".join("<w:tr>" + "".join(f"<w:tc>{_docx_paragraph(cell)}</w:tc>" for cell in row) + "</w:tr>"
+                    for row in rows)
+    return f"<w:tbl>{cells}</w:tbl>"
+
+
+def _csv(rows, columns=("tanggal", "produk", "penjualan")):
+    lines = [",".join(columns)] + [",".join(row) for row in rows]
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+
+def test_csv_row_groups_follow_max_tokens():
+    rows = [(f"2023-01-{i % 28 + 1:02d}", f"SKU-{i}", str(i * 10)) for i in range(300)]
+    small = list(iter_csv_row_groups(_csv(rows), max_tokens=64, source="data.csv"))
+    large = list(iter_csv_row_groups(_csv(rows), max_tokens=256, source="data.csv"))
+    assert len(small) > len(large)
+    for doc in small:
+        assert count_tokens(doc.page_content) <= 64
+        assert doc.page_content.startswith("Kolom: tanggal | produk | penjualan\n")
+    # Semua baris tercakup tepat sekali, berurutan
+    assert [doc.metadata["row_start"] for doc in small][0] == 0
+    assert sum(doc.metadata["row_count"] for doc in small) == 300
+
+
+def test_wide_csv_row_is_split_into_capped_blocks():
+    columns = [f"kolom_{i}" for i in range(5)]
+    wide_row = tuple(f"nilai-{i} " * 40 for i in range(5))
+    rows = [("a", "b", "c", "d", "e"), wide_row, ("f", "g", "h", "i", "j")]
+    docs = list(iter_csv_row_groups(_csv(rows, columns), max_tokens=64, source="lebar.csv"))
+    parts = [doc for doc in docs if doc.metadata.get("row_parts")]
+    assert len(parts) > 1
+    assert {doc.metadata["row_start"] for doc in parts} == {1}
+    assert [doc.metadata["row_part"] for doc in parts] == list(range(1, len(parts) + 1))
+    assert all(count_tokens(doc.page_content) <= 64 for doc in docs)
+    # Baris sebelum dan sesudahnya tetap utuh di blok biasa
+    assert docs[0].metadata["row_start"] == 0 and docs[-1].metadata["row_end"] == 2
+
+
+def test_docx_sections_follow_headings_and_tables():
+    file = _docx(
+        _docx_paragraph("Ringkasan Eksekutif", "Heading1"),
+        _docx_paragraph("Pendapatan naik 10%."),
+        _docx_table([("Tahun", "Pendapatan"), ("2023", "Rp 1.250.000")]),
+        _docx_paragraph("Risiko", "Judul2"),
+        _docx_paragraph("Nilai tukar melemah."),
+    )
+    docs = list(iter_docx_sections(file, source="laporan.docx"))
+    assert [doc.page_content for doc in docs] == [
+        "Ringkasan Eksekutif\nPendapatan naik 10%.\nTahun | Pendapatan\n2023 | Rp 1.250.000",
+        "Risiko\nNilai tukar melemah.",
+    ]
+    assert [(doc.metadata["section"], doc.metadata["section_index"]) for doc in docs] == \
+        [("Ringkasan Eksekutif", 0), ("Risiko", 1)]
+    assert docs[0].metadata["source"] == "laporan.docx"
+
+
+def test_docx_long_section_is_split_by_max_chars():
+    paragraphs = [_docx_paragraph(f"Paragraf {i} " + "isi " * 20) for i in range(20)]
+    docs = list(iter_docx_sections(_docx(_docx_paragraph("Bab 1", "Heading1"), *paragraphs), max_chars=300))
+    assert len(docs) > 1
+    assert all(len(doc.page_content) <= 300 + 100 for doc in docs)
+    assert all(doc.metadata["section"] == "Bab 1" for doc in docs)
+    assert sum(doc.page_content.count("Paragraf") for doc in docs) == 20
+
+
+def test_html_sections_skip_scripts_and_keep_table_cells():
+    html = (b"<html><head><title>Judul</title><style>p {color: red}</style></head><body>"
+            b"<h1>Laporan</h1><p>Pendapatan &amp; laba naik.</p><script>var x = 1;</script>"
+            b"<table><tr><th>Tahun</th><th>Laba</th></tr><tr><td>2023</td><td>500</td></tr></table>"
+            b"<h2>Risiko</h2><p>Nilai tukar.</p></body></html>")
+    docs = list(iter_html_sections(io.BytesIO(html), source="laporan.html"))
+    assert [doc.page_content for doc in docs] == [
+        "Laporan\nPendapatan & laba naik.\nTahun | Laba\n2023 | 500",
+        "Risiko\nNilai tukar.",
+    ]
+    assert [doc.metadata["section"] for doc in docs] == ["Laporan", "Risiko"]
+
+
+def test_html_text_is_not_lost_across_read_boundaries():
+    paragraphs = "".join(f"<p>kalimat-{i} é</p>" for i in range(8000))
+    html = f"<html><body><h1>Data</h1>{paragraphs}</body></html>".encode("utf-8")
+    assert len(html) > 2 * 64 * 1024
+    docs = list(iter_html_sections(io.BytesIO(html), max_chars=2000))
+    text = "\n".join(doc.page_content for doc in docs)
+    assert text.count("kalimat-") == 8000 and "kalimat-7999 é" in text
+    assert "\ufffd" not in text
+
+
+def _xlsx():
+    from openpyxl import Workbook
+
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Penjualan"
+    sheet.append(["tanggal", "produk", "jumlah"])
+    for i in range(40):
+        sheet.append([f"2023-01-{i % 28 + 1:02d}", f"SKU-{i}", 1000 + i])
+    other = workbook.create_sheet("Biaya")
+    other.append([None, None])
+    other.append(["pos", "nilai"])
+    other.append(["sewa", 500])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def test_xlsx_row_groups_per_sheet():
+    docs = list(iter_xlsx_row_groups(_xlsx(), max_tokens=64, source="data.xlsx"))
+    sales = [doc for doc in docs if doc.metadata["sheet"] == "Penjualan"]
+    costs = [doc for doc in docs if doc.metadata["sheet"] == "Biaya"]
+    assert len(sales) > 1
+    assert all(count_tokens(doc.page_content) <= 64 for doc in sales)
+    assert sales[0].page_content.startswith("Sheet: Penjualan\nKolom: tanggal | produk | jumlah\n")
+    # Nomor baris sesuai Excel (header di baris 1)
+    assert sales[0].metadata["row_start"] == 2
+    assert sum(doc.metadata["row_count"] for doc in sales) == 40
+    # Baris kosong pertama dilewati; header sheet kedua di baris 2
+    assert len(costs) == 1 and "Baris 3: sewa | 500" in costs[0].page_content
+
+
+def test_xlsx_row_count_estimate():
+    assert get_xlsx_row_count(_xlsx()) == 40 + 2
@@ -0,0 +1,60 @@
+import pytest
+
+from utils import pdf_extraction
+from utils.pdf_extraction import iter_pdf_pages_pymupdf
+
+fitz = pytest.importorskip("fitz")
+
+
+def _write_pdf(path, pages):
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Isi halaman {i + 1}")
+    doc.save(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def small_ranges(monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "PAGES_PER_TASK", 5)
+    monkeypatch.setattr(pdf_extraction, "MIN_PAGES_FOR_POOL", 8)
+    yield
+    with pdf_extraction._pool_lock:
+        if pdf_extraction._pool is not None:
+            pdf_extraction._pool.shutdown()
+            pdf_extraction._pool = None
+
+
+def test_pool_results_are_merged_in_page_order(tmp_path, small_ranges):
+    path = _write_pdf(tmp_path / "laporan.pdf", 23)
+    docs = list(iter_pdf_pages_pymupdf(path, max_workers=2, source="laporan.pdf"))
+    assert [doc.metadata["page"] for doc in docs] == list(range(23))
+    assert all(doc.metadata["source"] == "laporan.pdf" for doc in docs)
+    assert [doc.page_content.strip() for doc in docs[:2]] == ["Isi halaman 1", "Isi halaman 2"]
+    assert docs[-1].page_content.strip() == "Isi halaman 23"
+
+
+def test_small_pdf_is_extracted_without_pool(tmp_path, small_ranges):
+    path = _write_pdf(tmp_path / "pendek.pdf", 6)
+    docs = list(iter_pdf_pages_pymupdf(path, max_workers=4))
+    assert [doc.metadata["page"] for doc in docs] == list(range(6))
+    assert docs[0].metadata["source"] == path
+    assert pdf_extraction._pool is None
+
+
+def test_stopping_early_cancels_pending_ranges(tmp_path, small_ranges):
+    path = _write_pdf(tmp_path / "laporan.pdf", 40)
+    pages = iter_pdf_pages_pymupdf(path, max_workers=2)
+    assert next(pages).metadata["page"] == 0
+    pages.close()
+    # Pool tetap bisa dipakai setelah generator dihentikan
+    assert len(list(iter_pdf_pages_pymupdf(path, max_workers=2))) == 40
+
+
+def test_invalid_pdf_raises(tmp_path, small_ranges):
+    path = tmp_path / "rusak.pdf"
+    path.write_bytes(b"bukan pdf")
+    with pytest.raises(Exception):
+        list(iter_pdf_pages_pymupdf(str(path), max_workers=2))
+    with pytest.raises(Exception):
+        list(iter_pdf_pages_pymupdf(str(tmp_path / "tidak-ada.pdf"), max_workers=2))
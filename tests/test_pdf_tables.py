@@ -0,0 +1,27 @@
+import pytest
+
+from utils.pdf_tables import parse_number
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1.250", 1250.0),
+    ("1.250.000", 1250000.0),
+    ("1,250,000.50", 1250000.5),
+    ("1.250.000,50", 1250000.5),
+    ("1,5", 1.5),
+    ("12.5", 12.5),
+    ("Rp 2.500.000", 2500000.0),
+    ("USD 1,250", 1250.0),
+    ("15,3%", 15.3),
+    ("(750.000)", -750000.0),
+    ("-1.250", -1250.0),
+    ("42", 42.0),
+    (7, 7.0),
+])
+def test_parse_number_formats(text, expected):
+    assert parse_number(text) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("text", [None, "", "Pendapatan", "2023-01-01", "n/a"])
+def test_parse_number_rejects_non_numbers(text):
+    assert parse_number(text) is None
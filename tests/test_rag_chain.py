@@ -0,0 +1,84 @@
+from langchain_core.documents import Document
+
+from utils.embedding_pipeline import count_tokens
+from utils.rag_chain import BudgetedRAGChain, depends_on_history, pack_documents, pack_history
+
+
+class FakeLLM:
+    def __init__(self, answer="jawaban"):
+        self.answer = answer
+        self.prompts = []
+
+    def invoke(self, prompt, config=None, **kwargs):
+        self.prompts.append(prompt)
+        return self.answer
+
+
+class FakeRetriever:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def invoke(self, query):
+        self.queries.append(query)
+        return self.docs
+
+
+class FakePrompt:
+    def format(self, **kwargs):
+        return "PROMPT {question}\n{context}".format(**kwargs)
+
+
+def test_pack_documents_dedupes_and_skips_chunks_over_budget():
+    docs = [Document(page_content="a" * 40), Document(page_content="a" * 40),
+            Document(page_content="b" * 200), Document(page_content="c" * 20)]
+    packed, used = pack_documents(docs, max_tokens=20)
+    # Duplikat dibuang, chunk besar dilewati, chunk pendek berikutnya masih masuk
+    assert [doc.page_content[0] for doc in packed] == ["a", "c"]
+    assert used == count_tokens("a" * 40) + count_tokens("c" * 20) <= 20
+
+
+def test_pack_documents_truncates_oversized_top_chunk():
+    packed, used = pack_documents([Document(page_content="x" * 400, metadata={"page": 3})], max_tokens=10)
+    assert len(packed) == 1 and used <= 10
+    assert packed[0].metadata == {"page": 3}
+    assert len(packed[0].page_content) < 400
+
+
+def test_pack_history_keeps_latest_turns_in_order():
+    history = [("user", "u" * 80), ("assistant", "a" * 40), ("user", "pertanyaan terakhir")]
+    text, used = pack_history(history, max_tokens=20)
+    assert text.split("\n\n") == ["AI: " + "a" * 40, "User: pertanyaan terakhir"]
+    assert used <= 20
+
+    # Giliran terakhir yang terlalu panjang tetap disertakan (terpotong)
+    text, used = pack_history([("user", "z" * 400)], max_tokens=10)
+    assert text.startswith("User: z") and used <= 10
+
+
+def test_follow_up_questions_are_condensed_only_with_history():
+    history = [("user", "Berapa pendapatan 2023?"), ("assistant", "Rp 10 miliar")]
+    assert not depends_on_history("jelaskan lebih lanjut", [])
+    assert depends_on_history("jelaskan lebih lanjut", history)
+    assert depends_on_history("dan tahun lalu?", history)
+    assert not depends_on_history("Berapa laba bersih perusahaan pada tahun 2022?", history)
+
+    llm = FakeLLM("Berapa pendapatan tahun 2022?")
+    chain = BudgetedRAGChain(llm, FakeRetriever([]), FakePrompt())
+    assert chain.standalone_question("Berapa laba bersih perusahaan pada tahun 2022?", history) == \
+        "Berapa laba bersih perusahaan pada tahun 2022?"
+    assert llm.prompts == []
+    assert chain.standalone_question("dan tahun lalu?", history) == "Berapa pendapatan tahun 2022?"
+    assert "Rp 10 miliar" in llm.prompts[0]
+
+
+def test_chain_makes_one_llm_call_for_standalone_question():
+    llm = FakeLLM("Pendapatan naik 10%.")
+    retriever = FakeRetriever([Document(page_content="Pendapatan naik 10% pada 2023.")])
+    chain = BudgetedRAGChain(llm, retriever, FakePrompt())
+    question = "Bagaimana pertumbuhan pendapatan perusahaan tahun 2023?"
+    result = chain({"question": question, "chat_history": [("user", question)]})
+    assert result["answer"] == "Pendapatan naik 10%."
+    assert retriever.queries == [question]
+    assert len(llm.prompts) == 1 and "Pendapatan naik 10% pada 2023." in llm.prompts[0]
+    assert [doc.page_content for doc in result["source_documents"]] == ["Pendapatan naik 10% pada 2023."]
@@ -0,0 +1,52 @@
+from utils.embeddings import HashingEmbeddings
+from utils.response_cache import SemanticResponseCache, build_scope
+
+EMBED = HashingEmbeddings().embed_query
+
+
+def _scope(history, rag_mode="single", document_keys=("store-a",)):
+    return build_scope(list(document_keys), "openai", "gpt-4o-mini", "hashing", history, rag_mode)
+
+
+def test_history_is_part_of_scope_for_every_question():
+    first = [("user", "Siapa pesaing utama kami?"), ("assistant", "PT A dan PT B.")]
+    other = [("user", "Siapa pemasok utama kami?"), ("assistant", "PT C.")]
+    # Pertanyaan tanpa kata rujukan tetap dijawab dengan riwayat di prompt
+    assert _scope(first) != _scope(other)
+    assert _scope(first) == _scope(list(first))
+    assert _scope([]) == _scope([])
+
+
+def test_rag_mode_and_index_keys_are_part_of_scope():
+    assert _scope([], rag_mode="single") != _scope([], rag_mode="conversational")
+    assert _scope([], document_keys=("store-a",)) != _scope([], document_keys=("store-b",))
+
+
+def test_answer_is_not_reused_across_conversations():
+    cache = SemanticResponseCache()
+    question = "Berapa target penjualan tahun ini?"
+    history = [("user", "Kita bahas cabang Surabaya"), ("assistant", "Baik.")]
+    cache.store(_scope(history), question, "jawaban Surabaya", EMBED)
+
+    assert cache.lookup(_scope(history), question, EMBED) == ("jawaban Surabaya", 1.0)
+    assert cache.lookup(_scope([("user", "Kita bahas cabang Medan"), ("assistant", "Baik.")]),
+                        question, EMBED) is None
+    assert cache.lookup(_scope([]), question, EMBED) is None
+
+
+def test_numbers_must_match_for_similar_questions():
+    cache = SemanticResponseCache()
+    cache.store(_scope([]), "Berapa nilai invoice INV-2023-0042?", "Rp 10 juta", EMBED)
+    assert cache.lookup(_scope([]), "Berapa nilai invoice INV-2023-0043?", EMBED, threshold=0.1) is None
+
+
+def test_summary_availability_is_part_of_scope():
+    history = []
+    without_summary = build_scope(["store-a", "store-b"], "openai", "gpt-4o-mini", "hashing", history, "single")
+    partial = build_scope(["store-a", "store-b"], "openai", "gpt-4o-mini", "hashing", history, "single", ["store-a"])
+    ready = build_scope(["store-a", "store-b"], "openai", "gpt-4o-mini", "hashing", history, "single",
+                        ["store-b", "store-a"])
+    # Jawaban "ringkas laporan ini" dari retrieval tidak dipakai lagi setelah ringkasan siap
+    assert len({without_summary, partial, ready}) == 3
+    assert ready == build_scope(["store-b", "store-a"], "openai", "gpt-4o-mini", "hashing", history, "single",
+                                ["store-a", "store-b"])
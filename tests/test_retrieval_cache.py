@@ -0,0 +1,82 @@
+from langchain_core.documents import Document
+
+from utils.corpus import DocumentCorpus
+from utils.embeddings import HashingEmbeddings
+from utils.retrieval_cache import RetrievalCache, normalize_query
+
+
+class CountingEmbeddings(HashingEmbeddings):
+    def __init__(self):
+        super().__init__()
+        self.queries = []
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        return super().embed_query(text)
+
+
+def test_normalize_query_keeps_codes_whole():
+    assert normalize_query("  Berapa Total INV-2023-0042?? ") == "berapa total inv-2023-0042"
+    assert normalize_query("versi 4.2.1, ya!") == normalize_query("Versi 4.2.1 ya")
+
+
+def test_results_are_dropped_when_index_version_changes():
+    cache = RetrievalCache()
+    cache.invalidate("v1")
+    cache.put_results("v1", "Pendapatan 2023?", ["a", "b"], params=(5,))
+    assert cache.get_results("v1", "pendapatan   2023", params=(5,)) == ("a", "b")
+    assert cache.get_results("v1", "pendapatan 2023", params=(3,)) is None
+
+    cache.invalidate("v2")
+    assert cache.get_results("v2", "pendapatan 2023", params=(5,)) is None
+    # Retriever lama (versi v1) tidak mengisi cache versi baru
+    cache.put_results("v1", "pendapatan 2023", ["a"], params=(5,))
+    assert cache.get_results("v2", "pendapatan 2023", params=(5,)) is None
+    assert cache.stats()["result_hits"] == 1
+
+
+def test_result_cache_is_lru_bounded():
+    cache = RetrievalCache(max_results=2)
+    cache.invalidate("v")
+    for query in ("a", "b"):
+        cache.put_results("v", query, [query])
+    assert cache.get_results("v", "a") == ("a",)
+    cache.put_results("v", "c", ["c"])
+    assert cache.get_results("v", "b") is None
+    assert cache.get_results("v", "a") == ("a",) and cache.get_results("v", "c") == ("c",)
+
+
+def test_query_embedding_survives_invalidation():
+    cache = RetrievalCache()
+    embeddings = CountingEmbeddings()
+    first = cache.embed_query("Risiko utama?", embeddings)
+    cache.invalidate("v2")
+    assert cache.embed_query("risiko UTAMA", embeddings) == first
+    assert embeddings.queries == ["Risiko utama?"]
+
+
+def test_corpus_retriever_reuses_results_until_files_change():
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = CountingEmbeddings()
+
+    def vectorstore(texts):
+        store = FAISS(embeddings, faiss.IndexFlatL2(1024), InMemoryDocstore(), {})
+        store.add_documents([Document(page_content=text) for text in texts])
+        return store
+
+    corpus = DocumentCorpus(embeddings, "local")
+    corpus.add_built_file("a", vectorstore(["pendapatan naik 10%", "beban turun"]),
+                          {"filename": "a.pdf", "processing_time": 0})
+    first = corpus.as_retriever(k=1).invoke("Pendapatan naik?")
+    again = corpus.as_retriever(k=1).invoke("pendapatan naik")
+    assert [doc.page_content for doc in again] == [doc.page_content for doc in first] == ["pendapatan naik 10%"]
+    assert corpus.retrieval_cache.stats()["result_hits"] == 1
+    assert embeddings.queries == ["Pendapatan naik?"]
+
+    corpus.add_built_file("b", vectorstore(["pendapatan naik 25% di cabang baru"]),
+                          {"filename": "b.pdf", "processing_time": 0})
+    corpus.as_retriever(k=1).invoke("pendapatan naik")
+    assert corpus.retrieval_cache.stats()["result_hits"] == 1
@@ -0,0 +1,50 @@
+from types import SimpleNamespace
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.language_models.fake import FakeListLLM
+
+from utils import streaming
+from utils.streaming import TokenStreamHandler, stream_kwargs
+
+
+def test_tokens_accumulate_with_throttled_updates(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(streaming, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    updates = []
+    handler = TokenStreamHandler(updates.append, min_interval=0.05)
+
+    handler.on_llm_new_token("Pen")
+    # Token berikutnya dalam jeda minimal tidak langsung ditampilkan
+    handler.on_llm_new_token("dapatan")
+    handler.on_llm_new_token(" naik")
+    assert updates == ["Pen"]
+    clock.now += 0.06
+    handler.on_llm_new_token(" 10%")
+    assert updates == ["Pen", "Pendapatan naik 10%"]
+    handler.on_llm_new_token(".")
+    handler.flush()
+    handler.flush()
+    assert updates == ["Pen", "Pendapatan naik 10%", "Pendapatan naik 10%."]
+    assert handler.text == "Pendapatan naik 10%."
+
+
+def test_flush_without_pending_tokens_does_nothing():
+    updates = []
+    handler = TokenStreamHandler(updates.append)
+    handler.flush()
+    assert updates == []
+
+
+def test_chat_model_streams_tokens_through_invoke():
+    llm = FakeListChatModel(responses=["Laba bersih naik."])
+    assert stream_kwargs(llm) == {"stream": True}
+    updates = []
+    handler = TokenStreamHandler(updates.append, min_interval=0)
+    result = llm.invoke("Bagaimana laba?", config={"callbacks": [handler]}, **stream_kwargs(llm))
+    handler.flush()
+    assert result.content == handler.text == "Laba bersih naik."
+    assert len(updates) > 1 and updates[-1] == "Laba bersih naik."
+
+
+def test_non_chat_models_are_invoked_without_streaming():
+    assert stream_kwargs(FakeListLLM(responses=["ok"])) == {}
@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import index_store, summary_tree
+from utils.summary_tree import build_summary_context, build_summary_tree, get_or_schedule_summary_trees
+
+
+class FakeLLM:
+    """LLM palsu: ringkasan berisi nomor panggilan, prompt yang mengandung "GAGAL" melempar error"""
+
+    model_name = "fake"
+
+    def __init__(self):
+        self.prompts = []
+
+    def batch(self, prompts, config=None, return_exceptions=False):
+        results = []
+        for prompt in prompts:
+            self.prompts.append(prompt)
+            results.append(ValueError("gagal") if "GAGAL" in prompt else f"ringkasan {len(self.prompts)}")
+        return results
+
+
+class FakeDocstore:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def search(self, doc_id):
+        return self.docs[doc_id]
+
+
+class FakeVectorStore:
+    def __init__(self, texts):
+        from langchain_core.documents import Document
+
+        self.index_to_docstore_id = {i: f"doc-{i}" for i in range(len(texts))}
+        self.docstore = FakeDocstore({f"doc-{i}": Document(page_content=text, metadata={"page": i})
+                                      for i, text in enumerate(texts)})
+
+
+def _chunks(count, chars=40):
+    return [(f"bagian {i} " + "x" * chars, {"page": i}) for i in range(count)]
+
+
+def test_build_summary_tree_levels_and_pages(monkeypatch):
+    monkeypatch.setattr(summary_tree, "LEAF_TOKENS", 20)
+    monkeypatch.setattr(summary_tree, "SECTION_FANOUT", 2)
+    llm = FakeLLM()
+    tree = build_summary_tree(_chunks(8), llm, "laporan.pdf")
+
+    # 8 chunk x ~12 token -> 8 daun, lalu 4 -> 2 bagian, lalu ringkasan dokumen
+    assert [len(level) for level in tree["levels"]] == [8, 4, 2]
+    assert tree["llm_calls"] == 8 + 4 + 2 + 1 == len(llm.prompts)
+    assert tree["levels"][1][0]["pages"] == [0, 1]
+    assert tree["levels"][-1][1]["pages"] == [4, 7]
+    assert "laporan.pdf" in llm.prompts[-1]
+    assert tree["summary"] == f"ringkasan {len(llm.prompts)}"
+
+
+def test_build_summary_tree_uses_text_when_llm_fails(monkeypatch):
+    monkeypatch.setattr(summary_tree, "LEAF_TOKENS", 20)
+    chunks = _chunks(3)
+    chunks[1] = ("GAGAL " + "y" * 40, {"page": 1})
+    tree = build_summary_tree(chunks, FakeLLM(), "laporan.pdf")
+    assert tree["levels"][0][1]["summary"].startswith("GAGAL")
+    assert tree["levels"][0][0]["summary"].startswith("ringkasan")
+
+
+def test_short_document_is_summarized_in_one_call():
+    llm = FakeLLM()
+    tree = build_summary_tree(_chunks(3), llm, "catatan.txt")
+    assert tree["levels"] == [] and tree["llm_calls"] == 1
+
+
+def test_build_summary_context_respects_token_budget():
+    tree = {
+        "filename": "laporan.pdf",
+        "summary": "Ringkasan dokumen.",
+        "levels": [[{"summary": "s" * 40, "children": [], "pages": [0, 0]},
+                    {"summary": "t" * 400, "children": [], "pages": [1, 3]}]]
+    }
+    context = build_summary_context([tree], max_tokens=40)
+    assert context.startswith("### laporan.pdf\nRingkasan dokumen.")
+    assert "- (halaman 1) " + "s" * 40 in context
+    assert "t" * 400 not in context
+
+
+def test_trees_are_built_lazily_and_cache_is_bounded(monkeypatch):
+    saved = {}
+    monkeypatch.setattr(index_store, "save_summary_tree", lambda key, tree: saved.__setitem__(key, tree))
+    monkeypatch.setattr(index_store, "load_summary_tree", lambda key: saved.get(key))
+    monkeypatch.setattr(summary_tree, "_trees", OrderedDict())
+    monkeypatch.setattr(summary_tree, "_status", OrderedDict())
+    monkeypatch.setattr(summary_tree, "SUMMARY_TREE_CACHE_ENTRIES", 1)
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(summary_tree, "_executor", executor)
+    files = {
+        f"hash-{name}": {"info": {"store_key": f"key-{name}", "filename": name},
+                         "vectorstore": FakeVectorStore([f"isi {name}"])}
+        for name in ("a.pdf", "b.pdf")
+    }
+
+    # Tanpa LLM tidak ada yang dijadwalkan
+    assert get_or_schedule_summary_trees(files) is None
+    assert summary_tree.get_summary_status("key-a.pdf") is None
+
+    # Pertanyaan seluruh dokumen pertama menjadwalkan pohon dan dijawab dari retrieval
+    assert get_or_schedule_summary_trees(files, FakeLLM()) is None
+    # Satu worker: job kosong ini selesai setelah kedua pohon dibangun
+    executor.submit(lambda: None).result(timeout=10)
+    assert set(saved) == {"key-a.pdf", "key-b.pdf"}
+
+    trees = get_or_schedule_summary_trees(files, FakeLLM())
+    assert [tree["filename"] for tree in trees] == ["a.pdf", "b.pdf"]
+    assert summary_tree.get_summary_status("key-b.pdf") == "done"
+    # Hanya satu pohon di memori; status "done" tidak disimpan terpisah
+    assert len(summary_tree._trees) == 1
+    assert len(summary_tree._status) == 0
+    executor.shutdown()
@@ -0,0 +1,44 @@
+import pytest
+from langchain_core.documents import Document
+
+from utils.embedding_pipeline import count_tokens
+from utils.text_splitter import TokenTextSplitter
+
+TEXT = "\n\n".join(
+    " ".join(f"Kalimat {p}.{s} membahas pendapatan, biaya, dan risiko kuartal {s % 4 + 1}." for s in range(12))
+    for p in range(20)
+)
+
+
+@pytest.mark.parametrize("chunk_size,chunk_overlap", [(32, 0), (64, 8), (128, 12), (256, 32)])
+def test_chunks_respect_token_limit(chunk_size, chunk_overlap):
+    chunks = TokenTextSplitter(chunk_size, chunk_overlap).split_text(TEXT)
+    assert len(chunks) > 1
+    assert max(count_tokens(chunk) for chunk in chunks) <= chunk_size
+    # Tidak ada kata yang hilang
+    assert set(TEXT.split()) == {word for chunk in chunks for word in chunk.split()}
+
+
+def test_oversized_words_are_split_by_tokens():
+    text = "awal " + "x" * 5000 + " akhir"
+    chunks = TokenTextSplitter(50, 5).split_text(text)
+    assert max(count_tokens(chunk) for chunk in chunks) <= 50
+    assert "".join(chunks).count("x") >= 5000
+
+
+def test_short_text_is_single_chunk():
+    assert TokenTextSplitter(128, 12).split_text("  Pendapatan naik 10%.  ") == ["Pendapatan naik 10%."]
+
+
+def test_split_documents_copies_metadata():
+    splitter = TokenTextSplitter(32, 4)
+    docs = splitter.split_documents([Document(page_content=TEXT[:2000], metadata={"source": "a.pdf", "page": 3})])
+    assert len(docs) > 1
+    assert all(doc.metadata == {"source": "a.pdf", "page": 3} for doc in docs)
+    docs[0].metadata["page"] = 99
+    assert docs[1].metadata["page"] == 3
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        TokenTextSplitter(32, 32)
@@ -0,0 +1,110 @@
+import io
+import logging
+import os
+import stat
+import time
+from pathlib import Path
+
+import pytest
+
+from utils import upload_store
+
+
+class _Upload(io.BytesIO):
+    name = "laporan.pdf"
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(upload_store, "APP_DATA_DIR", tmp_path)
+    monkeypatch.setattr(upload_store, "UPLOAD_DIR", tmp_path / "uploads")
+    monkeypatch.setattr(upload_store, "_usage_bytes", None)
+    return tmp_path / "uploads"
+
+
+def test_session_token_roundtrip_and_tampering():
+    token = upload_store.sign_session_id("abc123")
+    assert upload_store.verify_session_token(token) == "abc123"
+    assert upload_store.verify_session_token("abc123") is None
+    assert upload_store.verify_session_token(token.replace("abc123", "abc124")) is None
+    assert upload_store.verify_session_token(None) is None
+
+
+def test_session_claimed_by_active_tab_is_not_shared(monkeypatch):
+    monkeypatch.setattr(upload_store, "_is_active_runtime_session", lambda owner: owner == "tab-1")
+    assert upload_store.claim_upload_session("sesi-x", "tab-1")
+    assert not upload_store.claim_upload_session("sesi-x", "tab-2")
+    # Tab lama sudah terputus (refresh): tab baru boleh mengambil alih
+    monkeypatch.setattr(upload_store, "_is_active_runtime_session", lambda owner: False)
+    assert upload_store.claim_upload_session("sesi-x", "tab-2")
+
+
+def test_remove_session_uploads_keeps_pinned_files(upload_dir):
+    pinned = upload_store.store_upload(_Upload(b"isi pdf"), "a" * 64, "sesi", pin=True)
+    free = upload_store.store_upload(_Upload(b"isi lain"), "b" * 64, "sesi")
+
+    assert upload_store.remove_session_uploads("sesi") == 1
+    assert (upload_dir / "sesi").exists()
+    assert not Path(free).exists()
+
+    upload_store.release_upload(pinned)
+    assert upload_store.remove_session_uploads("sesi") == 0
+    assert not (upload_dir / "sesi").exists()
+
+
+def test_upload_dirs_are_private(upload_dir):
+    path = Path(upload_store.store_upload(_Upload(b"isi"), "a" * 64, "sesi"))
+    assert path.parent == upload_dir / "sesi"
+    assert stat.S_IMODE(os.stat(upload_dir).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+
+
+def test_quota_tracks_usage_without_rescanning(upload_dir, monkeypatch, caplog):
+    scans = []
+    scan = upload_store._scan_uploads
+    monkeypatch.setattr(upload_store, "_scan_uploads", lambda: scans.append(1) or scan())
+    caplog.set_level(logging.INFO)
+
+    upload_store.store_upload(_Upload(b"x" * 10), "a" * 64, "sesi")
+    upload_store.store_upload(_Upload(b"y" * 20), "b" * 64, "sesi")
+    # Hanya pemindaian awal; tulis berikutnya menambah total secara bertahap
+    assert len(scans) == 1
+    assert upload_store._usage_bytes == 30
+    assert upload_store.enforce_upload_quota(max_bytes=100) == 0
+    assert "dihapus" not in caplog.text
+
+    upload_store.remove_session_uploads("sesi")
+    assert upload_store._usage_bytes == 0
+    assert len(scans) == 1
+
+
+def test_quota_evicts_least_recently_used(upload_dir, monkeypatch, caplog):
+    monkeypatch.setattr(upload_store, "UPLOAD_MIN_AGE_SECONDS", 0)
+    caplog.set_level(logging.INFO)
+    old = upload_store.store_upload(_Upload(b"x" * 10), "a" * 64, "sesi")
+    os.utime(old, (time.time() - 60, time.time() - 60))
+    pinned = upload_store.store_upload(_Upload(b"y" * 10), "b" * 64, "sesi", pin=True)
+    os.utime(pinned, (time.time() - 120, time.time() - 120))
+
+    # Semua file dipakai/masih di bawah kuota: tidak ada yang dihapus dan tidak ada log "dihapus"
+    assert upload_store.enforce_upload_quota(max_bytes=20) == 0
+    assert "dihapus" not in caplog.text
+
+    assert upload_store.enforce_upload_quota(max_bytes=15) == 10
+    assert not Path(old).exists() and Path(pinned).exists()
+    assert upload_store._usage_bytes == 10
+    assert "dihapus" in caplog.text
+    upload_store.release_upload(pinned)
+
+
+def test_disconnected_session_owners_are_evicted(monkeypatch):
+    monkeypatch.setattr(upload_store, "_session_owners", {})
+    active = {"tab-1", "tab-2"}
+    monkeypatch.setattr(upload_store, "_is_active_runtime_session", lambda owner: owner in active)
+    assert upload_store.claim_upload_session("sesi-1", "tab-1")
+    assert upload_store.claim_upload_session("sesi-2", "tab-2")
+
+    # Tab 1 ditutup: klaimnya dibuang saat sesi berikutnya mengklaim
+    active.discard("tab-1")
+    assert upload_store.claim_upload_session("sesi-3", None)
+    assert set(upload_store._session_owners) == {"sesi-2", "sesi-3"}
@@ -0,0 +1,196 @@
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+
+from utils.corpus import DocumentCorpus
+from utils.embeddings import HashingEmbeddings
+from utils.vector_index import (ShardedIndex, build_faiss_index, delete_from_vectorstore, optimize_vectorstore_index,
+                                reconstruct_all)
+
+
+def _vectors(count, dim=16, seed=0):
+    return np.random.default_rng(seed).random((count, dim), dtype=np.float32)
+
+
+def test_sharded_index_matches_flat_search():
+    vectors = _vectors(250)
+    flat = faiss.IndexFlatL2(16)
+    flat.add(vectors)
+    sharded = ShardedIndex(faiss.IndexFlatL2(16), shard_size=100)
+    sharded.add(vectors[:120])
+    sharded.add(vectors[120:])
+    assert [shard.ntotal for shard in sharded.shards] == [100, 100, 50]
+
+    queries = _vectors(5, seed=1)
+    expected_distances, expected_labels = flat.search(queries, 7)
+    distances, labels = sharded.search(queries, 7)
+    np.testing.assert_array_equal(labels, expected_labels)
+    np.testing.assert_allclose(distances, expected_distances, rtol=1e-5)
+    np.testing.assert_allclose(sharded.reconstruct(150), vectors[150])
+
+
+def _corpus_vectorstore(texts):
+    from langchain_community.vectorstores import FAISS
+
+    return FAISS.from_texts(texts, HashingEmbeddings())
+
+
+def test_corpus_remove_file_keeps_other_results():
+    embeddings = HashingEmbeddings()
+    corpus = DocumentCorpus(embeddings, "local", vector_compression="none")
+    first = _corpus_vectorstore([f"invoice INV-{i} pendapatan" for i in range(30)])
+    second = _corpus_vectorstore([f"rencana ekspansi cabang {i}" for i in range(20)])
+    corpus.add_built_file("a", first, {"filename": "a.pdf", "processing_time": 0})
+    corpus.add_built_file("b", second, {"filename": "b.pdf", "processing_time": 0})
+    assert corpus.chunk_count == 50
+    # Indeks file dipakai langsung, tidak disalin ke indeks korpus
+    assert corpus.files["b"]["vectorstore"].index is second.index
+
+    docs = corpus.as_retriever(k=3).invoke("INV-7")
+    assert docs[0].page_content == "invoice INV-7 pendapatan" and docs[0].metadata["filename"] == "a.pdf"
+    assert "filename" not in first.docstore.search(first.index_to_docstore_id[7]).metadata
+
+    corpus.remove_file("a")
+    assert corpus.chunk_count == 20 and first.index.ntotal == 30
+    docs = corpus.as_retriever(k=3).invoke("rencana ekspansi cabang 7")
+    assert docs[0].page_content == "rencana ekspansi cabang 7"
+    assert all(doc.metadata["filename"] == "b.pdf" for doc in docs)
+
+
+def test_corpus_shares_stored_indexes_between_sessions(tmp_path, monkeypatch):
+    from utils import index_store
+
+    monkeypatch.setattr(index_store, "APP_DATA_DIR", tmp_path)
+    monkeypatch.setattr(index_store, "INDEX_STORE_DIR", tmp_path / "indexes")
+    monkeypatch.setattr(index_store, "_loaded_indexes", index_store.OrderedDict())
+    monkeypatch.setattr(index_store, "_lexical_indexes", {})
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    texts = [f"chunk {i} SKU-{i}" for i in range(3000)]
+    vectors = np.asarray(HashingEmbeddings().embed_documents(texts), dtype=np.float32)
+    index = _ivf_pq_index(vectors)
+    index.reset()
+    vectorstore = FAISS(HashingEmbeddings(), index, InMemoryDocstore(), {})
+    vectorstore.add_embeddings(list(zip(texts, vectors)))
+    index_store.save_vectorstore("kunci", vectorstore, {})
+
+    corpora = []
+    for _ in range(2):
+        corpus = DocumentCorpus(HashingEmbeddings(), "local")
+        loaded, _ = index_store.load_vectorstore("kunci", HashingEmbeddings())
+        corpus.add_built_file("f", loaded, {"filename": "data.csv", "processing_time": 0, "store_key": "kunci"})
+        corpora.append(corpus)
+    first, second = (corpus.files["f"] for corpus in corpora)
+    assert first["vectorstore"].index is second["vectorstore"].index
+    assert first["vectorstore"].docstore is second["vectorstore"].docstore
+    assert first["lexical_index"] is second["lexical_index"]
+
+    docs = corpora[1].as_retriever(k=1).invoke("SKU-1234")
+    assert docs[0].page_content == "chunk 1234 SKU-1234" and docs[0].metadata["filename"] == "data.csv"
+
+
+def test_delete_from_sharded_vectorstore_with_id_array():
+    from langchain_community.vectorstores import FAISS
+
+    from utils.chunk_store import ColumnarDocstore, IdArray
+
+    vectors = _vectors(30)
+    docstore = ColumnarDocstore()
+    ids = docstore.new_ids(30)
+    index = ShardedIndex(faiss.IndexFlatL2(16), shard_size=10)
+    vectorstore = FAISS(HashingEmbeddings(), index, docstore, {})
+    vectorstore.add_embeddings([(f"chunk {i}", vector) for i, vector in enumerate(vectors)], ids=ids)
+    vectorstore.index_to_docstore_id = IdArray(vectorstore.index_to_docstore_id.values())
+
+    delete_from_vectorstore(vectorstore, ids[5:25])
+    assert index.ntotal == 10
+    assert list(vectorstore.index_to_docstore_id.values()) == [0, 1, 2, 3, 4, 25, 26, 27, 28, 29]
+    _, labels = index.search(vectors[[27]], 1)
+    assert vectorstore.docstore.search(vectorstore.index_to_docstore_id[labels[0][0]]) == \
+        Document(page_content="chunk 27")
+
+
+def _ivf_pq_index(vectors):
+    return build_faiss_index(vectors, {"type": "ivf_pq", "factory": "IVF8,PQ4x4", "nlist": 8, "nprobe": 8})
+
+
+def test_sharded_remove_ids_shifts_labels_across_shards():
+    vectors = _vectors(250)
+    sharded = ShardedIndex(faiss.IndexFlatL2(16), shard_size=100)
+    sharded.add(vectors)
+    removed = [3, 99, 100, 150, 249]
+    assert sharded.remove_ids(np.array(removed)) == 5
+    assert sharded.ntotal == 245
+    keep = np.setdiff1d(np.arange(250), removed)
+    np.testing.assert_allclose(reconstruct_all(sharded), vectors[keep])
+    _, labels = sharded.search(vectors[[151]], 1)
+    assert keep[labels[0][0]] == 151
+
+
+def test_sharded_remove_ids_on_ivf_shards():
+    vectors = _vectors(3000)
+    template = _ivf_pq_index(vectors)
+    template.reset()
+    sharded = ShardedIndex(template, shard_size=1000)
+    sharded.add(vectors)
+    before = reconstruct_all(sharded)
+    removed = np.arange(500, 1500)
+    sharded.remove_ids(removed)
+    assert [shard.ntotal for shard in sharded.shards] == [500, 500, 1000]
+    keep = np.setdiff1d(np.arange(3000), removed)
+    np.testing.assert_array_equal(reconstruct_all(sharded), before[keep])
+
+
+def test_sharded_reconstruct_n_reads_only_covering_shards():
+    vectors = _vectors(250)
+    sharded = ShardedIndex(faiss.IndexFlatL2(16), shard_size=100)
+    sharded.add(vectors)
+    np.testing.assert_allclose(sharded.reconstruct_n(95, 10), vectors[95:105])
+    np.testing.assert_allclose(sharded.reconstruct_n(240, 50), vectors[240:])
+
+    class Untouchable:
+        ntotal = 100
+
+        def reconstruct_n(self, i0, ni):
+            raise AssertionError("shard di luar rentang ikut direkonstruksi")
+
+    # Shard pertama tidak direkonstruksi untuk rentang di shard terakhir
+    sharded.shards[0] = Untouchable()
+    np.testing.assert_allclose(sharded.reconstruct_n(210, 5), vectors[210:215])
+
+
+def _ivf_pq_vectorstore(vectors):
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    docs = {f"id-{i}": Document(page_content=f"chunk {i}") for i in range(len(vectors))}
+    return FAISS(HashingEmbeddings(), _ivf_pq_index(vectors), InMemoryDocstore(docs),
+                 {i: f"id-{i}" for i in range(len(vectors))})
+
+
+def test_delete_from_ivf_pq_keeps_codes_of_remaining_vectors():
+    vectors = _vectors(3000)
+    vectorstore = _ivf_pq_vectorstore(vectors)
+    before = reconstruct_all(vectorstore.index)
+
+    delete_from_vectorstore(vectorstore, [f"id-{i}" for i in range(0, 3000, 3)])
+    keep = np.array([i for i in range(3000) if i % 3])
+    assert vectorstore.index.ntotal == len(keep)
+    # Tidak ada kuantisasi ulang: rekonstruksi vektor yang tersisa identik
+    np.testing.assert_array_equal(reconstruct_all(vectorstore.index), before[keep])
+    assert [vectorstore.index_to_docstore_id[label] for label in (0, 1, 2)] == ["id-1", "id-2", "id-4"]
+    _, labels = vectorstore.index.search(before[[1000]], 1)
+    assert vectorstore.index_to_docstore_id[labels[0][0]] == "id-1000"
+
+
+def test_optimize_never_rebuilds_from_quantized_reconstructions():
+    vectors = _vectors(3000)
+    vectorstore = _ivf_pq_vectorstore(vectors)
+    pq_index = vectorstore.index
+    # 3000 vektor cukup untuk Flat, tetapi indeks PQ tidak menyimpan vektor asli
+    assert optimize_vectorstore_index(vectorstore)["type"] == "ivf_pq"
+    assert vectorstore.index is pq_index
+
+    assert optimize_vectorstore_index(vectorstore, vectors=vectors)["type"] == "flat"
+    np.testing.assert_array_equal(reconstruct_all(vectorstore.index), vectors)
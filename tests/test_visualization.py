@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from utils.visualization import compute_financial_summary
+
+
+def test_financial_summary_ratios_use_latest_period():
+    df = pd.DataFrame({
+        "Periode": ["2022", "2023"],
+        "Pendapatan": [1000.0, 2000.0],
+        "Beban Operasional": [-600.0, -750.0],
+        "Laba Bersih": [400.0, 500.0],
+    })
+    summary = compute_financial_summary(df, ["Pendapatan", "Beban Operasional", "Laba Bersih"])
+
+    assert summary["totals"] == {"Pendapatan": 3000.0, "Beban Operasional": -1350.0, "Laba Bersih": 900.0}
+    assert summary["latest"] == {"Pendapatan": 2000.0, "Beban Operasional": -750.0, "Laba Bersih": 500.0}
+    # Biaya negatif "(750)" dihitung sebagai nilai absolutnya
+    assert summary["ratios"] == {
+        "Margin Laba Bersih": pytest.approx(25.0),
+        "Beban Operasional / Pendapatan": pytest.approx(37.5),
+    }
+
+
+def test_financial_summary_skips_ratios_without_revenue():
+    df = pd.DataFrame({"Pendapatan": [1000.0, 0.0], "Laba": [100.0, 50.0], "Catatan": ["a", "b"]})
+    summary = compute_financial_summary(df, ["Pendapatan", "Laba", "Catatan"])
+    # Kolom non-numerik diabaikan; pendapatan periode terakhir 0 sehingga rasio tidak dihitung
+    assert set(summary["totals"]) == {"Pendapatan", "Laba"}
+    assert summary["ratios"] == {}
+
+
+def test_financial_summary_latest_ignores_missing_values():
+    df = pd.DataFrame({"Penjualan": [100.0, 200.0, None], "Biaya": [50.0, 80.0, None]})
+    summary = compute_financial_summary(df, ["Penjualan", "Biaya"])
+    assert summary["latest"] == {"Penjualan": 200.0, "Biaya": 80.0}
+    assert summary["ratios"] == {"Biaya / Penjualan": pytest.approx(40.0)}
@@ -0,0 +1,326 @@
+# Docstore kolumnar yang ringkas: teks chunk dalam satu buffer UTF-8 + kolom metadata
+import copy
+from array import array
+
+import numpy as np
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_core.documents import Document
+
+# Penanda nilai kosong pada kolom integer
+_MISSING_INT = -(2 ** 63)
+# Pemadatan buffer dilakukan jika jumlah chunk terhapus melewati batas ini
+_COMPACT_MIN_DEAD = 1000
+
+def _freeze(value):
+    """Kunci hashable untuk interning nilai metadata (list/dict juga didukung)"""
+    if isinstance(value, list):
+        return ("__list__", tuple(_freeze(item) for item in value))
+    if isinstance(value, dict):
+        return ("__dict__", tuple(sorted((key, _freeze(item)) for key, item in value.items())))
+    return (type(value).__name__, value)
+
+class _IntColumn:
+    """Kolom metadata integer (page, row_start, ...) dalam array int64"""
+
+    def __init__(self, rows):
+        self.values = array("q", [_MISSING_INT]) * rows
+
+    def accepts(self, value):
+        return type(value) is int
+
+    def append(self, value):
+        self.values.append(value)
+
+    def pad(self):
+        self.values.append(_MISSING_INT)
+
+    def get(self, row):
+        value = self.values[row]
+        return None if value == _MISSING_INT else value
+
+    def compact(self, mask):
+        values = array("q")
+        values.frombytes(np.frombuffer(self.values, dtype=np.int64)[mask].tobytes())
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+class _InternedColumn:
+    """Kolom metadata berulang (source, filename, type) sebagai kode ke tabel nilai unik"""
+
+    def __init__(self, rows):
+        self.codes = array("i", [-1]) * rows
+        self.table = []
+        self._lookup = {}
+
+    @classmethod
+    def from_int_column(cls, column):
+        interned = cls(0)
+        for row in range(len(column)):
+            value = column.get(row)
+            if value is None:
+                interned.pad()
+            else:
+                interned.append(value)
+        return interned
+
+    def accepts(self, value):
+        return True
+
+    def append(self, value):
+        key = _freeze(value)
+        code = self._lookup.get(key)
+        if code is None:
+            code = self._lookup[key] = len(self.table)
+            self.table.append(value)
+        self.codes.append(code)
+
+    def pad(self):
+        self.codes.append(-1)
+
+    def get(self, row):
+        code = self.codes[row]
+        if code < 0:
+            return None
+        value = self.table[code]
+        # Salinan agar perubahan pada Document hasil materialisasi tidak mengubah tabel
+        return copy.deepcopy(value) if isinstance(value, (list, dict)) else value
+
+    def compact(self, mask):
+        codes = array("i")
+        codes.frombytes(np.frombuffer(self.codes, dtype=np.int32)[mask].tobytes())
+        self.codes = codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes)
+
+class IdArray:
+    """
+    Pemetaan label FAISS -> ID docstore (integer) dalam satu array int64.
+
+    Pengganti dict index_to_docstore_id langchain untuk indeks tersimpan: 8 byte per
+    chunk, bukan entri dict plus objek ID. Mendukung operasi yang dipakai
+    langchain FAISS (len, [label], get, update berurutan, items, values).
+    """
+
+    def __init__(self, ids=()):
+        self._ids = array("q", ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, label):
+        label = int(label)
+        if not 0 <= label < len(self._ids):
+            raise KeyError(label)
+        return self._ids[label]
+
+    def get(self, label, default=None):
+        try:
+            return self[label]
+        except KeyError:
+            return default
+
+    def __contains__(self, label):
+        return isinstance(label, (int, np.integer)) and 0 <= label < len(self._ids)
+
+    def __iter__(self):
+        return iter(range(len(self._ids)))
+
+    def keys(self):
+        return range(len(self._ids))
+
+    def values(self):
+        return iter(self._ids)
+
+    def items(self):
+        return enumerate(self._ids)
+
+    def update(self, mapping):
+        """Menambahkan label baru; label harus melanjutkan label terakhir (seperti FAISS.add)"""
+        for label, doc_id in sorted(mapping.items()):
+            if label != len(self._ids):
+                raise ValueError(f"Label {label} tidak berurutan (berikutnya {len(self._ids)})")
+            self._ids.append(doc_id)
+
+    def mask_of(self, doc_ids):
+        """Array boolean per label: True jika ID-nya termasuk doc_ids"""
+        ids = np.frombuffer(self._ids, dtype=np.int64) if len(self._ids) else np.empty(0, dtype=np.int64)
+        return np.isin(ids, np.fromiter(doc_ids, dtype=np.int64))
+
+    def compact(self, keep):
+        """Membuang label yang tidak dipertahankan (label sisanya bergeser, seperti FAISS.remove_ids)"""
+        ids = array("q")
+        if len(self._ids):
+            ids.frombytes(np.frombuffer(self._ids, dtype=np.int64)[keep].tobytes())
+        self._ids = ids
+
+    @property
+    def nbytes(self):
+        return self._ids.itemsize * len(self._ids)
+
+class ColumnarDocstore(Docstore, AddableMixin):
+    """
+    Pengganti InMemoryDocstore untuk indeks tersimpan yang dimuat (dipakai bersama antar sesi).
+
+    Teks semua chunk disimpan dalam satu buffer UTF-8 dengan array offset, dan
+    metadata disimpan per kolom (integer langsung di array, nilai lain di-intern).
+    Document hanya dibuat saat dicari (top-k hasil retrieval). Di luar teks,
+    docstore ini memakai 4-8 byte per kolom metadata dan 25 byte per chunk
+    untuk offset, penanda hapus, dan pemetaan ID, bukan ratusan byte untuk objek
+    Document, string, dan dict metadata.
+
+    ID dokumen adalah nomor urut integer (0, 1, ...) yang dibuat oleh new_ids();
+    dipakai bersama IdArray dan BM25Index(int_keys=True), ID tidak pernah menjadi
+    objek string per chunk. ID lain tetap didukung lewat tabel pemetaan tambahan.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets = array("q", [0])
+        self._alive = bytearray()
+        self._alive_count = 0
+        self._columns = {}
+        # nomor urut ID -> baris (-1 jika sudah dihapus)
+        self._serial_rows = array("q")
+        self._custom_ids = {}
+
+    def __len__(self):
+        return self._alive_count
+
+    def __contains__(self, doc_id):
+        return self._row(doc_id) >= 0
+
+    @property
+    def nbytes(self):
+        """Perkiraan memori buffer dan kolom (tanpa tabel nilai unik)"""
+        return (len(self._buffer) + self._offsets.itemsize * len(self._offsets) + len(self._alive)
+                + self._serial_rows.itemsize * len(self._serial_rows)
+                + sum(column.nbytes for column in self._columns.values()))
+
+    def new_ids(self, n):
+        """ID untuk n dokumen berikutnya yang akan ditambahkan (range integer, tanpa tabel pemetaan)"""
+        start = len(self._serial_rows)
+        return range(start, start + n)
+
+    def _serial(self, doc_id):
+        if isinstance(doc_id, (int, np.integer)) and doc_id >= 0:
+            return int(doc_id)
+        serial = self._custom_ids.get(doc_id)
+        if serial is None and isinstance(doc_id, str) and doc_id.isdigit():
+            serial = int(doc_id)
+        return serial
+
+    def _row(self, doc_id):
+        serial = self._serial(doc_id)
+        if serial is None or serial >= len(self._serial_rows):
+            return -1
+        return self._serial_rows[serial]
+
+    def add(self, texts):
+        """Menambahkan dict {id: Document} (dipanggil oleh FAISS.add_embeddings)"""
+        existing = [doc_id for doc_id in texts if doc_id in self]
+        if existing:
+            raise ValueError(f"Tried to add ids that already exist: {existing}")
+
+        for doc_id, doc in texts.items():
+            serial = len(self._serial_rows)
+            row = len(self._alive)
+            if isinstance(doc_id, (int, np.integer)):
+                if doc_id != serial:
+                    raise ValueError(f"ID integer harus sama dengan nomor urut berikutnya ({serial}): {doc_id}")
+            elif doc_id != str(serial):
+                self._custom_ids[doc_id] = serial
+            self._serial_rows.append(row)
+
+            self._buffer += doc.page_content.encode("utf-8")
+            self._offsets.append(len(self._buffer))
+            self._alive.append(1)
+            self._alive_count += 1
+
+            for key, value in doc.metadata.items():
+                if value is None:
+                    continue
+                column = self._columns.get(key)
+                if column is None:
+                    column = self._columns[key] = (_IntColumn if type(value) is int else _InternedColumn)(row)
+                elif not column.accepts(value):
+                    column = self._columns[key] = _InternedColumn.from_int_column(column)
+                column.append(value)
+            for column in self._columns.values():
+                if len(column) == row:
+                    column.pad()
+
+    def _materialize(self, row):
+        text = self._buffer[self._offsets[row]:self._offsets[row + 1]].decode("utf-8")
+        metadata = {}
+        for key, column in self._columns.items():
+            value = column.get(row)
+            if value is not None:
+                metadata[key] = value
+        return Document(page_content=text, metadata=metadata)
+
+    def search(self, search):
+        """Membuat Document untuk satu ID (pesan string jika tidak ada, seperti InMemoryDocstore)"""
+        row = self._row(search)
+        if row < 0:
+            return f"ID {search} not found."
+        return self._materialize(row)
+
+    def get_text(self, doc_id):
+        """Teks chunk tanpa membuat Document (None jika tidak ada)"""
+        row = self._row(doc_id)
+        if row < 0:
+            return None
+        return self._buffer[self._offsets[row]:self._offsets[row + 1]].decode("utf-8")
+
+    def delete(self, ids):
+        """Menghapus dokumen (tombstone; buffer dipadatkan jika banyak yang terhapus)"""
+        missing = [doc_id for doc_id in ids if doc_id not in self]
+        if missing:
+            raise ValueError(f"Tried to delete ids that does not exist: {missing}")
+
+        for doc_id in ids:
+            serial = self._serial(doc_id)
+            row = self._serial_rows[serial]
+            self._alive[row] = 0
+            self._alive_count -= 1
+            self._serial_rows[serial] = -1
+            self._custom_ids.pop(doc_id, None)
+
+        dead = len(self._alive) - self._alive_count
+        if dead > _COMPACT_MIN_DEAD and dead > self._alive_count:
+            self._compact()
+
+    def _compact(self):
+        """Membuang teks dan metadata chunk yang sudah dihapus"""
+        mask = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        offsets = np.frombuffer(self._offsets, dtype=np.int64)
+        starts, ends = offsets[:-1][mask], offsets[1:][mask]
+
+        buffer = bytearray()
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            buffer += self._buffer[start:end]
+        new_offsets = array("q", [0])
+        new_offsets.frombytes(np.cumsum(ends - starts, dtype=np.int64).tobytes())
+
+        new_rows = np.cumsum(mask, dtype=np.int64) - 1
+        serial_rows = np.frombuffer(self._serial_rows, dtype=np.int64)
+        remapped = np.where(serial_rows >= 0, new_rows[np.maximum(serial_rows, 0)], -1)
+        self._serial_rows = array("q")
+        self._serial_rows.frombytes(remapped.astype(np.int64).tobytes())
+
+        for column in self._columns.values():
+            column.compact(mask)
+        self._buffer = buffer
+        self._offsets = new_offsets
+        self._alive = bytearray(b"\x01") * self._alive_count
@@ -0,0 +1,223 @@
+# Korpus multi-dokumen di atas indeks per file yang dipakai bersama, dengan tambah/hapus bertahap
+import logging
+import time
+import uuid
+
+class CorpusDocstore:
+    """Docstore gabungan: kunci chunk berupa (file_hash, id chunk di docstore file)"""
+
+    def __init__(self, entries):
+        self._entries = entries
+
+    def search(self, search):
+        file_hash, doc_id = search
+        entry = self._entries.get(file_hash)
+        if entry is None:
+            return f"ID {search} not found."
+        doc = entry["vectorstore"].docstore.search(doc_id)
+        if isinstance(doc, str):
+            return doc
+        # Salin metadata: docstore file dipakai bersama antar sesi
+        return type(doc)(page_content=doc.page_content, metadata={**doc.metadata, "filename": entry["info"]["filename"]})
+
+class CorpusIdMapping:
+    """Label IndexUnion -> kunci chunk (file_hash, id chunk), seperti index_to_docstore_id langchain"""
+
+    def __init__(self, union, file_hashes, vectorstores):
+        self._union = union
+        self._file_hashes = file_hashes
+        self._vectorstores = vectorstores
+
+    def __len__(self):
+        return self._union.ntotal
+
+    def __getitem__(self, label):
+        position, local_label = self._union.locate(label)
+        return self._file_hashes[position], self._vectorstores[position].index_to_docstore_id[local_label]
+
+class CorpusVectorStore:
+    """
+    Tampilan vectorstore korpus untuk HybridRetriever tanpa menyalin indeks per file.
+
+    Menyediakan atribut yang dipakai retriever (embedding_function, index,
+    index_to_docstore_id, docstore); pencarian vektor dijalankan pada indeks
+    tiap file (lihat IndexUnion) lalu digabung.
+    """
+
+    def __init__(self, embedding_function, entries):
+        from utils.vector_index import IndexUnion
+
+        file_hashes = list(entries)
+        vectorstores = [entries[file_hash]["vectorstore"] for file_hash in file_hashes]
+        self.embedding_function = embedding_function
+        self.index = IndexUnion(vectorstore.index for vectorstore in vectorstores)
+        self.index_to_docstore_id = CorpusIdMapping(self.index, file_hashes, vectorstores)
+        self.docstore = CorpusDocstore(entries)
+
+class CorpusLexicalIndex:
+    """Pencarian BM25 pada indeks leksikal tiap file, hasilnya digabung berdasarkan skor"""
+
+    def __init__(self, entries):
+        self._indexes = [(file_hash, entry["lexical_index"]) for file_hash, entry in entries.items()]
+
+    def __len__(self):
+        return sum(len(lexical_index) for _, lexical_index in self._indexes)
+
+    def search(self, query, k=5):
+        from utils.lexical_index import query_terms
+
+        # Term ditentukan untuk seluruh korpus: token utuh yang ada di file mana pun tidak dipecah di file lain
+        terms = query_terms(query, [lexical_index for _, lexical_index in self._indexes])
+        results = [((file_hash, doc_key), score)
+                   for file_hash, lexical_index in self._indexes
+                   for doc_key, score in lexical_index.search(query, k, terms=terms)]
+        return sorted(results, key=lambda result: result[1], reverse=True)[:k]
+
+class DocumentCorpus:
+    """
+    Kumpulan dokumen dalam satu sesi di atas indeks FAISS per file.
+
+    Indeks, docstore, dan indeks BM25 tiap file adalah salinan bersama dari
+    penyimpanan indeks (memory-mapped, dipakai semua sesi); korpus hanya
+    menyimpan referensinya. Pencarian dijalankan pada indeks tiap file lalu
+    hasilnya digabung, sehingga menambah file tidak menyalin vektornya dan
+    menghapus file cukup melepas referensinya tanpa meng-embed ulang dokumen lain.
+    """
+
+    def __init__(self, embeddings, embedding_backend=None, vector_compression="float16"):
+        from utils.retrieval_cache import RetrievalCache
+
+        self.embeddings = embeddings
+        # Backend embedding dipilih per korpus; semua file memakai backend yang sama
+        self.embedding_backend = embedding_backend
+        self.vector_compression = vector_compression
+        # file_hash -> {"info": metadata file, "vectorstore": vectorstore file, "lexical_index": BM25 file}
+        self.files = {}
+        # Versi indeks berganti setiap kali dokumen ditambah/dihapus (kunci cache retrieval)
+        self.version = uuid.uuid4().hex
+        self.retrieval_cache = RetrievalCache()
+        self.retrieval_cache.invalidate(self.version)
+
+    def __contains__(self, file_hash):
+        return file_hash in self.files
+
+    def __len__(self):
+        return len(self.files)
+
+    @property
+    def chunk_count(self):
+        return sum(entry["vectorstore"].index.ntotal for entry in self.files.values())
+
+    def add_file(self, uploaded_file, **processing_kwargs):
+        """
+        Menambahkan satu file ke korpus
+
+        Args:
+            uploaded_file: File yang diunggah
+            **processing_kwargs: Parameter untuk build_file_vectorstore (chunk_size, dll)
+
+        Returns:
+            Metadata file yang ditambahkan
+        """
+        from utils.file_processing import build_file_vectorstore, get_file_hash
+
+        file_hash = get_file_hash(uploaded_file)
+        if file_hash in self.files:
+            return self.files[file_hash]["info"]
+
+        processing_kwargs.setdefault("vector_compression", self.vector_compression)
+        file_vectorstore, info = build_file_vectorstore(uploaded_file, self.embeddings, **processing_kwargs)
+        return self.add_built_file(file_hash, file_vectorstore, info)
+
+    def add_built_file(self, file_hash, file_vectorstore, info):
+        """
+        Menambahkan vectorstore satu file yang sudah dibangun ke korpus
+
+        Dipakai oleh add_file dan untuk hasil job ingestion background; harus
+        dipanggil dari thread yang juga memakai retriever korpus. Vectorstore
+        file tidak disalin maupun diubah.
+
+        Args:
+            file_hash: Hash isi file
+            file_vectorstore: Vectorstore FAISS file (hasil build_file_vectorstore)
+            info: Metadata file
+
+        Returns:
+            Metadata file yang ditambahkan
+        """
+        if file_hash in self.files:
+            return self.files[file_hash]["info"]
+
+        start_time = time.time()
+        store_key = info.get("store_key")
+        if store_key:
+            # Indeks BM25 dipakai bersama semua sesi yang memuat indeks yang sama
+            from utils.index_store import get_lexical_index
+            lexical_index = get_lexical_index(store_key, file_vectorstore)
+        else:
+            from utils.lexical_index import build_lexical_index
+            lexical_index = build_lexical_index(file_vectorstore)
+
+        info["processing_time"] = round(info["processing_time"] + time.time() - start_time, 2)
+        self.files[file_hash] = {"info": info, "vectorstore": file_vectorstore, "lexical_index": lexical_index}
+        self._bump_version()
+        logging.info(f"{info['filename']} ditambahkan ke korpus ({file_vectorstore.index.ntotal} chunks)")
+        return info
+
+    def remove_file(self, file_hash):
+        """Melepas file dari korpus (indeks file lain tidak tersentuh)"""
+        entry = self.files.pop(file_hash, None)
+        if entry is None:
+            return False
+        self._bump_version()
+        logging.info(f"{entry['info']['filename']} dihapus dari korpus")
+        return True
+
+    def _bump_version(self):
+        """Versi indeks baru; hasil retrieval yang tersimpan tidak berlaku lagi"""
+        self.version = uuid.uuid4().hex
+        self.retrieval_cache.invalidate(self.version)
+
+    def as_retriever(self, k=5):
+        """Retriever hybrid (BM25 + vektor) atas seluruh korpus (None jika korpus kosong)"""
+        if not self.files:
+            return None
+        from utils.lexical_index import HybridRetriever
+        # Salinan dict: retriever lama tetap konsisten walaupun file ditambah/dihapus
+        entries = dict(self.files)
+        return HybridRetriever(vectorstore=CorpusVectorStore(self.embeddings, entries),
+                               lexical_index=CorpusLexicalIndex(entries), k=k,
+                               cache=self.retrieval_cache, index_version=self.version)
+
+    def index_params(self):
+        """Tipe indeks vektor per file (file kecil Flat, file besar IVF/IVF-PQ)"""
+        params = [entry["info"].get("index_params") or {} for entry in self.files.values()]
+        if not params:
+            return None
+        if len(params) == 1:
+            return params[0]
+        factories = sorted({param.get("factory", param.get("type", "?")) for param in params})
+        return {"type": "per_file", "factory": f"{len(params)} indeks per file ({', '.join(factories)})"}
+
+    def summary(self):
+        """Ringkasan korpus dengan format yang sama seperti file_info satu file"""
+        infos = [entry["info"] for entry in self.files.values()]
+        return {
+            "filename": ", ".join(info["filename"] for info in infos),
+            "file_count": len(infos),
+            "size_mb": round(sum(info.get("size_mb", 0) for info in infos), 2),
+            "doc_count": sum(info.get("doc_count", 0) for info in infos),
+            "chunk_count": self.chunk_count,
+            "processing_time": round(sum(info.get("processing_time", 0) for info in infos), 2),
+            "embedding_cache_hits": sum(info.get("embedding_cache_hits", 0) for info in infos),
+            "embedding_cache_misses": sum(info.get("embedding_cache_misses", 0) for info in infos),
+            "duplicate_chunks": sum(info.get("duplicate_chunks", 0) for info in infos),
+            "table_count": sum(info.get("table_count", 0) for info in infos),
+            "loaded_from_store": bool(infos) and all(info.get("loaded_from_store") for info in infos),
+            "embedding_backend": self.embedding_backend,
+            "index_params": self.index_params(),
+            # Docstore kolumnar per file dipakai bersama antar sesi (bukan memori per sesi)
+            "chunk_store_mb": round(sum(getattr(entry["vectorstore"].docstore, "nbytes", 0)
+                                        for entry in self.files.values()) / (1024 * 1024), 2),
+            "files": {file_hash: entry["info"] for file_hash, entry in self.files.items()}
+        }
@@ -0,0 +1,139 @@
+# Eliminasi chunk yang hampir identik (MinHash + LSH) sebelum embedding
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+# Bilangan prima < 2^32 untuk fungsi hash universal (a * x + b) mod p
+_MERSENNE_PRIME = np.uint64(4294967291)
+_WORD_PATTERN = re.compile(r"\w+")
+
+DEFAULT_DEDUP_THRESHOLD = 0.85
+# Metadata yang menandai chunk tabular (baris/blok baris CSV/XLSX, ringkasan kolom)
+TABULAR_METADATA_KEYS = ("row", "row_start", "column")
+# Metadata yang dicatat sebagai referensi untuk tiap chunk duplikat yang dibuang
+REFERENCE_METADATA_KEYS = ("source", "page", "row", "row_start", "row_end", "column", "section")
+
+def is_tabular_chunk(metadata):
+    """Chunk tabular: baris yang hanya berbeda angka tetap data yang berbeda"""
+    return any(key in metadata for key in TABULAR_METADATA_KEYS)
+
+def chunk_reference(metadata):
+    """Referensi lokasi chunk (sumber, halaman, baris) untuk dicatat pada chunk yang disimpan"""
+    return {key: metadata[key] for key in REFERENCE_METADATA_KEYS if metadata.get(key) is not None}
+
+class ChunkDeduplicator:
+    """
+    Menyaring chunk yang hampir identik (header, footer, disclaimer berulang).
+
+    Tiap chunk diringkas menjadi signature MinHash dari shingle 3 kata, lalu
+    dicari kandidatnya lewat LSH (band signature). Chunk yang kemiripan
+    Jaccard-nya melewati threshold tidak di-embed; referensi lokasinya
+    (sumber, halaman, baris) dicatat pada chunk pertama yang disimpan.
+
+    Chunk tabular (CSV/XLSX) hanya dibuang jika teksnya sama persis, karena
+    baris yang hanya berbeda angka terlihat mirip bagi MinHash.
+    """
+
+    def __init__(self, threshold=DEFAULT_DEDUP_THRESHOLD, num_perm=64, bands=16, shingle_size=3, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm harus habis dibagi bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 31, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 31, size=(num_perm, 1), dtype=np.uint64)
+        # Label chunk yang disimpan -> signature; band -> label kandidat
+        self._signatures = []
+        self._buckets = {}
+        # Digest teks ternormalisasi -> label (bukan teksnya, agar memori tidak tumbuh dengan korpus)
+        self._exact = {}
+        # Label chunk yang disimpan -> referensi lokasi duplikatnya
+        self._duplicates = {}
+        self.duplicate_count = 0
+
+    def _signature(self, text):
+        words = _WORD_PATTERN.findall(text.lower())
+        size = self.shingle_size
+        if len(words) <= size:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+        # CRC32, bukan hash() bawaan yang diacak per proses (PYTHONHASHSEED): signature sama di semua proses
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((self._a * hashes + self._b) % _MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+
+    def _find_duplicate(self, signature, band_keys):
+        seen = set()
+        for band_key in band_keys:
+            for label in self._buckets.get(band_key, ()):
+                if label in seen:
+                    continue
+                seen.add(label)
+                if np.mean(self._signatures[label] == signature) >= self.threshold:
+                    return label
+        return None
+
+    def filter(self, chunks):
+        """
+        Generator yang hanya meneruskan chunk unik (urutan dipertahankan)
+
+        Chunk ke-n yang diteruskan akan menjadi vektor berlabel n di indeks,
+        sehingga referensi duplikat bisa dipasang kembali dengan apply().
+        """
+        for chunk in chunks:
+            normalized = " ".join(chunk.page_content.split()).lower()
+            if not normalized:
+                continue
+
+            digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).digest()
+            tabular = is_tabular_chunk(chunk.metadata)
+            label = self._exact.get(digest)
+            signature = band_keys = None
+            if label is None and not tabular:
+                signature = self._signature(normalized)
+                band_keys = self._band_keys(signature)
+                label = self._find_duplicate(signature, band_keys)
+
+            if label is not None:
+                self._duplicates.setdefault(label, []).append(chunk_reference(chunk.metadata))
+                self.duplicate_count += 1
+                continue
+
+            # Chunk tabular tidak ikut kandidat LSH, sehingga hanya cocok lewat teks yang sama persis
+            label = len(self._signatures)
+            self._signatures.append(signature)
+            self._exact[digest] = label
+            for band_key in band_keys or ():
+                self._buckets.setdefault(band_key, []).append(label)
+            yield chunk
+
+    def apply(self, vectorstore):
+        """
+        Menambahkan referensi duplikat ke metadata chunk yang disimpan
+
+        duplicate_count dan duplicate_refs (sumber/halaman/baris tiap chunk yang
+        dibuang) selalu dicatat; pages berisi semua halaman jika ada.
+        """
+        from langchain_core.documents import Document
+
+        docstore = vectorstore.docstore
+        for label, references in self._duplicates.items():
+            doc_id = vectorstore.index_to_docstore_id[label]
+            doc = docstore.search(doc_id)
+            metadata = {**doc.metadata, "duplicate_count": len(references), "duplicate_refs": references}
+            all_pages = [page for page in [doc.metadata.get("page"), *(ref.get("page") for ref in references)]
+                         if page is not None]
+            if all_pages:
+                metadata["pages"] = sorted(set(all_pages))
+            # Lewat API docstore (delete + add), tidak bergantung pada isi internal InMemoryDocstore
+            docstore.delete([doc_id])
+            docstore.add({doc_id: Document(page_content=doc.page_content, metadata=metadata)})
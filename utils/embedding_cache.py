@@ -0,0 +1,218 @@
+# Cache embedding berbasis konten (content-addressed) yang disimpan di disk
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from config import EMBEDDING_CACHE_MAX_MB, EMBEDDING_CACHE_PATH
+
+# Batas parameter SQLite per query
+_SQLITE_BATCH = 500
+# Ukuran total dicek ulang (dan vektor lama dibuang) setiap sekian penulisan
+_EVICTION_INTERVAL = 20
+
+# Satu koneksi SQLite per file cache, dipakai bersama semua sesi dalam proses
+_stores = {}
+_stores_lock = threading.Lock()
+
+def normalize_text(text):
+    """Normalisasi teks chunk sebelum di-hash (unicode, spasi berlebih)"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def get_embedding_model_name(embeddings):
+    """Mendapatkan nama model embedding untuk dijadikan bagian dari kunci cache"""
+    model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+    return f"{type(embeddings).__name__}:{model or 'default'}"
+
+def embedding_cache_key(text, model_name):
+    """Kunci cache: hash dari nama model + teks yang sudah dinormalisasi"""
+    payload = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+class EmbeddingStore:
+    """
+    Tabel vektor embedding dalam satu file SQLite.
+
+    Setiap baris menyimpan ukuran dan waktu terakhir dipakai; jika ukuran total
+    melewati max_bytes, vektor yang paling lama tidak dipakai dibuang lebih dulu.
+    """
+
+    def __init__(self, cache_path, max_bytes=EMBEDDING_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        from utils.security import ensure_private_dir
+        ensure_private_dir(self.cache_path.parent)
+        self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        # Cache lama belum punya kolom ukuran/waktu pakai
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")}
+        if "size" not in columns:
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("UPDATE embeddings SET size = LENGTH(vector) + LENGTH(key)")
+        if "accessed" not in columns:
+            self._conn.execute("ALTER TABLE embeddings ADD COLUMN accessed REAL NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed)")
+        self._conn.commit()
+
+    def lookup(self, keys):
+        """Ambil vektor yang sudah ada di cache untuk daftar kunci (waktu pakainya diperbarui)"""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), _SQLITE_BATCH):
+                batch = keys[i:i + _SQLITE_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+            if found:
+                self._conn.executemany("UPDATE embeddings SET accessed = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+        return found
+
+    def store(self, items):
+        """Simpan pasangan (kunci, vektor) ke cache"""
+        now = time.time()
+        rows = []
+        for key, vector in items:
+            blob = np.asarray(vector, dtype=np.float32).tobytes()
+            rows.append((key, blob, len(blob) + len(key), now))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, size, accessed) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % _EVICTION_INTERVAL == 1:
+                self._evict()
+
+    def _evict(self):
+        """Membuang vektor yang paling lama tidak dipakai hingga ukuran di bawah batas"""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        removed = 0
+        keys = []
+        for key, size in self._conn.execute("SELECT key, size FROM embeddings ORDER BY accessed"):
+            keys.append((key,))
+            removed += size
+            if removed >= excess:
+                break
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", keys)
+        self._conn.commit()
+        logging.info(f"Cache embedding melewati batas ukuran, {len(keys)} vektor lama dibuang")
+
+    def stats(self):
+        """Jumlah vektor dan ukuran total di disk"""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM embeddings"
+            ).fetchone()
+            return {"entries": entries, "bytes": size}
+
+    def close(self):
+        """Tutup koneksi SQLite"""
+        try:
+            self._conn.close()
+        except Exception as e:
+            logging.error(f"Error menutup cache embedding: {str(e)}")
+
+def get_embedding_store(cache_path=EMBEDDING_CACHE_PATH):
+    """EmbeddingStore tingkat proses untuk file cache ini (koneksi dibuka sekali)"""
+    key = str(cache_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = EmbeddingStore(cache_path)
+        return store
+
+def close_embedding_store(cache_path=EMBEDDING_CACHE_PATH):
+    """Menutup koneksi bersama untuk file cache ini (dibuka ulang saat dipakai lagi)"""
+    with _stores_lock:
+        store = _stores.pop(str(cache_path), None)
+    if store is not None:
+        store.close()
+
+class CachedEmbeddings(Embeddings):
+    """
+    Pembungkus Embeddings yang menyimpan vektor tiap chunk di SQLite lokal.
+
+    Hanya chunk yang belum pernah di-embed (untuk model yang sama) yang dikirim
+    ke API embedding. Jumlah hit/miss dicatat di atribut `hits` dan `misses`.
+    Koneksi SQLite dipakai bersama semua instance dengan file cache yang sama
+    (lihat get_embedding_store), sehingga membuat instance per sesi murah.
+    """
+
+    def __init__(self, embeddings, cache_path=EMBEDDING_CACHE_PATH, model_name=None):
+        self.embeddings = embeddings
+        self.model_name = model_name or get_embedding_model_name(embeddings)
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Backend yang menandai dirinya tidak perlu di-cache (mis. embedding lokal) dilewatkan
+        self.cacheable = getattr(embeddings, "cacheable", True)
+        get_embedding_store(cache_path)
+
+    @property
+    def store(self):
+        # Diambil dari registry setiap kali agar tetap valid setelah close_embedding_store
+        return get_embedding_store(self.cache_path)
+
+    def embed_documents(self, texts):
+        if not self.cacheable:
+            return self.embeddings.embed_documents(texts)
+
+        keys = [embedding_cache_key(text, self.model_name) for text in texts]
+        vectors = self.store.lookup(list(set(keys)))
+
+        # Kumpulkan teks unik yang belum ada di cache
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), new_vectors))
+            self.store.store(new_items)
+            for key, vector in new_items:
+                vectors[key] = np.asarray(vector, dtype=np.float32)
+
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [vectors[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        return self.embeddings.embed_query(text)
+
+    def reset_stats(self):
+        """Reset penghitung hit/miss"""
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """
+        Tidak menutup koneksi: store dipakai bersama instance lain (job dan sesi
+        yang sedang embedding). Gunakan close_embedding_store saat proses selesai.
+        """
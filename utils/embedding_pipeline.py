@@ -0,0 +1,268 @@
+# Pipeline embedding: batch berdasarkan jumlah token, worker paralel, dan backoff 429
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Batas default satu request embedding (OpenAI menerima hingga ~8k token per input
+# dan ~300k token per request; batas yang lebih kecil membuat progres lebih halus)
+DEFAULT_BATCH_TOKENS = 8000
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_CONCURRENCY = 4
+
+_encoding = None
+
+# Satu pembatas per provider/model embedding untuk seluruh proses (dipakai bersama semua sesi dan job)
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+def get_token_encoding():
+    """Encoding tiktoken cl100k_base (None jika tiktoken tidak tersedia)"""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = False
+    return _encoding or None
+
+def count_tokens(text):
+    """Menghitung jumlah token dengan tiktoken (perkiraan 4 karakter/token jika tidak tersedia)"""
+    encoding = get_token_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
+
+def make_token_batches(texts, max_batch_tokens=DEFAULT_BATCH_TOKENS, max_batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Mengelompokkan teks menjadi batch berdasarkan jumlah token
+
+    Returns:
+        List batch, tiap batch berupa list indeks ke `texts`
+    """
+    batches = []
+    current, current_tokens = [], 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and (current_tokens + tokens > max_batch_tokens or len(current) >= max_batch_size):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+def is_rate_limit_error(error):
+    """Deteksi error rate limit (HTTP 429) dari berbagai provider"""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    if type(error).__name__ == "RateLimitError":
+        return True
+    message = str(error).lower()
+    return "429" in message or "rate limit" in message
+
+class AdaptiveRateLimiter:
+    """
+    Pembatas konkurensi adaptif (AIMD).
+
+    Saat terkena 429, jumlah request paralel dibagi dua dan semua worker menunggu
+    jeda backoff eksponensial. Setiap beberapa request sukses, batas dinaikkan
+    kembali hingga `max_concurrency`.
+    """
+
+    def __init__(self, max_concurrency, base_delay=1.0, max_delay=60.0, recover_after=4):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.recover_after = recover_after
+        self.delay = base_delay
+        self.active = 0
+        self.pause_until = 0.0
+        self.successes = 0
+        self.rate_limited = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                wait = self.pause_until - time.monotonic()
+                if wait <= 0 and self.active < self.limit:
+                    self.active += 1
+                    return
+                self._cond.wait(timeout=wait if wait > 0 else None)
+
+    def release(self, rate_limited=False):
+        with self._cond:
+            self.active -= 1
+            if rate_limited:
+                self.rate_limited += 1
+                self.successes = 0
+                self.limit = max(1, self.limit // 2)
+                # Jitter agar worker tidak mencoba ulang bersamaan
+                self.pause_until = time.monotonic() + self.delay * (0.5 + random.random())
+                self.delay = min(self.delay * 2, self.max_delay)
+            else:
+                self.successes += 1
+                self.delay = max(self.base_delay, self.delay / 2)
+                if self.successes >= self.recover_after and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self.successes = 0
+            self._cond.notify_all()
+
+    def raise_max_concurrency(self, max_concurrency):
+        """Menaikkan batas atas (batas saat ini ikut naik bertahap lewat recover_after)"""
+        with self._cond:
+            self.max_concurrency = max(self.max_concurrency, max_concurrency)
+
+def get_rate_limiter(embeddings, max_concurrency=DEFAULT_CONCURRENCY):
+    """
+    Pembatas konkurensi bersama untuk provider/model embedding ini
+
+    Semua pemanggilan embed_texts_concurrently (jendela, file, dan sesi yang
+    berbeda) berbagi batas request paralel dan jeda backoff yang sama, sehingga
+    429 dari satu job ikut memperlambat job lain ke provider yang sama.
+    """
+    from utils.embedding_cache import get_embedding_model_name
+
+    # CachedEmbeddings dikunci dengan provider yang dibungkusnya
+    key = get_embedding_model_name(getattr(embeddings, "embeddings", embeddings))
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = AdaptiveRateLimiter(max_concurrency)
+    limiter.raise_max_concurrency(max_concurrency)
+    return limiter
+
+def embed_texts_concurrently(texts, embeddings, max_concurrency=DEFAULT_CONCURRENCY,
+                             max_batch_tokens=DEFAULT_BATCH_TOKENS, max_retries=6,
+                             progress_callback=None):
+    """
+    Embed teks dalam batch berdasarkan token menggunakan worker pool terbatas
+
+    Args:
+        texts: Daftar teks chunk
+        embeddings: Instance Embeddings langchain (boleh CachedEmbeddings)
+        max_concurrency: Jumlah batch yang dikirim bersamaan
+        max_batch_tokens: Batas token per batch
+        max_retries: Percobaan ulang maksimum per batch saat terkena rate limit
+        progress_callback: Fungsi (jumlah_selesai, total) yang dipanggil dari thread pemanggil
+
+    Returns:
+        Daftar vektor dengan urutan yang sama dengan `texts`
+    """
+    if not texts:
+        return []
+
+    batches = make_token_batches(texts, max_batch_tokens=max_batch_tokens)
+    limiter = get_rate_limiter(embeddings, max_concurrency)
+    rate_limited_before = limiter.rate_limited
+    vectors = [None] * len(texts)
+
+    def embed_batch(indices):
+        batch_texts = [texts[i] for i in indices]
+        for attempt in range(max_retries + 1):
+            limiter.acquire()
+            try:
+                result = embeddings.embed_documents(batch_texts)
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < max_retries:
+                    limiter.release(rate_limited=True)
+                    logging.warning(f"Rate limit embedding, mencoba ulang (percobaan {attempt + 1})")
+                    continue
+                limiter.release()
+                raise
+            limiter.release()
+            return indices, result
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+        futures = [executor.submit(embed_batch, batch) for batch in batches]
+        try:
+            for future in as_completed(futures):
+                indices, result = future.result()
+                for i, vector in zip(indices, result):
+                    vectors[i] = vector
+                done += len(indices)
+                if progress_callback:
+                    progress_callback(done, len(texts))
+        except Exception:
+            for future in futures:
+                future.cancel()
+            raise
+
+    if limiter.rate_limited > rate_limited_before:
+        logging.info(f"Embedding selesai dengan {limiter.rate_limited - rate_limited_before} kali rate limit")
+    return vectors
+
+def build_vectorstore_incrementally(chunks, embeddings, window_size=512,
+                                    max_concurrency=DEFAULT_CONCURRENCY, on_window=None,
+                                    progress_callback=None):
+    """
+    Membangun vectorstore FAISS secara bertahap dari iterable chunks
+
+    Chunks dikonsumsi per jendela (window): tiap jendela di-embed lalu langsung
+    ditambahkan ke indeks, sehingga chunk dan halaman sumber tidak perlu
+    ditampung seluruhnya di memori dan indeks parsial sudah dapat dipakai.
+
+    Args:
+        chunks: Iterable Document (boleh generator)
+        embeddings: Instance Embeddings langchain
+        window_size: Jumlah chunk per jendela
+        max_concurrency: Jumlah batch embedding paralel dalam satu jendela
+        on_window: Fungsi (vectorstore, jumlah_chunk_selesai) setelah tiap jendela
+        progress_callback: Fungsi (chunk_selesai, chunk_jendela) setelah tiap batch
+            embedding dalam jendela yang sedang diproses
+
+    Returns:
+        Tuple (vectorstore, jumlah_chunk); vectorstore None jika tidak ada chunk
+    """
+    from langchain_community.vectorstores import FAISS
+
+    vectorstore = None
+    total = 0
+    window = []
+
+    def flush(window):
+        nonlocal vectorstore, total
+        texts = [chunk.page_content for chunk in window]
+        metadatas = [chunk.metadata for chunk in window]
+        vectors = embed_texts_concurrently(texts, embeddings, max_concurrency=max_concurrency,
+                                           progress_callback=progress_callback)
+        if vectorstore is None:
+            vectorstore = FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas)
+        else:
+            vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+        total += len(window)
+        if on_window:
+            on_window(vectorstore, total)
+
+    for chunk in chunks:
+        window.append(chunk)
+        if len(window) >= window_size:
+            flush(window)
+            window = []
+    if window:
+        flush(window)
+
+    return vectorstore, total
+
+def snapshot_vectorstore(vectorstore):
+    """
+    Salinan vectorstore FAISS yang tidak ikut berubah saat indeks asal ditambah
+
+    Dipakai untuk menerbitkan indeks parsial dari thread ingestion ke thread UI
+    tanpa membaca indeks yang sedang ditulis. Dokumen tidak disalin (hanya referensi).
+    """
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    index_to_docstore_id = dict(vectorstore.index_to_docstore_id)
+    docstore = InMemoryDocstore({doc_id: vectorstore.docstore.search(doc_id)
+                                 for doc_id in index_to_docstore_id.values()})
+    return FAISS(vectorstore.embedding_function, faiss.clone_index(vectorstore.index), docstore,
+                 index_to_docstore_id, distance_strategy=vectorstore.distance_strategy)
@@ -0,0 +1,80 @@
+# Factory untuk berbagai backend embedding (API dan lokal)
+import logging
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_BACKENDS = {
+    "openai": "OpenAI (API)",
+    "local": "Lokal (offline, CPU)"
+}
+
+class HashingEmbeddings(Embeddings):
+    """
+    Embedding lokal berbasis hashed n-gram karakter (scikit-learn).
+
+    Tidak membutuhkan jaringan maupun fitting per korpus: vektor untuk teks yang
+    sama selalu identik, sehingga cocok untuk korpus besar, mode offline, dan test.
+    """
+
+    # Vektor lokal lebih murah dihitung ulang daripada dibaca dari cache disk
+    cacheable = False
+
+    def __init__(self, n_features=1024, ngram_range=(3, 5)):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.n_features = n_features
+        self.ngram_range = ngram_range
+        self.model = f"hashing-char_wb-{ngram_range[0]}-{ngram_range[1]}-{n_features}"
+        self._vectorizer = HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=ngram_range,
+            n_features=n_features,
+            lowercase=True,
+            norm="l2",
+            alternate_sign=False
+        )
+
+    def _embed(self, texts):
+        matrix = self._vectorizer.transform(texts).astype(np.float32)
+        return matrix.toarray()
+
+    def embed_documents(self, texts):
+        return self._embed(texts).tolist()
+
+    def embed_query(self, text):
+        return self._embed([text])[0].tolist()
+
+class EmbeddingProviderFactory:
+    """Factory untuk membuat backend embedding"""
+
+    @staticmethod
+    def get_provider(backend, api_key=None):
+        """
+        Mendapatkan backend embedding berdasarkan nama
+
+        Args:
+            backend: Nama backend (openai, local)
+            api_key: API key OpenAI (hanya untuk backend openai)
+
+        Returns:
+            Instance Embeddings langchain
+        """
+        if backend == "openai":
+            if not api_key:
+                raise ValueError("API key OpenAI diperlukan untuk embedding OpenAI")
+            from langchain_openai import OpenAIEmbeddings
+            return OpenAIEmbeddings(api_key=api_key)
+
+        elif backend == "local":
+            return HashingEmbeddings()
+
+        else:
+            raise ValueError(f"Backend embedding tidak didukung: {backend}")
+
+def get_default_embedding_backend(openai_api_key):
+    """Backend default: OpenAI jika ada API key OpenAI, selain itu lokal"""
+    if openai_api_key:
+        return "openai"
+    logging.info("API key OpenAI tidak tersedia, menggunakan embedding lokal")
+    return "local"
@@ -1,131 +1,389 @@
 import streamlit as st
 import os
-import tempfile
+import io
+import hashlib
 import time
 import logging
 from pathlib import Path
-import shutil
 
 # Konfigurasi logging
 logging.basicConfig(level=logging.INFO)
 
 # Variabel global
-TEMP_DIR = Path(tempfile.gettempdir()) / "ai_business_consultant"
+from utils.loaders import XLSX_EXTENSIONS
 
-def get_secure_temp_file(uploaded_file):
+def get_secure_temp_file(uploaded_file, session_id=None, pin=False):
     """
     Menyimpan file yang diunggah ke direktori sementara dengan aman
     
+    File disimpan di direktori milik sesi dengan nama berdasarkan hash isi,
+    sehingga sesi lain dengan nama file yang sama tidak saling menimpa.
+    
     Args:
         uploaded_file: File yang diunggah melalui st.file_uploader
+        session_id: ID sesi pemilik file (default: sesi Streamlit saat ini)
+        pin: Lindungi file dari eviction sampai release_upload dipanggil
         
     Returns:
         Path ke file sementara
     """
+    from utils.upload_store import get_upload_session_id, store_upload
+    
     try:
-        # Pastikan direktori ada
-        TEMP_DIR.mkdir(parents=True, exist_ok=True)
-        
-        # Buat path file dengan nama unik
-        file_path = TEMP_DIR / uploaded_file.name
-        
-        # Tulis file
-        with open(file_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
-            
-        return str(file_path)
+        return store_upload(
+            uploaded_file,
+            get_file_hash(uploaded_file),
+            session_id or get_upload_session_id(),
+            pin=pin
+        )
     except Exception as e:
         logging.error(f"Error menyimpan file sementara: {str(e)}")
         raise e
 
-def process_file(uploaded_file, chunk_size=500, chunk_overlap=50):
+# Cache hash per file_id upload agar file besar tidak di-hash ulang di setiap rerun
+_file_hashes = {}
+_MAX_CACHED_HASHES = 256
+
+def get_file_hash(uploaded_file):
+    """Menghitung hash SHA-256 dari isi file yang diunggah"""
+    cache_key = (getattr(uploaded_file, "file_id", None), uploaded_file.name, uploaded_file.size)
+    if cache_key[0] and cache_key in _file_hashes:
+        return _file_hashes[cache_key]
+    
+    file_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+    if cache_key[0]:
+        if len(_file_hashes) >= _MAX_CACHED_HASHES:
+            _file_hashes.clear()
+        _file_hashes[cache_key] = file_hash
+    return file_hash
+
+def get_file_buffer(uploaded_file):
+    """
+    Membuat buffer baca baru atas isi file yang diunggah tanpa menyalin data
+    
+    BytesIO.getvalue() mengembalikan objek bytes internal dan BytesIO baru
+    berbagi objek tersebut, sehingga tiap pembaca punya posisi sendiri.
+    """
+    return io.BytesIO(uploaded_file.getvalue())
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _read_csv_cached(file_hash, _data):
+    import pandas as pd
+    return pd.read_csv(io.BytesIO(_data))
+
+def load_csv_dataframe(uploaded_file):
+    """
+    Membaca CSV yang diunggah menjadi DataFrame, di-cache berdasarkan hash isi
+    
+    DataFrame yang dikembalikan dipakai bersama antar rerun/sesi dan tidak boleh
+    dimodifikasi di tempat.
+    """
+    return _read_csv_cached(get_file_hash(uploaded_file), uploaded_file.getvalue())
+
+def _count_docs(docs, metadata):
+    """Menghitung jumlah halaman/baris yang sudah dibaca ke metadata["doc_count"]"""
+    for doc in docs:
+        metadata["doc_count"] += doc.metadata.get("row_count", 1)
+        yield doc
+
+def _extract_file_tables(uploaded_file, file_hash, session_id=None):
+    """Mengekstrak tabel PDF ke cache dan mengembalikan jumlahnya (0 jika gagal)"""
+    from utils.pdf_tables import ensure_pdf_tables, load_pdf_tables
+    
+    tables = load_pdf_tables(file_hash)
+    if tables is not None:
+        return len(tables)
+    
+    file_path = None
+    try:
+        file_path = get_secure_temp_file(uploaded_file, session_id=session_id, pin=True)
+        return len(ensure_pdf_tables(file_hash, file_path))
+    except Exception as e:
+        logging.error(f"Error mengekstrak tabel PDF {uploaded_file.name}: {str(e)}")
+        return 0
+    finally:
+        if file_path:
+            from utils.upload_store import release_upload
+            release_upload(file_path)
+
+def get_openai_api_key():
+    """API key OpenAI untuk embedding, terlepas dari provider chat yang aktif"""
+    api_key = (st.session_state.get("api_keys") or {}).get("openai")
+    if not api_key and st.session_state.get("current_provider", "openai") == "openai":
+        api_key = st.session_state.get("api_key")
+    return api_key
+
+def get_embeddings(backend=None):
+    """
+    Membuat fungsi embedding untuk sesi ini (dengan cache embedding di disk)
+    
+    Koneksi SQLite cache dipakai bersama semua sesi, jadi fungsi ini murah
+    dipanggil setiap kali file diproses.
+    
+    Args:
+        backend: Nama backend embedding (openai, local). Default: OpenAI jika
+            API key OpenAI tersedia, selain itu embedding lokal.
+    """
+    from utils.embedding_cache import CachedEmbeddings
+    from utils.embeddings import EmbeddingProviderFactory, get_default_embedding_backend
+    
+    api_key = get_openai_api_key()
+    backend = backend or get_default_embedding_backend(api_key)
+    return CachedEmbeddings(EmbeddingProviderFactory.get_provider(backend, api_key=api_key))
+
+def build_file_vectorstore(uploaded_file, embeddings, chunk_size=128, chunk_overlap=12,
+                           embedding_concurrency=4, progress_callback=None,
+                           on_partial_index=None, pdf_backend="pymupdf",
+                           csv_mode="grouped", csv_column_summaries=False,
+                           vector_compression="float16", deduplicate=True,
+                           dedup_threshold=0.85, extract_tables=None, summary_llm=None,
+                           session_id=None):
     """
-    Memproses file yang diunggah dan mengembalikan retriever
+    Membangun (atau memuat) vectorstore FAISS untuk satu file
+    
+    Indeks yang sudah pernah dibangun untuk isi file dan parameter yang sama
+    dimuat langsung dari penyimpanan indeks di disk. Selain itu, dokumen dibaca,
+    dipecah, di-embed, dan ditambahkan ke indeks secara bertahap.
     
     Args:
-        uploaded_file: File yang diunggah (PDF, TXT, CSV)
-        chunk_size: Ukuran tiap potongan teks
-        chunk_overlap: Jumlah overlap antar potongan
+        uploaded_file: File yang diunggah (PDF, TXT, CSV, XLSX, DOCX, HTML)
+        embeddings: Fungsi embedding (lihat get_embeddings)
+        chunk_size: Ukuran tiap potongan teks (token tiktoken)
+        chunk_overlap: Jumlah token overlap antar potongan
+        embedding_concurrency: Jumlah batch embedding yang dikirim bersamaan
+        progress_callback: Fungsi (halaman_selesai, total_halaman) untuk melaporkan progres
+        on_partial_index: Fungsi (vectorstore, jumlah_chunk) yang menerima snapshot
+            indeks parsial (lihat snapshot_vectorstore) setiap kali jumlah chunk
+            yang selesai di-embed mencapai dua kali snapshot sebelumnya
+        pdf_backend: Backend ekstraksi PDF ("pymupdf" multi-core atau "pypdf")
+        csv_mode: "grouped" (blok baris terbatas token) atau "row" (satu dokumen per baris)
+        csv_column_summaries: Tambahkan ringkasan per kolom sebagai dokumen (mode grouped)
+        vector_compression: Kompresi vektor untuk indeks IVF ("float16", "int8", "none")
+        deduplicate: Buang chunk yang hampir identik sebelum embedding (MinHash/LSH)
+        dedup_threshold: Batas kemiripan Jaccard untuk dianggap duplikat
+        extract_tables: Ekstrak tabel PDF menjadi DataFrame (lihat utils.pdf_tables);
+            None untuk mengikuti PDF_TABLE_EXTRACTION
+        summary_llm: Model chat untuk membangun pohon ringkasan dokumen di background saat
+            upload (lihat utils.summary_tree); None untuk membangunnya saat pertama dibutuhkan
+        session_id: ID sesi pemilik file upload (wajib jika dipanggil dari thread
+            background, karena st.session_state tidak tersedia di sana)
         
     Returns:
-        Retriever yang dapat digunakan untuk RAG
+        Tuple (vectorstore, metadata file)
     """
-    try:
-        start_time = time.time()
-        file_path = get_secure_temp_file(uploaded_file)
-        file_extension = Path(file_path).suffix.lower()
-        
-        # Import modul-modul yang diperlukan
-        from langchain.text_splitter import RecursiveCharacterTextSplitter
-        from langchain_community.vectorstores import FAISS
-        from langchain_openai import OpenAIEmbeddings
-        
-        # Inisialisasi data dan metainformation
-        docs = []
-        metadata = {
-            "filename": uploaded_file.name,
-            "size_mb": round(uploaded_file.size / (1024 * 1024), 2),
-            "doc_count": 0,
-            "chunk_count": 0,
-            "processing_time": 0
-        }
-        
-        # Proses berdasarkan tipe file
-        if file_extension == ".pdf":
-            from langchain.document_loaders import PyPDFLoader
-            loader = PyPDFLoader(file_path)
-            docs = loader.load()
-            metadata["doc_count"] = len(docs)
+    start_time = time.time()
+    file_extension = Path(uploaded_file.name).suffix.lower()
+    file_hash = get_file_hash(uploaded_file)
+    
+    # Import modul-modul yang diperlukan
+    from utils.index_store import index_store_key, load_vectorstore, save_vectorstore
+    
+    # Inisialisasi data dan metainformation
+    metadata = {
+        "filename": uploaded_file.name,
+        "file_hash": file_hash,
+        "size_mb": round(uploaded_file.size / (1024 * 1024), 2),
+        "doc_count": 0,
+        "chunk_count": 0,
+        "processing_time": 0,
+        "embedding_cache_hits": 0,
+        "embedding_cache_misses": 0,
+        "duplicate_chunks": 0,
+        "loaded_from_store": False
+    }
+    
+    embeddings.reset_stats()
+    
+    # Cek penyimpanan indeks berdasarkan hash isi file dan parameter
+    store_key = index_store_key(
+        file_hash,
+        extension=file_extension,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        splitter="token",
+        embedding_model=embeddings.model_name,
+        pdf_backend=pdf_backend if file_extension == ".pdf" else None,
+        csv_mode=(csv_mode, csv_column_summaries) if file_extension == ".csv" else None,
+        vector_compression=vector_compression,
+        dedup_threshold=dedup_threshold if deduplicate else None
+    )
+    metadata["store_key"] = store_key
+    stored = load_vectorstore(store_key, embeddings)
+    
+    if stored:
+        vectorstore, stored_metadata = stored
+        for key in ("doc_count", "chunk_count", "duplicate_chunks", "index_params"):
+            metadata[key] = stored_metadata.get(key, 0)
+        metadata["loaded_from_store"] = True
+        logging.info(f"Indeks untuk {uploaded_file.name} dimuat dari penyimpanan")
+    else:
+        # Proses berdasarkan tipe file (PDF dibaca halaman demi halaman).
+        # Loader membaca langsung dari buffer upload di memori; hanya worker
+        # PyMuPDF (proses terpisah) yang membutuhkan file di disk.
+        file_path = None
+        if file_extension == ".pdf" and pdf_backend == "pymupdf":
+            from utils.pdf_extraction import get_pdf_page_count_pymupdf, iter_pdf_pages_pymupdf
+            file_path = get_secure_temp_file(uploaded_file, session_id=session_id, pin=True)
+            total_docs = get_pdf_page_count_pymupdf(file_path)
+            docs = iter_pdf_pages_pymupdf(file_path, source=uploaded_file.name)
+            
+        elif file_extension == ".pdf":
+            from pypdf import PdfReader
+            from utils.loaders import iter_pdf_pages
+            reader = PdfReader(get_file_buffer(uploaded_file))
+            total_docs = len(reader.pages)
+            docs = iter_pdf_pages(None, source=uploaded_file.name, reader=reader)
             
         elif file_extension == ".txt":
-            from langchain.document_loaders import TextLoader
-            loader = TextLoader(file_path)
-            docs = loader.load()
-            metadata["doc_count"] = len(docs)
+            from langchain_core.documents import Document
+            text = str(uploaded_file.getbuffer(), "utf-8", errors="replace")
+            docs = [Document(page_content=text, metadata={"source": uploaded_file.name})]
+            total_docs = 1
+            
+        elif file_extension == ".csv" and csv_mode == "grouped":
+            # Baris dikelompokkan menjadi blok yang sudah berukuran chunk
+            from utils.loaders import iter_csv_row_groups
+            total_docs = max(uploaded_file.getvalue().count(b"\n") - 1, 1)
+            docs = iter_csv_row_groups(
+                get_file_buffer(uploaded_file),
+                max_tokens=chunk_size,
+                include_column_summaries=csv_column_summaries,
+                source=uploaded_file.name
+            )
             
         elif file_extension == ".csv":
-            from langchain.document_loaders.csv_loader import CSVLoader
-            loader = CSVLoader(file_path)
-            docs = loader.load()
-            metadata["doc_count"] = len(docs)
+            from utils.loaders import iter_csv_rows
+            total_docs = max(uploaded_file.getvalue().count(b"\n") - 1, 1)
+            docs = iter_csv_rows(get_file_buffer(uploaded_file), source=uploaded_file.name)
+            
+        elif file_extension in XLSX_EXTENSIONS:
+            # Workbook dibaca sheet demi sheet dalam mode read-only; baris
+            # dikelompokkan menjadi blok berukuran chunk seperti CSV grouped
+            from utils.loaders import get_xlsx_row_count, iter_xlsx_row_groups
+            total_docs = get_xlsx_row_count(get_file_buffer(uploaded_file))
+            docs = iter_xlsx_row_groups(get_file_buffer(uploaded_file), max_tokens=chunk_size,
+                                        source=uploaded_file.name)
+            
+        elif file_extension == ".docx":
+            # Jumlah bagian untuk progres dihitung dengan satu parse streaming
+            # (tanpa chunking/embedding, jauh lebih murah dari embedding)
+            from utils.loaders import iter_docx_sections
+            total_docs = sum(1 for _ in iter_docx_sections(get_file_buffer(uploaded_file)))
+            docs = iter_docx_sections(get_file_buffer(uploaded_file), source=uploaded_file.name)
+            
+        elif file_extension in (".html", ".htm"):
+            from utils.loaders import iter_html_sections
+            total_docs = sum(1 for _ in iter_html_sections(get_file_buffer(uploaded_file)))
+            docs = iter_html_sections(get_file_buffer(uploaded_file), source=uploaded_file.name)
             
         else:
             raise ValueError(f"Format file tidak didukung: {file_extension}")
         
-        # Split dokumen menjadi chunks
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            separators=["\n\n", "\n", ".", " ", ""]
-        )
+        # Split dokumen menjadi chunks secara bertahap
+        from utils.embedding_pipeline import build_vectorstore_incrementally
+        from utils.loaders import iter_split_documents
+        from utils.text_splitter import TokenTextSplitter
+        text_splitter = TokenTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        if (file_extension == ".csv" and csv_mode == "grouped") or file_extension in XLSX_EXTENSIONS:
+            chunks = _count_docs(docs, metadata)
+        else:
+            chunks = iter_split_documents(_count_docs(docs, metadata), text_splitter)
         
-        chunks = text_splitter.split_documents(docs)
-        metadata["chunk_count"] = len(chunks)
+        # Buang header/footer/disclaimer berulang sebelum di-embed
+        deduplicator = None
+        if deduplicate:
+            from utils.deduplication import ChunkDeduplicator
+            deduplicator = ChunkDeduplicator(threshold=dedup_threshold)
+            chunks = deduplicator.filter(chunks)
         
-        # Buat vectorstore dengan embeding OpenAI
-        embeddings = OpenAIEmbeddings(api_key=st.session_state.api_key)
-        vectorstore = FAISS.from_documents(chunks, embeddings)
+        # Snapshot indeks parsial diterbitkan dengan jarak berlipat dua agar total salinan tetap O(n)
+        last_snapshot = 0
+        # Halaman yang sudah selesai di-embed (akhir jendela sebelumnya)
+        embedded_docs = 0
         
-        # Selesaikan metadata
-        metadata["processing_time"] = round(time.time() - start_time, 2)
-        st.session_state.file_info = metadata
+        def on_batch(done, window_total):
+            # Progres per batch: halaman jendela ini dianggap selesai sebanding dengan chunk yang sudah di-embed
+            if progress_callback:
+                progress_callback(embedded_docs + (metadata["doc_count"] - embedded_docs) * done // window_total,
+                                  total_docs)
         
-        # Kembalikan retriever
-        return vectorstore.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 5}
-        )
-            
-    except Exception as e:
-        logging.error(f"Error memproses file: {str(e)}")
-        st.error(f"❌ Gagal memproses file: {str(e)}")
-        return None
+        def on_window(partial_vectorstore, chunk_count):
+            nonlocal last_snapshot, embedded_docs
+            embedded_docs = metadata["doc_count"]
+            if progress_callback:
+                progress_callback(metadata["doc_count"], total_docs)
+            if on_partial_index and chunk_count >= 2 * last_snapshot:
+                from utils.embedding_pipeline import snapshot_vectorstore
+                last_snapshot = chunk_count
+                on_partial_index(snapshot_vectorstore(partial_vectorstore), chunk_count)
+        
+        # Embed dan tambahkan chunks ke indeks per jendela
+        try:
+            vectorstore, metadata["chunk_count"] = build_vectorstore_incrementally(
+                chunks,
+                embeddings,
+                max_concurrency=embedding_concurrency,
+                on_window=on_window,
+                progress_callback=on_batch
+            )
+        finally:
+            if file_path:
+                from utils.upload_store import release_upload
+                release_upload(file_path)
+        if vectorstore is None:
+            raise ValueError("Tidak ada teks yang dapat diekstrak dari file")
+        
+        if deduplicator:
+            deduplicator.apply(vectorstore)
+            metadata["duplicate_chunks"] = deduplicator.duplicate_count
+        
+        # Pilih tipe indeks sesuai jumlah chunk (Flat / IVF / IVF-PQ)
+        from utils.vector_index import optimize_vectorstore_index
+        metadata["index_params"] = optimize_vectorstore_index(vectorstore, vector_compression, allow_shards=False)
+        
+        # Catat statistik cache embedding
+        metadata["embedding_cache_hits"] = embeddings.hits
+        metadata["embedding_cache_misses"] = embeddings.misses
+        
+        # Simpan indeks agar bisa dipakai ulang oleh sesi/proses lain, lalu pakai
+        # salinan bersama yang dimuat (memory-mapped, docstore kolumnar)
+        save_vectorstore(store_key, vectorstore, metadata)
+        stored = load_vectorstore(store_key, embeddings)
+        if stored:
+            vectorstore = stored[0]
+    
+    # Tabel PDF untuk perhitungan angka yang pasti (di-cache per hash file)
+    if extract_tables is None:
+        from config import PDF_TABLE_EXTRACTION
+        extract_tables = PDF_TABLE_EXTRACTION
+    if file_extension == ".pdf" and extract_tables:
+        metadata["table_count"] = _extract_file_tables(uploaded_file, file_hash, session_id)
+    
+    # Pohon ringkasan dibangun terpisah di background; indeks sudah bisa dipakai
+    from config import SUMMARY_TREE_ENABLED
+    if summary_llm is not None and SUMMARY_TREE_ENABLED:
+        from utils.summary_tree import schedule_summary_tree
+        metadata["summary_status"] = schedule_summary_tree(store_key, vectorstore, summary_llm, uploaded_file.name)
+    
+    # Selesaikan metadata
+    metadata["processing_time"] = round(time.time() - start_time, 2)
+    return vectorstore, metadata
 
-def cleanup_temp_files():
-    """Membersihkan file sementara"""
+def cleanup_temp_files(session_id=None, wait_seconds=5):
+    """
+    Membersihkan file sementara milik sesi ini (file sesi lain tidak tersentuh)
+    
+    Job ingestion sesi dibatalkan dan ditunggu lebih dulu agar file yang sedang
+    dibaca worker tidak dihapus; file yang masih dipakai setelah wait_seconds dilewati.
+    """
+    from utils.ingestion_jobs import get_job_manager
+    from utils.upload_store import get_upload_session_id, remove_session_uploads
+    
     try:
-        if TEMP_DIR.exists():
-            shutil.rmtree(TEMP_DIR)
-            logging.info("File sementara berhasil dibersihkan")
+        session_id = session_id or get_upload_session_id()
+        if not get_job_manager().cancel_session(session_id, timeout=wait_seconds):
+            logging.warning("Job ingestion sesi belum berhenti, file yang masih dipakai tidak dihapus")
+        remove_session_uploads(session_id)
+        logging.info("File sementara berhasil dibersihkan")
     except Exception as e:
         logging.error(f"Error saat membersihkan file: {str(e)}")
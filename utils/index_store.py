@@ -0,0 +1,241 @@
+# Penyimpanan indeks FAISS persisten di disk, dikunci dengan hash isi file
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+from config import APP_DATA_DIR, INDEX_STORE_DIR, LOADED_INDEX_CACHE_MB
+
+INDEX_FILENAME = "index.faiss"
+# Docstore disimpan sebagai JSON Lines (bukan pickle) agar file di disk tidak bisa menjalankan kode saat dimuat
+DOCSTORE_FILENAME = "docstore.jsonl"
+META_FILENAME = "meta.json"
+SUMMARY_FILENAME = "summary_tree.json"
+
+# Cache tingkat proses: sesi-sesi Streamlit berbagi satu salinan indeks & docstore.
+# LRU dengan batas total ukuran file; indeks yang dibuang tetap hidup selama masih dipakai sesi.
+_loaded_indexes = OrderedDict()
+_loaded_bytes = 0
+_loaded_lock = threading.Lock()
+# Indeks BM25 per indeks yang dimuat (dibangun saat pertama dipakai, dibuang bersama indeksnya)
+_lexical_indexes = {}
+
+def index_store_key(file_hash, **params):
+    """
+    Membuat kunci penyimpanan dari hash file dan parameter chunking/embedding
+
+    Args:
+        file_hash: Hash isi file yang diunggah
+        **params: Parameter yang mempengaruhi isi indeks (chunk_size, model embedding, dll)
+
+    Returns:
+        String hash yang menjadi nama direktori indeks
+    """
+    payload = json.dumps({"file_hash": file_hash, **params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _store_path(key):
+    return INDEX_STORE_DIR / key
+
+def has_stored_index(key):
+    """Cek apakah indeks untuk kunci ini sudah tersimpan (dengan format docstore saat ini)"""
+    path = _store_path(key)
+    return (path / META_FILENAME).exists() and (path / DOCSTORE_FILENAME).exists()
+
+def _write_docstore(path, vectorstore):
+    """Menulis dokumen urut label FAISS: satu baris JSON [id, teks, metadata] per chunk"""
+    docstore = vectorstore.docstore
+    with open(path, "w", encoding="utf-8") as f:
+        for label in range(len(vectorstore.index_to_docstore_id)):
+            doc_id = vectorstore.index_to_docstore_id[label]
+            doc = docstore.search(doc_id)
+            f.write(json.dumps([doc_id, doc.page_content, doc.metadata], ensure_ascii=False, default=str))
+            f.write("\n")
+
+def _read_docstore(path):
+    """
+    Membaca docstore JSON Lines ke ColumnarDocstore
+
+    ID chunk dinomori ulang sesuai label (0, 1, ...), sehingga salinan bersama
+    ini memakai docstore kolumnar dan IdArray, bukan objek Document per chunk.
+
+    Returns:
+        Tuple (ColumnarDocstore, IdArray label -> id)
+    """
+    from langchain_core.documents import Document
+
+    from utils.chunk_store import ColumnarDocstore, IdArray
+
+    docstore = ColumnarDocstore()
+    batch = {}
+    with open(path, encoding="utf-8") as f:
+        for label, line in enumerate(f):
+            _, page_content, metadata = json.loads(line)
+            batch[label] = Document(page_content=page_content, metadata=metadata)
+            if len(batch) >= 1024:
+                docstore.add(batch)
+                batch = {}
+    if batch:
+        docstore.add(batch)
+    return docstore, IdArray(range(len(docstore)))
+
+def save_vectorstore(key, vectorstore, metadata=None):
+    """
+    Menyimpan vectorstore FAISS ke disk secara atomik
+
+    Args:
+        key: Kunci dari index_store_key
+        vectorstore: Instance FAISS dari langchain
+        metadata: Informasi file (file_info) yang ikut disimpan
+    """
+    import faiss
+
+    from utils.security import ensure_private_dir
+
+    target = _store_path(key)
+    tmp_dir = INDEX_STORE_DIR / f".{key}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        ensure_private_dir(APP_DATA_DIR)
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        faiss.write_index(vectorstore.index, str(tmp_dir / INDEX_FILENAME))
+        _write_docstore(tmp_dir / DOCSTORE_FILENAME, vectorstore)
+        with open(tmp_dir / META_FILENAME, "w", encoding="utf-8") as f:
+            json.dump(metadata or {}, f, default=str)
+
+        # Proses lain mungkin sudah menyimpan indeks yang sama lebih dulu
+        if has_stored_index(key):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            # Direktori lama dengan format docstore sebelumnya (pickle) diganti
+            if target.exists():
+                shutil.rmtree(target, ignore_errors=True)
+            os.replace(tmp_dir, target)
+    except Exception as e:
+        logging.error(f"Error menyimpan indeks: {str(e)}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def save_summary_tree(key, tree):
+    """
+    Menyimpan pohon ringkasan di direktori indeks yang sudah tersimpan
+
+    Returns:
+        True jika tersimpan (indeks untuk kunci ini harus sudah ada)
+    """
+    target = _store_path(key)
+    if not target.exists():
+        return False
+    tmp_path = target / f".{SUMMARY_FILENAME}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(tree, f, ensure_ascii=False)
+        os.replace(tmp_path, target / SUMMARY_FILENAME)
+        return True
+    except Exception as e:
+        logging.error(f"Error menyimpan pohon ringkasan: {str(e)}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        return False
+
+def load_summary_tree(key):
+    """Memuat pohon ringkasan yang tersimpan (None jika belum ada)"""
+    path = _store_path(key) / SUMMARY_FILENAME
+    if not path.exists():
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        logging.error(f"Error memuat pohon ringkasan: {str(e)}")
+        return None
+
+def _read_index_mmap(path):
+    """Membaca indeks FAISS secara read-only dan memory-mapped jika didukung"""
+    import faiss
+
+    flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+    try:
+        return faiss.read_index(str(path), flags)
+    except Exception as e:
+        # Tidak semua tipe indeks/versi FAISS mendukung mmap
+        logging.info(f"mmap tidak didukung untuk indeks ini, membaca biasa: {str(e)}")
+        return faiss.read_index(str(path))
+
+def load_vectorstore(key, embeddings):
+    """
+    Memuat vectorstore yang tersimpan (read-only, memory-mapped)
+
+    Indeks dan docstore di-cache per proses (LRU hingga LOADED_INDEX_CACHE_MB)
+    sehingga beberapa sesi berbagi satu salinan. Vectorstore hasil fungsi ini
+    tidak boleh dimodifikasi (add/delete).
+
+    Args:
+        key: Kunci dari index_store_key
+        embeddings: Fungsi embedding untuk query pada sesi ini
+
+    Returns:
+        Tuple (vectorstore, metadata) atau None jika tidak tersimpan
+    """
+    global _loaded_bytes
+
+    if not has_stored_index(key):
+        return None
+
+    try:
+        from langchain_community.vectorstores import FAISS
+
+        with _loaded_lock:
+            if key in _loaded_indexes:
+                _loaded_indexes.move_to_end(key)
+            else:
+                path = _store_path(key)
+                index = _read_index_mmap(path / INDEX_FILENAME)
+                docstore, index_to_docstore_id = _read_docstore(path / DOCSTORE_FILENAME)
+                with open(path / META_FILENAME, encoding="utf-8") as f:
+                    metadata = json.load(f)
+                size = sum(os.path.getsize(path / name) for name in (INDEX_FILENAME, DOCSTORE_FILENAME))
+                _loaded_indexes[key] = (index, docstore, index_to_docstore_id, metadata, size)
+                _loaded_bytes += size
+                # Indeks yang paling lama tidak dipakai dibuang (yang baru dimuat selalu dipertahankan)
+                while _loaded_bytes > LOADED_INDEX_CACHE_MB * 1024 * 1024 and len(_loaded_indexes) > 1:
+                    evicted_key, evicted = _loaded_indexes.popitem(last=False)
+                    _lexical_indexes.pop(evicted_key, None)
+                    _loaded_bytes -= evicted[-1]
+
+            index, docstore, index_to_docstore_id, metadata, _ = _loaded_indexes[key]
+
+        vectorstore = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id
+        )
+        return vectorstore, dict(metadata)
+    except Exception as e:
+        logging.error(f"Error memuat indeks tersimpan: {str(e)}")
+        return None
+
+def get_lexical_index(key, vectorstore):
+    """
+    Indeks BM25 untuk vectorstore hasil load_vectorstore, dipakai bersama antar sesi
+
+    Dibangun sekali per indeks yang dimuat dan ikut dibuang saat indeksnya keluar
+    dari cache; indeks yang tidak (lagi) di-cache dibangun tanpa disimpan.
+    """
+    from utils.lexical_index import build_lexical_index
+
+    with _loaded_lock:
+        lexical_index = _lexical_indexes.get(key)
+    if lexical_index is not None:
+        return lexical_index
+
+    lexical_index = build_lexical_index(vectorstore)
+    with _loaded_lock:
+        entry = _loaded_indexes.get(key)
+        if entry is not None and entry[0] is vectorstore.index:
+            lexical_index = _lexical_indexes.setdefault(key, lexical_index)
+    return lexical_index
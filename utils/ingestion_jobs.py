@@ -0,0 +1,242 @@
+# Antrean job ingestion dokumen di background (worker pool + registry job)
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from config import INGESTION_RESULT_TTL_SECONDS, INGESTION_WORKERS
+
+JOB_STATUSES = {
+    "queued": "⏳ Menunggu",
+    "running": "⚙️ Diproses",
+    "done": "✅ Selesai",
+    "failed": "❌ Gagal",
+    "cancelled": "🚫 Dibatalkan"
+}
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+class JobCancelled(Exception):
+    """Dilempar dari callback progres untuk menghentikan job yang dibatalkan"""
+
+class IngestionJob:
+    """
+    Satu file yang sedang/akan diproses di background.
+
+    Worker membangun vectorstore milik file ini saja; penggabungan ke korpus
+    sesi dilakukan oleh thread script Streamlit saat hasil diambil (collect),
+    sehingga indeks FAISS korpus tidak pernah diubah dan dicari bersamaan.
+    Selama berjalan, partial berisi snapshot indeks parsial (vectorstore,
+    jumlah_chunk) yang sudah bisa dicari UI.
+    """
+
+    def __init__(self, session_id, filename, file_hash, embedding_backend):
+        self.job_id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.filename = filename
+        self.file_hash = file_hash
+        self.embedding_backend = embedding_backend
+        self.status = "queued"
+        self.done = 0
+        self.total = 0
+        self.error = None
+        self.result = None
+        self.partial = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._finished_event = threading.Event()
+
+    @property
+    def progress(self):
+        if self.status == "done":
+            return 1.0
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    @property
+    def finished(self):
+        return self.status in FINISHED_STATUSES
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def wait(self, timeout=None):
+        """Menunggu worker selesai dengan job ini (True jika selesai sebelum timeout)"""
+        return self._finished_event.wait(timeout)
+
+    def to_dict(self):
+        """Status job untuk ditampilkan/di-poll"""
+        return {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "file_hash": self.file_hash,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "done": self.done,
+            "total": self.total,
+            "error": self.error,
+            "elapsed": round((self.finished_at or time.time()) - (self.started_at or self.created_at), 1)
+        }
+
+class IngestionJobManager:
+    """Worker pool bersama dan registry job per sesi"""
+
+    def __init__(self, max_workers=INGESTION_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, uploaded_file, embeddings, embedding_backend=None, **processing_kwargs):
+        """
+        Mendaftarkan file untuk diproses di background
+
+        Args:
+            session_id: ID sesi pemilik job
+            uploaded_file: File yang diunggah
+            embeddings: Instance embedding khusus job ini (lihat get_embeddings)
+            embedding_backend: Nama backend embedding (dicocokkan dengan korpus saat collect)
+            **processing_kwargs: Parameter untuk build_file_vectorstore
+
+        Returns:
+            IngestionJob (job yang sudah ada dikembalikan jika file yang sama masih diproses)
+        """
+        from utils.file_processing import get_file_hash
+
+        file_hash = get_file_hash(uploaded_file)
+        with self._lock:
+            self._prune()
+            for job in self._jobs.values():
+                if job.session_id == session_id and job.file_hash == file_hash and job.status in ("queued", "running", "done"):
+                    return job
+            job = IngestionJob(session_id, uploaded_file.name, file_hash, embedding_backend)
+            self._jobs[job.job_id] = job
+        self._executor.submit(self._run, job, uploaded_file, embeddings, processing_kwargs)
+        logging.info(f"Job ingestion {job.job_id} untuk {uploaded_file.name} didaftarkan")
+        return job
+
+    def _run(self, job, uploaded_file, embeddings, processing_kwargs):
+        from utils.file_processing import build_file_vectorstore
+
+        if job._cancel_event.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            job._finished_event.set()
+            return
+
+        def update_progress(done, total):
+            if job._cancel_event.is_set():
+                raise JobCancelled()
+            job.done, job.total = done, total
+
+        def publish_partial(vectorstore, chunk_count):
+            job.partial = (vectorstore, chunk_count)
+
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            job.result = build_file_vectorstore(
+                uploaded_file,
+                embeddings,
+                progress_callback=update_progress,
+                on_partial_index=publish_partial,
+                session_id=job.session_id,
+                **processing_kwargs
+            )
+            # Dibatalkan setelah indeks selesai: hasil tidak digabung ke korpus
+            job.status = "cancelled" if job._cancel_event.is_set() else "done"
+        except JobCancelled:
+            job.status = "cancelled"
+            logging.info(f"Job ingestion {job.filename} dibatalkan")
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            logging.error(f"Error memproses file {job.filename} di background: {str(e)}")
+        finally:
+            job.finished_at = time.time()
+            job.partial = None
+            job._finished_event.set()
+            with self._lock:
+                self._prune()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for_session(self, session_id):
+        """Semua job sesi yang belum diambil, urut waktu daftar"""
+        with self._lock:
+            self._prune()
+            return sorted((job for job in self._jobs.values() if job.session_id == session_id),
+                          key=lambda job: job.created_at)
+
+    def status(self, session_id):
+        """Status semua job sesi dalam bentuk dict"""
+        return [job.to_dict() for job in self.jobs_for_session(session_id)]
+
+    def has_active_jobs(self, session_id):
+        return any(not job.finished for job in self.jobs_for_session(session_id))
+
+    def collect(self, session_id):
+        """
+        Mengambil job sesi yang sudah selesai dan menghapusnya dari registry
+
+        Returns:
+            List IngestionJob yang selesai (done, failed, atau cancelled)
+        """
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.session_id == session_id and job.finished]
+            for job in finished:
+                del self._jobs[job.job_id]
+        return sorted(finished, key=lambda job: job.created_at)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job:
+            job.cancel()
+        return job is not None
+
+    def cancel_session(self, session_id, timeout=0):
+        """
+        Membatalkan semua job sesi (mis. saat file dibersihkan)
+
+        Job berhenti di pembaruan progres berikutnya; dengan timeout > 0 fungsi
+        menunggu hingga semua job yang sedang berjalan selesai.
+
+        Returns:
+            True jika tidak ada lagi job sesi yang berjalan
+        """
+        jobs = self.jobs_for_session(session_id)
+        for job in jobs:
+            job.cancel()
+        deadline = time.monotonic() + timeout
+        for job in jobs:
+            if job.status == "queued":
+                continue
+            if not job.wait(max(deadline - time.monotonic(), 0)):
+                return False
+        return True
+
+    def _prune(self):
+        """
+        Buang hasil job yang tidak pernah diambil (sesi sudah ditutup)
+
+        Dipanggil saat job didaftarkan, selesai, dan saat registry dibaca, sehingga
+        hasil yang kedaluwarsa tidak bertahan walaupun tidak ada job baru.
+        """
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and now - job.finished_at > INGESTION_RESULT_TTL_SECONDS]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+_manager = None
+_manager_lock = threading.Lock()
+
+def get_job_manager():
+    """Job manager bersama untuk seluruh proses (dibuat sekali)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = IngestionJobManager()
+        return _manager
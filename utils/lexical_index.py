@@ -0,0 +1,283 @@
+# Indeks leksikal (inverted index BM25) dan retriever hybrid leksikal + vektor
+import math
+import re
+import threading
+from array import array
+from typing import Any, List
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+# Token "utuh" seperti INV-2023-001, SKU/AB.12, klausul 4.2.1 dipertahankan sebagai satu term
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-_/.]\w+)*")
+_PART_PATTERN = re.compile(r"[-_/.]")
+
+def tokenize(text):
+    """Tokenisasi untuk BM25: token utuh + bagian-bagiannya, huruf kecil"""
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    for token in [token for token in tokens if not token.isalnum()]:
+        tokens.extend(split_parts(token))
+    return tokens
+
+def split_parts(token):
+    """Bagian token utuh ("inv-2023-0042" -> inv, 2023, 0042); kosong untuk token alfanumerik"""
+    if token.isalnum():
+        return []
+    return [part for part in _PART_PATTERN.split(token) if part]
+
+class BM25Index:
+    """
+    Inverted index BM25 yang bisa ditambah dan dihapus secara bertahap.
+
+    Posting list disimpan sebagai array int32 yang dibaca numpy tanpa salinan
+    saat query. Skor hanya diakumulasi untuk posisi di posting list term query,
+    sehingga biaya pencarian sebanding dengan total panjang posting list
+    tersebut (jumlah dokumen yang memuat term), bukan dengan ukuran korpus;
+    term umum yang muncul di banyak dokumen tetap lebih mahal daripada term langka.
+
+    Dengan int_keys=True, doc_key berupa integer non-negatif (ID ColumnarDocstore)
+    dan pemetaan doc_key <-> posisi disimpan dalam array int64, bukan list/dict.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, int_keys=False):
+        self.k1 = k1
+        self.b = b
+        self.int_keys = int_keys
+        # term -> id term; id term -> (array posisi dokumen, array frekuensi term)
+        self._term_ids = {}
+        self._postings = []
+        # posisi -> doc_key; doc_key -> posisi (array berindeks doc_key, -1 jika tidak ada, untuk int_keys)
+        self._doc_keys = array("q") if int_keys else []
+        self._positions = array("q") if int_keys else {}
+        self._doc_len = array("f")
+        self._alive = bytearray()
+        self._alive_count = 0
+        self._total_len = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return self._alive_count
+
+    def _set_position(self, doc_key, position):
+        if self.int_keys:
+            missing = doc_key + 1 - len(self._positions)
+            if missing > 0:
+                self._positions.extend(array("q", [-1]) * missing)
+        self._positions[doc_key] = position
+
+    def _pop_position(self, doc_key):
+        if not self.int_keys:
+            return self._positions.pop(doc_key, None)
+        if not 0 <= doc_key < len(self._positions) or self._positions[doc_key] < 0:
+            return None
+        position = self._positions[doc_key]
+        self._positions[doc_key] = -1
+        return position
+
+    def add(self, doc_keys, texts):
+        """Menambahkan dokumen (doc_key biasanya id docstore) ke indeks"""
+        with self._lock:
+            term_ids = self._term_ids
+            base = len(self._doc_keys)
+            token_ids, lengths = [], []
+            get_id = term_ids.get
+            for doc_key, text in zip(doc_keys, texts):
+                tokens = tokenize(text)
+                ids = list(map(get_id, tokens))
+                if None in ids:
+                    ids = [term_ids.setdefault(token, len(term_ids)) for token in tokens]
+                token_ids.extend(ids)
+                lengths.append(len(ids))
+                self._set_position(doc_key, len(self._doc_keys))
+                self._doc_keys.append(doc_key)
+
+            n_new = len(self._doc_keys) - base
+            self._doc_len.extend(lengths)
+            self._alive.extend(b"\x01" * n_new)
+            self._alive_count += n_new
+            self._total_len += sum(lengths)
+            while len(self._postings) < len(term_ids):
+                self._postings.append((array("i"), array("f")))
+            if not token_ids:
+                return
+
+            # Hitung frekuensi (term, dokumen) sekaligus lalu kelompokkan per term,
+            # sehingga posting list diperpanjang sekali per term, bukan per token
+            terms = np.asarray(token_ids, dtype=np.int64)
+            docs = np.repeat(np.arange(base, base + n_new, dtype=np.int64), lengths)
+            pairs, tfs = np.unique((terms << 32) | docs, return_counts=True)
+            pair_terms = pairs >> 32
+            pair_docs = (pairs & 0xFFFFFFFF).astype(np.int32)
+            tfs = tfs.astype(np.float32)
+            bounds = np.flatnonzero(np.diff(pair_terms)) + 1
+            for start, end in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(pairs)]))):
+                positions, frequencies = self._postings[pair_terms[start]]
+                positions.frombytes(pair_docs[start:end].tobytes())
+                frequencies.frombytes(tfs[start:end].tobytes())
+
+    def remove(self, doc_keys):
+        """Menghapus dokumen (tombstone; indeks dipadatkan jika banyak yang terhapus)"""
+        with self._lock:
+            for doc_key in doc_keys:
+                position = self._pop_position(doc_key)
+                if position is None or not self._alive[position]:
+                    continue
+                self._alive[position] = 0
+                self._alive_count -= 1
+                self._total_len -= self._doc_len[position]
+
+            dead = len(self._doc_keys) - self._alive_count
+            if dead > 1000 and dead > self._alive_count:
+                self._compact()
+
+    def _compact(self):
+        """Membangun ulang posting list tanpa dokumen yang sudah dihapus"""
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        remap = np.cumsum(alive, dtype=np.int64) - 1
+
+        postings = []
+        for positions, tfs in self._postings:
+            positions = np.frombuffer(positions, dtype=np.int32)
+            keep = alive[positions]
+            new_positions, new_tfs = array("i"), array("f")
+            new_positions.frombytes(remap[positions[keep]].astype(np.int32).tobytes())
+            new_tfs.frombytes(np.frombuffer(tfs, dtype=np.float32)[keep].tobytes())
+            postings.append((new_positions, new_tfs))
+
+        doc_len = array("f")
+        doc_len.frombytes(np.frombuffer(self._doc_len, dtype=np.float32)[alive].tobytes())
+        self._postings = postings
+        self._doc_len = doc_len
+        if self.int_keys:
+            doc_keys = np.frombuffer(self._doc_keys, dtype=np.int64)[alive]
+            positions = np.full(len(self._positions), -1, dtype=np.int64)
+            positions[doc_keys] = np.arange(len(doc_keys), dtype=np.int64)
+            self._doc_keys, self._positions = array("q"), array("q")
+            self._doc_keys.frombytes(doc_keys.tobytes())
+            self._positions.frombytes(positions.tobytes())
+        else:
+            self._doc_keys = [doc_key for doc_key, is_alive in zip(self._doc_keys, alive) if is_alive]
+            self._positions = {doc_key: i for i, doc_key in enumerate(self._doc_keys)}
+        self._alive = bytearray(b"\x01") * len(self._doc_keys)
+
+    def search(self, query, k=5, terms=None):
+        """
+        Mencari dokumen dengan skor BM25 tertinggi
+
+        Args:
+            terms: Term query yang sudah ditentukan (lihat query_terms); default dari indeks ini
+
+        Returns:
+            List (doc_key, skor) terurut menurun
+        """
+        if terms is None:
+            terms = query_terms(query, [self])
+        with self._lock:
+            if not self._alive_count:
+                return []
+            avgdl = self._total_len / self._alive_count or 1.0
+            doc_len = np.frombuffer(self._doc_len, dtype=np.float32)
+            alive = np.frombuffer(self._alive, dtype=np.uint8)
+            matched_positions, matched_scores = [], []
+
+            for term in terms:
+                term_id = self._term_ids.get(term)
+                if term_id is None:
+                    continue
+                postings = self._postings[term_id]
+                positions = np.frombuffer(postings[0], dtype=np.int32)
+                tfs = np.frombuffer(postings[1], dtype=np.float32)
+                df = len(positions)
+                if not df:
+                    continue
+                idf = math.log(1 + (self._alive_count - df + 0.5) / (df + 0.5))
+                norm = self.k1 * (1 - self.b + self.b * doc_len[positions] / avgdl)
+                keep = alive[positions].astype(bool)
+                matched_positions.append(positions[keep])
+                matched_scores.append((idf * tfs * (self.k1 + 1) / (tfs + norm))[keep])
+
+            if not matched_positions:
+                return []
+            # Skor dijumlahkan per dokumen hanya untuk posisi yang cocok (sparse), bukan array seukuran korpus
+            positions, inverse = np.unique(np.concatenate(matched_positions), return_inverse=True)
+            if not len(positions):
+                return []
+            scores = np.bincount(inverse, weights=np.concatenate(matched_scores))
+
+            k = min(k, len(positions))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self._doc_keys[positions[i]], float(scores[i])) for i in top if scores[i] > 0]
+
+def query_terms(query, indexes):
+    """
+    Term query yang dicari pada indeks-indeks BM25
+
+    Token utuh yang ada di salah satu indeks (mis. "inv-2023-0042") dicari tanpa
+    bagian-bagiannya, agar dokumen yang hanya memuat "2023" tidak ikut
+    mendapat skor; bagiannya dipakai jika token utuh tidak ditemukan di mana pun.
+    """
+    terms = set()
+    for token in _TOKEN_PATTERN.findall(query.lower()):
+        if any(token in index._term_ids for index in indexes):
+            terms.add(token)
+        else:
+            terms.update(split_parts(token))
+    return terms
+
+def build_lexical_index(vectorstore):
+    """Membangun BM25Index dari seluruh chunk di vectorstore FAISS (int_keys jika ID chunk integer)"""
+    doc_keys = list(vectorstore.index_to_docstore_id.values())
+    index = BM25Index(int_keys=all(isinstance(doc_key, int) and doc_key >= 0 for doc_key in doc_keys))
+    index.add(doc_keys, [vectorstore.docstore.search(doc_key).page_content for doc_key in doc_keys])
+    return index
+
+class HybridRetriever(BaseRetriever):
+    """
+    Retriever hybrid: hasil BM25 dan pencarian vektor FAISS digabung dengan
+    Reciprocal Rank Fusion menjadi satu daftar peringkat.
+
+    Jika `cache` (RetrievalCache) diberikan, embedding query dan hasil top-k
+    untuk `index_version` yang sama diambil dari cache.
+    """
+
+    vectorstore: Any
+    lexical_index: Any
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+    lexical_weight: float = 1.0
+    vector_weight: float = 1.0
+    cache: Any = None
+    index_version: str = ""
+
+    def _vector_search(self, query):
+        """Pencarian vektor yang mengembalikan id docstore (bukan Document)"""
+        embeddings = self.vectorstore.embedding_function
+        if self.cache is not None:
+            embedding = self.cache.embed_query(query, embeddings)
+        else:
+            embedding = embeddings.embed_query(query)
+        vector = np.asarray([embedding], dtype=np.float32)
+        _, indices = self.vectorstore.index.search(vector, self.fetch_k)
+        return [self.vectorstore.index_to_docstore_id[i] for i in indices[0] if i != -1]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        params = (self.k, self.fetch_k, self.rrf_k, self.lexical_weight, self.vector_weight)
+        if self.cache is not None:
+            cached = self.cache.get_results(self.index_version, query, params)
+            if cached is not None:
+                return [self.vectorstore.docstore.search(doc_key) for doc_key in cached]
+
+        fused = {}
+        lexical_ids = [doc_key for doc_key, _ in self.lexical_index.search(query, self.fetch_k)]
+        for weight, ranked in ((self.lexical_weight, lexical_ids), (self.vector_weight, self._vector_search(query))):
+            for rank, doc_key in enumerate(ranked):
+                fused[doc_key] = fused.get(doc_key, 0.0) + weight / (self.rrf_k + rank + 1)
+
+        top = sorted(fused, key=fused.get, reverse=True)[:self.k]
+        if self.cache is not None:
+            self.cache.put_results(self.index_version, query, top, params)
+        return [self.vectorstore.docstore.search(doc_key) for doc_key in top]
@@ -0,0 +1,209 @@
+# Cache panggilan LLM (prompt persis sama) di memori dan SQLite, dipasang pada semua provider
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.caches import BaseCache
+
+from config import (LLM_CACHE_ENABLED, LLM_CACHE_MAX_MB, LLM_CACHE_MEMORY_ENTRIES, LLM_CACHE_PATH,
+                    LLM_CACHE_TTL_SECONDS)
+
+# Ukuran total dicek ulang (dan entri lama dibuang) setiap sekian penulisan
+_EVICTION_INTERVAL = 20
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def llm_cache_key(prompt, llm_string):
+    """
+    Kunci cache: hash dari konfigurasi model + prompt lengkap
+
+    llm_string dibuat oleh langchain dari kelas provider dan parameternya (model,
+    temperature, max_tokens, stop); prompt berisi seluruh pesan yang dikirim.
+    """
+    payload = f"{llm_string}\x00{prompt}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+class LLMCallCache(BaseCache):
+    """
+    Cache langchain dua tingkat untuk panggilan LLM yang identik.
+
+    - Tingkat memori: LRU berisi hasil yang sudah di-deserialisasi.
+    - Tingkat disk: SQLite dengan TTL; jika ukuran total melewati batas, entri
+      yang paling lama tidak dipakai dibuang lebih dulu.
+
+    Rerun Streamlit setelah error atau submit ganda tidak lagi membayar latensi
+    dan token untuk prompt yang sama. Hanya panggilan yang berhasil yang disimpan.
+    """
+
+    def __init__(self, cache_path=LLM_CACHE_PATH, ttl_seconds=LLM_CACHE_TTL_SECONDS,
+                 max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024, memory_entries=LLM_CACHE_MEMORY_ENTRIES):
+        self.cache_path = cache_path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        from utils.security import ensure_private_dir
+        ensure_private_dir(self.cache_path.parent)
+        self._conn = sqlite3.connect(str(self.cache_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_calls (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_calls_accessed ON llm_calls (accessed)")
+        self._conn.commit()
+
+    def _expired(self, created, now):
+        return self.ttl_seconds > 0 and now - created > self.ttl_seconds
+
+    def _remember(self, key, created, generations):
+        self._memory[key] = (created, generations)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def lookup(self, prompt, llm_string):
+        """Hasil (list Generation) yang tersimpan untuk prompt dan model ini, atau None"""
+        from langchain_core.load import loads
+
+        key = llm_cache_key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                created, generations = cached
+                if not self._expired(created, now):
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    # Salinan agar perubahan pada hasil (id pesan, metadata) tidak mengubah isi cache
+                    return [generation.model_copy(deep=True) for generation in generations]
+                del self._memory[key]
+
+            row = self._conn.execute("SELECT value, created FROM llm_calls WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created = row
+            if self._expired(created, now):
+                self._conn.execute("DELETE FROM llm_calls WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_calls SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+        try:
+            try:
+                # Hanya kelas inti langchain (Generation, pesan) yang boleh dibuat dari cache
+                generations = loads(value, allowed_objects="core")
+            except TypeError:
+                # langchain-core versi lama belum mengenal allowed_objects
+                generations = loads(value)
+        except Exception as e:
+            logging.error(f"Error membaca cache LLM: {str(e)}")
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self._remember(key, created, [generation.model_copy(deep=True) for generation in generations])
+            self.disk_hits += 1
+        return generations
+
+    def update(self, prompt, llm_string, return_val):
+        """Menyimpan hasil panggilan LLM ke memori dan disk"""
+        from langchain_core.load import dumps
+
+        key = llm_cache_key(prompt, llm_string)
+        now = time.time()
+        try:
+            value = dumps(list(return_val))
+        except Exception as e:
+            logging.error(f"Error menyimpan cache LLM: {str(e)}")
+            return
+        with self._lock:
+            self._remember(key, now, [generation.model_copy(deep=True) for generation in return_val])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_calls (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % _EVICTION_INTERVAL == 1:
+                self._evict(now)
+
+    def _evict(self, now):
+        """Membuang entri kedaluwarsa lalu entri paling lama tidak dipakai hingga ukuran di bawah batas"""
+        if self.ttl_seconds > 0:
+            self._conn.execute("DELETE FROM llm_calls WHERE created < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_calls").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            removed = 0
+            keys = []
+            for key, size in self._conn.execute("SELECT key, size FROM llm_calls ORDER BY accessed"):
+                keys.append((key,))
+                removed += size
+                if removed >= excess:
+                    break
+            self._conn.executemany("DELETE FROM llm_calls WHERE key = ?", keys)
+            for (key,) in keys:
+                self._memory.pop(key, None)
+            logging.info(f"Cache LLM melewati batas ukuran, {len(keys)} entri lama dibuang")
+        self._conn.commit()
+
+    def clear(self, **kwargs):
+        """Menghapus semua entri cache"""
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute("DELETE FROM llm_calls")
+            self._conn.commit()
+
+    def stats(self):
+        """Jumlah hit (memori/disk), miss, dan jumlah entri di disk"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_calls").fetchone()[0]
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": entries
+            }
+
+    def close(self):
+        """Tutup koneksi SQLite"""
+        try:
+            self._conn.close()
+        except Exception as e:
+            logging.error(f"Error menutup cache LLM: {str(e)}")
+
+def get_llm_cache():
+    """
+    Cache LLM tingkat proses (dipakai bersama semua sesi)
+
+    Returns:
+        LLMCallCache, atau None jika cache dinonaktifkan atau gagal dibuka
+    """
+    global _cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = LLMCallCache()
+            except Exception as e:
+                logging.error(f"Error membuka cache LLM: {str(e)}")
+                return None
+        return _cache
@@ -20,30 +20,36 @@ class AIProviderFactory:
             max_tokens: Token maksimum untuk output
             
         Returns:
-            Provider AI yang sesuai
+            Provider AI yang sesuai (dengan cache panggilan LLM terpasang)
         """
         if provider_name == "openai":
             if not model_name:
                 model_name = "gpt-3.5-turbo"
-            return AIProviderFactory._get_openai_provider(api_key, model_name, temperature, max_tokens)
+            provider = AIProviderFactory._get_openai_provider(api_key, model_name, temperature, max_tokens)
             
         elif provider_name == "anthropic":
             if not model_name:
                 model_name = "claude-3-sonnet-20240229"
-            return AIProviderFactory._get_anthropic_provider(api_key, model_name, temperature, max_tokens)
+            provider = AIProviderFactory._get_anthropic_provider(api_key, model_name, temperature, max_tokens)
             
         elif provider_name == "groq":
             if not model_name:
                 model_name = "llama3-8b-8192"  # Default model yang diperbarui
-            return AIProviderFactory._get_groq_provider(api_key, model_name, temperature, max_tokens)
+            provider = AIProviderFactory._get_groq_provider(api_key, model_name, temperature, max_tokens)
             
         elif provider_name == "huggingface":
             if not model_name:
                 model_name = "mistralai/Mistral-7B-Instruct-v0.2"
-            return AIProviderFactory._get_huggingface_provider(api_key, model_name, temperature)
+            provider = AIProviderFactory._get_huggingface_provider(api_key, model_name, temperature)
         
         else:
             raise ValueError(f"Provider tidak didukung: {provider_name}")
+        
+        # Panggilan dengan model, parameter, dan prompt yang sama dijawab dari cache (memori/disk)
+        if provider is not None:
+            from utils.llm_cache import get_llm_cache
+            provider.cache = get_llm_cache()
+        return provider
     
     @staticmethod
     def _get_openai_provider(api_key, model_name, temperature, max_tokens):
@@ -0,0 +1,548 @@
+# Loader dokumen berbasis generator (streaming) untuk ingestion bertahap
+import logging
+import re
+
+def iter_pdf_pages(file_path, source=None, reader=None):
+    """
+    Membaca PDF halaman demi halaman
+
+    Metadata sama dengan PyPDFLoader ("source", "page") sehingga chunk yang
+    dihasilkan kompatibel dengan pipeline yang ada.
+
+    Args:
+        file_path: Path atau buffer file PDF
+        source: Nama sumber untuk metadata (default: file_path)
+        reader: PdfReader yang sudah dibuka (opsional)
+
+    Yields:
+        Document untuk setiap halaman
+    """
+    from langchain_core.documents import Document
+    from pypdf import PdfReader
+
+    source = source or file_path
+    reader = reader or PdfReader(file_path)
+    for page_number, page in enumerate(reader.pages):
+        try:
+            text = page.extract_text() or ""
+        except Exception as e:
+            logging.warning(f"Gagal mengekstrak halaman {page_number}: {str(e)}")
+            text = ""
+        yield Document(page_content=text, metadata={"source": source, "page": page_number})
+
+def iter_split_documents(docs, text_splitter):
+    """
+    Memecah dokumen menjadi chunks satu per satu (tanpa menampung semua dokumen)
+
+    Args:
+        docs: Iterable Document
+        text_splitter: Text splitter langchain
+
+    Yields:
+        Document chunk
+    """
+    for doc in docs:
+        yield from text_splitter.split_documents([doc])
+
+# Jumlah baris CSV yang dibaca pandas per iterasi
+CSV_READ_CHUNKSIZE = 10000
+# Batas token per blok baris CSV (default; pipeline file memakai chunk_size)
+CSV_GROUP_TOKENS = 400
+# Batas nilai unik yang dilacak per kolom kategori untuk ringkasan
+_MAX_TRACKED_VALUES = 1000
+
+def iter_csv_rows(file, source):
+    """
+    Satu dokumen per baris CSV (format sama dengan CSVLoader) dari buffer
+
+    Args:
+        file: Buffer biner file CSV
+        source: Nama sumber untuk metadata
+
+    Yields:
+        Document per baris (metadata: source, row)
+    """
+    import csv
+    import io
+    from langchain_core.documents import Document
+
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8", newline=""))
+    for i, row in enumerate(reader):
+        content = "\n".join(
+            f"{(key or '').strip()}: {(value or '').strip() if isinstance(value, str) else value}"
+            for key, value in row.items()
+        )
+        yield Document(page_content=content, metadata={"source": source, "row": i})
+
+class _ColumnSummary:
+    """Statistik berjalan untuk satu kolom CSV"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.missing = 0
+        self.numeric = True
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.values = {}
+        self.high_cardinality = False
+
+    def update(self, series):
+        import pandas as pd
+
+        self.missing += int(series.isna().sum())
+        series = series.dropna()
+        self.count += len(series)
+        if self.numeric and pd.api.types.is_numeric_dtype(series):
+            if len(series):
+                self.total += float(series.sum())
+                low, high = series.min(), series.max()
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+            return
+
+        self.numeric = False
+        if self.high_cardinality:
+            return
+        for value, n in series.astype(str).value_counts().items():
+            self.values[value] = self.values.get(value, 0) + int(n)
+        if len(self.values) > _MAX_TRACKED_VALUES:
+            self.high_cardinality = True
+            self.values = {}
+
+    def to_text(self):
+        lines = [f"Ringkasan kolom '{self.name}':", f"Jumlah nilai: {self.count} (kosong: {self.missing})"]
+        if self.numeric and self.count:
+            lines += [
+                f"Total: {self.total:,.4g}",
+                f"Rata-rata: {self.total / self.count:,.4g}",
+                f"Minimum: {self.min}",
+                f"Maksimum: {self.max}"
+            ]
+        elif self.high_cardinality:
+            lines.append(f"Lebih dari {_MAX_TRACKED_VALUES} nilai unik")
+        else:
+            top = sorted(self.values.items(), key=lambda item: -item[1])[:20]
+            lines.append(f"Nilai unik: {len(self.values)}")
+            lines.append("Nilai terbanyak: " + ", ".join(f"{value} ({n})" for value, n in top))
+        return "\n".join(lines)
+
+class _RowBlockBuilder:
+    """
+    Mengumpulkan baris tabel menjadi blok berisi header kolom, terbatas token
+
+    Header dipotong jika lebih dari separuh batas token, dan satu baris yang
+    sendirian melebihi batas dipecah menjadi beberapa blok (metadata row_part),
+    sehingga tidak ada blok yang melebihi max_tokens.
+    """
+
+    def __init__(self, header, max_tokens, metadata):
+        from utils.embedding_pipeline import count_tokens
+        from utils.text_splitter import TokenTextSplitter
+
+        self._count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        if count_tokens(header) > max_tokens // 2:
+            header = TokenTextSplitter(chunk_size=max(max_tokens // 2, 1), chunk_overlap=0).split_text(header)[0]
+        self.header = header
+        self.header_tokens = count_tokens(header)
+        # Cadangan 2 token untuk pemisah baris dan pembulatan hitungan token saat teks digabung
+        self._row_splitter = TokenTextSplitter(chunk_size=max(max_tokens - self.header_tokens - 2, 1),
+                                               chunk_overlap=0)
+        self.metadata = metadata
+        self.rows, self.row_tokens, self.row_start, self.row_end = [], 0, None, None
+
+    def add(self, row_number, line):
+        """
+        Menambahkan satu baris
+
+        Returns:
+            List blok yang sudah selesai (blok sebelumnya jika batas token
+            terlampaui, dan potongan baris yang terlalu panjang)
+        """
+        # +1 untuk pemisah baris (hitungan token gabungan bisa lebih besar dari jumlah per baris)
+        tokens = self._count_tokens(line) + 1
+        documents = []
+        if self.rows and self.header_tokens + self.row_tokens + tokens > self.max_tokens:
+            documents.append(self.flush())
+        if self.header_tokens + tokens > self.max_tokens:
+            documents.extend(self._split_row(row_number, line))
+            return documents
+        if not self.rows:
+            self.row_start = row_number
+        self.rows.append(line)
+        self.row_tokens += tokens
+        self.row_end = row_number
+        return documents
+
+    def _split_row(self, row_number, line):
+        """Blok untuk satu baris yang melebihi batas token, satu per potongan"""
+        from langchain_core.documents import Document
+
+        parts = self._row_splitter.split_text(line)
+        return [
+            Document(
+                page_content=self.header + "\n" + part,
+                metadata={
+                    **self.metadata,
+                    "row_start": row_number,
+                    "row_end": row_number,
+                    "row_count": 1,
+                    "row_part": i,
+                    "row_parts": len(parts)
+                }
+            )
+            for i, part in enumerate(parts, start=1)
+        ]
+
+    def flush(self):
+        """Blok yang sedang dikumpulkan (None jika kosong)"""
+        from langchain_core.documents import Document
+
+        if not self.rows:
+            return None
+        document = Document(
+            page_content=self.header + "\n" + "\n".join(self.rows),
+            metadata={
+                **self.metadata,
+                "row_start": self.row_start,
+                "row_end": self.row_end,
+                "row_count": len(self.rows)
+            }
+        )
+        self.rows, self.row_tokens = [], 0
+        return document
+
+def iter_csv_row_groups(file_path, max_tokens=CSV_GROUP_TOKENS, include_column_summaries=False,
+                        read_chunksize=CSV_READ_CHUNKSIZE, source=None):
+    """
+    Membaca CSV secara streaming dan mengelompokkan baris menjadi blok
+
+    Setiap blok berisi nama kolom dan sejumlah baris (dengan nomor barisnya)
+    hingga batas token tercapai, sehingga satu blok = satu embedding.
+
+    Args:
+        file_path: Path atau buffer file CSV
+        max_tokens: Batas token per blok
+        include_column_summaries: Tambahkan dokumen ringkasan per kolom di akhir
+        read_chunksize: Jumlah baris yang dibaca pandas per iterasi
+        source: Nama sumber untuk metadata (default: file_path)
+
+    Yields:
+        Document per blok baris (metadata: source, row_start, row_end, row_count)
+    """
+    import pandas as pd
+    from langchain_core.documents import Document
+
+    source = source or file_path
+    summaries = None
+    builder = None
+
+    row_number = 0
+    for frame in pd.read_csv(file_path, chunksize=read_chunksize):
+        if builder is None:
+            header = "Kolom: " + " | ".join(str(column) for column in frame.columns)
+            builder = _RowBlockBuilder(header, max_tokens, {"source": source})
+            if include_column_summaries:
+                summaries = [_ColumnSummary(str(column)) for column in frame.columns]
+
+        if summaries:
+            for summary, column in zip(summaries, frame.columns):
+                summary.update(frame[column])
+
+        lines = frame.fillna("").astype(str).agg(" | ".join, axis=1)
+        for line in lines:
+            yield from builder.add(row_number, f"Baris {row_number + 1}: {line}")
+            row_number += 1
+
+    document = builder.flush() if builder else None
+    if document:
+        yield document
+
+    for summary in summaries or []:
+        yield Document(
+            page_content=summary.to_text(),
+            metadata={"source": source, "column": summary.name, "type": "column_summary", "row_count": 0}
+        )
+
+# Ekstensi workbook Excel yang dibaca dengan openpyxl (mode read-only)
+XLSX_EXTENSIONS = (".xlsx", ".xlsm")
+# Batas karakter satu bagian DOCX/HTML sebelum diteruskan ke text splitter
+SECTION_MAX_CHARS = 8000
+
+def _cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def get_xlsx_row_count(file):
+    """Perkiraan jumlah baris semua sheet dari dimensi yang tercatat di workbook"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        return sum(max((sheet.max_row or 1) - 1, 0) for sheet in workbook.worksheets)
+    finally:
+        workbook.close()
+
+def iter_xlsx_row_groups(file, max_tokens=CSV_GROUP_TOKENS, source=None):
+    """
+    Membaca workbook Excel secara streaming dan mengelompokkan baris menjadi blok
+
+    Workbook dibuka dengan openpyxl read_only sehingga baris dibaca satu per
+    satu dari XML sheet tanpa memuat seluruh workbook ke memori. Baris non-kosong
+    pertama tiap sheet dipakai sebagai header kolom.
+
+    Args:
+        file: Path atau buffer file XLSX
+        max_tokens: Batas token per blok
+        source: Nama sumber untuk metadata (default: file)
+
+    Yields:
+        Document per blok baris (metadata: source, sheet, row_start, row_end,
+        row_count; nomor baris sesuai nomor baris di Excel)
+    """
+    from openpyxl import load_workbook
+
+    source = source or file
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            builder = None
+            for row_number, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+                cells = [_cell_text(value) for value in values]
+                if not any(cells):
+                    continue
+                if builder is None:
+                    header = f"Sheet: {sheet.title}\nKolom: " + " | ".join(
+                        cell or f"Kolom {i + 1}" for i, cell in enumerate(cells))
+                    builder = _RowBlockBuilder(header, max_tokens, {"source": source, "sheet": sheet.title})
+                    continue
+                yield from builder.add(row_number, f"Baris {row_number}: " + " | ".join(cells))
+
+            document = builder.flush() if builder else None
+            if document:
+                yield document
+    finally:
+        workbook.close()
+
+class _SectionBuilder:
+    """Mengumpulkan paragraf menjadi bagian per judul (heading), dibatasi jumlah karakter"""
+
+    def __init__(self, source, max_chars=SECTION_MAX_CHARS):
+        self.source = source
+        self.max_chars = max_chars
+        self.heading = None
+        self.lines = []
+        self.chars = 0
+        self.has_body = False
+        self.index = 0
+
+    def add_heading(self, text):
+        """Judul memulai bagian baru (judul berturut-turut tanpa isi digabung)"""
+        document = self.flush() if self.has_body else None
+        self.heading = text
+        self.lines.append(text)
+        self.chars += len(text) + 1
+        return document
+
+    def add(self, text):
+        """Menambahkan paragraf; mengembalikan bagian sebelumnya jika batas karakter terlampaui"""
+        document = None
+        if self.has_body and self.chars + len(text) > self.max_chars:
+            document = self.flush()
+        self.lines.append(text)
+        self.chars += len(text) + 1
+        self.has_body = True
+        return document
+
+    def flush(self):
+        from langchain_core.documents import Document
+
+        if not self.lines:
+            return None
+        document = Document(
+            page_content="\n".join(self.lines),
+            metadata={"source": self.source, "section": self.heading or "", "section_index": self.index}
+        )
+        self.index += 1
+        self.lines, self.chars, self.has_body = [], 0, False
+        return document
+
+_WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCX_HEADING_PATTERN = re.compile(r"heading|judul|title", re.IGNORECASE)
+
+def iter_docx_sections(file, source=None, max_chars=SECTION_MAX_CHARS):
+    """
+    Membaca dokumen Word (DOCX) secara streaming per bagian
+
+    word/document.xml diparse secara iteratif (iterparse) dan elemen yang sudah
+    diproses langsung dibuang, sehingga memori tetap kecil untuk dokumen besar.
+    Judul (style Heading/Judul/Title) memulai bagian baru; baris tabel ditulis
+    sebagai sel yang dipisah " | ".
+
+    Args:
+        file: Path atau buffer file DOCX
+        source: Nama sumber untuk metadata (default: file)
+        max_chars: Batas karakter per bagian
+
+    Yields:
+        Document per bagian (metadata: source, section, section_index)
+    """
+    import zipfile
+    from xml.etree.ElementTree import iterparse
+
+    source = source or file
+    builder = _SectionBuilder(source, max_chars)
+    table_depth = 0
+    row_cells = []
+    body = None
+
+    def paragraph_text(paragraph):
+        parts = []
+        for element in paragraph.iter():
+            if element.tag == _WORD_NS + "t" and element.text:
+                parts.append(element.text)
+            elif element.tag == _WORD_NS + "tab":
+                parts.append("\t")
+            elif element.tag in (_WORD_NS + "br", _WORD_NS + "cr"):
+                parts.append("\n")
+        return "".join(parts).strip()
+
+    def is_heading(paragraph):
+        style = paragraph.find(f"{_WORD_NS}pPr/{_WORD_NS}pStyle")
+        return style is not None and bool(_DOCX_HEADING_PATTERN.search(style.get(_WORD_NS + "val", "")))
+
+    with zipfile.ZipFile(file) as archive, archive.open("word/document.xml") as xml_file:
+        for event, element in iterparse(xml_file, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == _WORD_NS + "tbl":
+                    table_depth += 1
+                elif tag == _WORD_NS + "body":
+                    body = element
+                continue
+
+            if tag == _WORD_NS + "p" and not table_depth:
+                text = paragraph_text(element)
+                if text:
+                    document = builder.add_heading(text) if is_heading(element) else builder.add(text)
+                    if document:
+                        yield document
+                # Buang elemen yang sudah diproses agar pohon XML tidak tumbuh
+                if body is not None:
+                    body.clear()
+            elif tag == _WORD_NS + "tc" and table_depth:
+                row_cells.append(" ".join(
+                    paragraph_text(paragraph) for paragraph in element.iter(_WORD_NS + "p")).strip())
+            elif tag == _WORD_NS + "tr" and table_depth:
+                if any(row_cells):
+                    document = builder.add(" | ".join(row_cells))
+                    if document:
+                        yield document
+                row_cells = []
+                element.clear()
+            elif tag == _WORD_NS + "tbl":
+                table_depth -= 1
+                if not table_depth and body is not None:
+                    body.clear()
+
+    document = builder.flush()
+    if document:
+        yield document
+
+# Elemen HTML yang isinya diabaikan dan elemen yang memisahkan paragraf
+_HTML_SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+_HTML_BLOCK_TAGS = {"p", "div", "li", "ul", "ol", "br", "table", "tr", "section", "article",
+                    "header", "footer", "blockquote", "pre", "hr", "dd", "dt", "main", "nav", "title"}
+_HTML_HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+_HTML_READ_SIZE = 64 * 1024
+
+def iter_html_sections(file, source=None, max_chars=SECTION_MAX_CHARS, encoding="utf-8"):
+    """
+    Membaca HTML secara streaming per bagian
+
+    File dibaca per 64 KB dan diumpankan ke html.parser secara bertahap; teks
+    dari script/style diabaikan, heading (h1-h6) memulai bagian baru, dan sel
+    tabel dipisah " | ".
+
+    Args:
+        file: Buffer biner file HTML
+        source: Nama sumber untuk metadata
+        max_chars: Batas karakter per bagian
+        encoding: Encoding teks HTML
+
+    Yields:
+        Document per bagian (metadata: source, section, section_index)
+    """
+    import codecs
+    from collections import deque
+    from html.parser import HTMLParser
+
+    builder = _SectionBuilder(source, max_chars)
+    ready = deque()
+
+    class _Parser(HTMLParser):
+        def __init__(self):
+            super().__init__(convert_charrefs=True)
+            self.skip_depth = 0
+            self.in_heading = False
+            self.parts = []
+
+        def flush_text(self):
+            text = " ".join("".join(self.parts).split())
+            self.parts = []
+            if not text:
+                return
+            document = builder.add_heading(text) if self.in_heading else builder.add(text)
+            if document:
+                ready.append(document)
+
+        def handle_starttag(self, tag, attrs):
+            if tag in _HTML_SKIP_TAGS:
+                self.skip_depth += 1
+            elif tag in _HTML_HEADING_TAGS:
+                self.flush_text()
+                self.in_heading = True
+            elif tag in _HTML_BLOCK_TAGS:
+                self.flush_text()
+            elif tag in ("td", "th") and self.parts:
+                self.parts.append(" | ")
+
+        def handle_startendtag(self, tag, attrs):
+            if tag in _HTML_BLOCK_TAGS:
+                self.flush_text()
+
+        def handle_endtag(self, tag):
+            if tag in _HTML_SKIP_TAGS:
+                self.skip_depth = max(self.skip_depth - 1, 0)
+            elif tag in _HTML_HEADING_TAGS:
+                self.flush_text()
+                self.in_heading = False
+            elif tag in _HTML_BLOCK_TAGS:
+                self.flush_text()
+
+        def handle_data(self, data):
+            if not self.skip_depth:
+                self.parts.append(data)
+
+    parser = _Parser()
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    while True:
+        data = file.read(_HTML_READ_SIZE)
+        parser.feed(decoder.decode(data, final=not data))
+        while ready:
+            yield ready.popleft()
+        if not data:
+            break
+
+    parser.close()
+    parser.flush_text()
+    ready.append(builder.flush())
+    while ready:
+        document = ready.popleft()
+        if document:
+            yield document
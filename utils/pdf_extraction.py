@@ -0,0 +1,112 @@
+# Ekstraksi teks PDF multi-core berbasis PyMuPDF
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+PDF_BACKENDS = {
+    "pymupdf": "PyMuPDF (cepat, multi-core)",
+    "pypdf": "PyPDF (kompatibilitas)"
+}
+
+# Jumlah halaman per tugas worker; cukup besar agar overhead antar proses kecil
+PAGES_PER_TASK = 32
+# Di bawah jumlah halaman ini ekstraksi dilakukan langsung tanpa process pool
+MIN_PAGES_FOR_POOL = 64
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+def _get_process_pool(max_workers):
+    """Process pool bersama (dibuat sekali) agar biaya start worker tidak terulang"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != max_workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn: aman dipakai dari proses Streamlit yang multi-thread
+            _pool = ProcessPoolExecutor(max_workers=max_workers,
+                                        mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = max_workers
+        return _pool
+
+def _page_text(page, ocr):
+    text = page.get_text("text")
+    if not text.strip() and ocr:
+        # Halaman hasil scan: coba OCR (membutuhkan Tesseract terpasang)
+        try:
+            text = page.get_text("text", textpage=page.get_textpage_ocr(full=True))
+        except Exception:
+            pass
+    return text
+
+def _extract_page_range(file_path, start, end, ocr=False):
+    """Mengekstrak teks halaman [start, end) — dijalankan di proses worker"""
+    import fitz
+
+    with fitz.open(file_path) as doc:
+        return [(i, _page_text(doc[i], ocr)) for i in range(start, end)]
+
+def get_pdf_page_count_pymupdf(file_path):
+    """Mendapatkan jumlah halaman PDF menggunakan PyMuPDF"""
+    import fitz
+
+    with fitz.open(file_path) as doc:
+        return doc.page_count
+
+def iter_pdf_pages_pymupdf(file_path, max_workers=None, ocr=False, source=None):
+    """
+    Mengekstrak halaman PDF secara paralel dengan PyMuPDF
+
+    Rentang halaman dibagi ke process pool dan hasilnya digabung sesuai urutan
+    halaman. Jumlah tugas yang berjalan dibatasi agar memori tetap terkendali.
+
+    Args:
+        file_path: Path ke file PDF
+        max_workers: Jumlah proses (default: semua core)
+        ocr: Jalankan OCR untuk halaman tanpa teks (hasil scan)
+        source: Nama sumber untuk metadata (default: file_path)
+
+    Yields:
+        Document untuk setiap halaman dengan metadata "source" dan "page"
+    """
+    from langchain_core.documents import Document
+
+    source = source or file_path
+    page_count = get_pdf_page_count_pymupdf(file_path)
+    max_workers = max_workers or os.cpu_count() or 1
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PAGES_PER_TASK)]
+
+    def to_documents(pages):
+        for page_number, text in pages:
+            yield Document(page_content=text, metadata={"source": source, "page": page_number})
+
+    if max_workers <= 1 or page_count < MIN_PAGES_FOR_POOL:
+        for start, end in ranges:
+            yield from to_documents(_extract_page_range(file_path, start, end, ocr))
+        return
+
+    pool = _get_process_pool(max_workers)
+    pending = deque()
+    remaining = iter(ranges)
+    try:
+        # Jaga maksimal 2 tugas per worker dalam antrean
+        for start, end in remaining:
+            pending.append(pool.submit(_extract_page_range, file_path, start, end, ocr))
+            if len(pending) >= max_workers * 2:
+                break
+        while pending:
+            pages = pending.popleft().result()
+            next_range = next(remaining, None)
+            if next_range:
+                pending.append(pool.submit(_extract_page_range, file_path, *next_range, ocr))
+            yield from to_documents(pages)
+    finally:
+        for future in pending:
+            future.cancel()
+        if pending:
+            logging.info("Ekstraksi PDF dihentikan sebelum selesai")
@@ -0,0 +1,239 @@
+# Ekstraksi tabel PDF (PyMuPDF) menjadi DataFrame yang di-cache per file
+import json
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+from config import APP_DATA_DIR, TABLE_STORE_DIR
+from utils.pdf_extraction import MIN_PAGES_FOR_POOL, PAGES_PER_TASK, _get_process_pool
+
+# Kolom dianggap numerik jika sebagian besar selnya berupa angka
+NUMERIC_COLUMN_RATIO = 0.6
+
+_CURRENCY_PATTERN = re.compile(r"(?i)\b(?:rp|idr|usd)\.?|[$€%]")
+_NUMBER_PATTERN = re.compile(r"\(?-?\d[\d.,]*\)?")
+
+# Cache tingkat proses: tabel yang sama dipakai bersama oleh semua sesi
+_loaded_tables = {}
+_loaded_lock = threading.Lock()
+
+def parse_number(value):
+    """
+    Mengubah teks angka dari laporan keuangan menjadi float
+
+    Mendukung format Indonesia dan Inggris ("1.250.000", "1,250,000.50",
+    "15,3%"), mata uang (Rp, USD, $), dan angka negatif dalam kurung "(750.000)".
+
+    Returns:
+        float, atau None jika teks bukan angka
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    text = _CURRENCY_PATTERN.sub("", str(value)).replace("−", "-").replace(" ", "").strip()
+    if not _NUMBER_PATTERN.fullmatch(text):
+        return None
+    negative = text.startswith("-") or (text.startswith("(") and text.endswith(")"))
+    digits = text.strip("()-")
+
+    if "." in digits and "," in digits:
+        decimal = "." if digits.rfind(".") > digits.rfind(",") else ","
+    elif digits.count(".") > 1 or digits.count(",") > 1:
+        decimal = None
+    elif "." in digits or "," in digits:
+        separator = "." if "." in digits else ","
+        # Tepat tiga digit setelah satu pemisah dianggap pemisah ribuan ("1.250")
+        decimal = None if len(digits) - digits.rfind(separator) == 4 else separator
+    else:
+        decimal = None
+
+    if decimal:
+        thousands = "," if decimal == "." else "."
+        digits = digits.replace(thousands, "").replace(decimal, ".")
+    else:
+        digits = digits.replace(".", "").replace(",", "")
+    try:
+        number = float(digits)
+    except ValueError:
+        return None
+    return -number if negative else number
+
+def _column_names(names):
+    """Nama kolom unik dan tidak kosong"""
+    result = []
+    for i, name in enumerate(names):
+        name = " ".join(str(name or "").split()) or f"Kolom {i + 1}"
+        base, suffix = name, 2
+        while name in result:
+            name = f"{base} ({suffix})"
+            suffix += 1
+        result.append(name)
+    return result
+
+def _extract_table_range(file_path, start, end):
+    """Mendeteksi tabel pada halaman [start, end) — dijalankan di proses worker"""
+    import fitz
+
+    tables = []
+    with fitz.open(file_path) as doc:
+        for page_number in range(start, end):
+            try:
+                found = doc[page_number].find_tables().tables
+            except Exception as e:
+                logging.error(f"Error mendeteksi tabel di halaman {page_number}: {str(e)}")
+                continue
+            for table_index, table in enumerate(found):
+                rows = table.extract()
+                if table.header.external:
+                    header = table.header.names
+                else:
+                    header, rows = (rows[0], rows[1:]) if rows else ([], [])
+                tables.append((page_number, table_index, tuple(table.bbox), header, rows))
+    return tables
+
+def table_to_dataframe(header, rows):
+    """
+    Membuat DataFrame dari sel tabel mentah
+
+    Kolom yang sebagian besar berisi angka dikonversi ke float (lihat
+    parse_number); kolom lain tetap berupa teks.
+    """
+    import pandas as pd
+
+    columns = _column_names(header or [None] * max((len(row) for row in rows), default=0))
+    cleaned = [[" ".join(str(cell).split()) if cell is not None else "" for cell in row]
+               for row in rows if any(cell not in (None, "") for cell in row)]
+    df = pd.DataFrame([row[:len(columns)] + [""] * (len(columns) - len(row)) for row in cleaned],
+                      columns=columns)
+
+    for column in df.columns:
+        values = [value for value in df[column] if value not in ("", "-", "—")]
+        numbers = [parse_number(value) for value in values]
+        if values and sum(number is not None for number in numbers) >= NUMERIC_COLUMN_RATIO * len(values):
+            df[column] = [parse_number(value) for value in df[column]]
+    return df
+
+def extract_pdf_tables(file_path, max_workers=None):
+    """
+    Mendeteksi semua tabel dalam PDF secara paralel dengan PyMuPDF
+
+    Args:
+        file_path: Path ke file PDF
+        max_workers: Jumlah proses (default: semua core)
+
+    Returns:
+        List dict per tabel: page, table_index, bbox, dan df (DataFrame)
+    """
+    from utils.pdf_extraction import get_pdf_page_count_pymupdf
+
+    page_count = get_pdf_page_count_pymupdf(file_path)
+    max_workers = max_workers or os.cpu_count() or 1
+    ranges = [(start, min(start + PAGES_PER_TASK, page_count))
+              for start in range(0, page_count, PAGES_PER_TASK)]
+
+    raw_tables = []
+    if max_workers <= 1 or page_count < MIN_PAGES_FOR_POOL:
+        for start, end in ranges:
+            raw_tables.extend(_extract_table_range(file_path, start, end))
+    else:
+        pool = _get_process_pool(max_workers)
+        pending = deque(pool.submit(_extract_table_range, file_path, start, end) for start, end in ranges)
+        while pending:
+            raw_tables.extend(pending.popleft().result())
+
+    tables = []
+    for page_number, table_index, bbox, header, rows in raw_tables:
+        df = table_to_dataframe(header, rows)
+        if len(df) and len(df.columns) > 1:
+            tables.append({"page": page_number, "table_index": table_index, "bbox": bbox, "df": df})
+    return tables
+
+def _table_path(file_hash):
+    return TABLE_STORE_DIR / f"{file_hash}.json"
+
+def save_pdf_tables(file_hash, tables):
+    """Menyimpan tabel hasil ekstraksi ke disk secara atomik (JSON, DataFrame dalam format split)"""
+    from utils.security import ensure_private_dir
+
+    path = _table_path(file_hash)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        ensure_private_dir(APP_DATA_DIR)
+        TABLE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+        payload = [{**{key: value for key, value in table.items() if key != "df"},
+                    "df": table["df"].to_dict(orient="split")} for table in tables]
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logging.error(f"Error menyimpan tabel PDF: {str(e)}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+def load_pdf_tables(file_hash):
+    """
+    Memuat tabel PDF yang tersimpan
+
+    Returns:
+        List tabel (lihat extract_pdf_tables) atau None jika belum diekstrak
+    """
+    with _loaded_lock:
+        if file_hash in _loaded_tables:
+            return _loaded_tables[file_hash]
+    path = _table_path(file_hash)
+    if not path.exists():
+        return None
+    try:
+        import pandas as pd
+
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        tables = [{**table, "df": pd.DataFrame(table["df"]["data"], index=table["df"]["index"],
+                                               columns=table["df"]["columns"])} for table in payload]
+    except Exception as e:
+        logging.error(f"Error memuat tabel PDF: {str(e)}")
+        return None
+    with _loaded_lock:
+        _loaded_tables[file_hash] = tables
+    return tables
+
+def ensure_pdf_tables(file_hash, file_path, max_workers=None):
+    """
+    Tabel PDF dari cache, atau diekstrak dan disimpan jika belum ada
+
+    Returns:
+        List tabel (lihat extract_pdf_tables)
+    """
+    tables = load_pdf_tables(file_hash)
+    if tables is None:
+        tables = extract_pdf_tables(file_path, max_workers=max_workers)
+        save_pdf_tables(file_hash, tables)
+        with _loaded_lock:
+            _loaded_tables[file_hash] = tables
+        logging.info(f"{len(tables)} tabel diekstrak dari PDF")
+    return tables
+
+def to_financial_frame(df):
+    """
+    Mengubah tabel laporan keuangan (pos di baris, periode di kolom) menjadi
+    satu baris per periode dengan pos sebagai kolom, sesuai format yang
+    diharapkan visualize_financial_data.
+
+    Tabel yang sudah berbentuk satu baris per periode dikembalikan apa adanya.
+    """
+    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+    label_col = df.columns[0]
+    if not numeric_cols or label_col in numeric_cols:
+        return df
+
+    items = df.dropna(subset=numeric_cols, how="all")
+    wide = items.set_index(label_col)[numeric_cols].T
+    wide.columns = _column_names(wide.columns)
+    wide.insert(0, "periode", [str(column) for column in numeric_cols])
+    return wide.reset_index(drop=True)
@@ -0,0 +1,166 @@
+# Mode RAG satu panggilan: chunk dan riwayat percakapan dikemas dalam anggaran token
+import logging
+import re
+
+from config import RAG_CONTEXT_TOKENS, RAG_HISTORY_TOKENS
+
+RAG_MODES = {
+    "single": "Satu panggilan LLM (hemat token)",
+    "conversational": "ConversationalRetrievalChain (2 panggilan LLM)"
+}
+
+CONDENSE_PROMPT = """Berdasarkan riwayat percakapan berikut, tulis ulang pertanyaan lanjutan menjadi
+pertanyaan yang berdiri sendiri dalam bahasa yang sama. Tulis pertanyaannya saja.
+
+Riwayat Percakapan:
+{chat_history}
+
+Pertanyaan lanjutan: {question}
+
+Pertanyaan mandiri:"""
+
+# Pertanyaan lanjutan yang merujuk ke percakapan sebelumnya ("jelaskan lebih lanjut", "yang tadi",
+# atau diawali kata sambung seperti "dan tahun lalu?")
+_FOLLOW_UP_PATTERN = re.compile(
+    r"\b(?:tersebut|tadi|sebelumnya|di atas|itu|lanjutkan|lebih lanjut|lebih detail|contohnya|"
+    r"bagaimana dengan|kalau begitu|yang mana|that|those|it|above|previous|earlier|elaborate|"
+    r"more detail|what about|how about)\b|^\s*(?:dan|lalu|terus|kemudian|and|then)\b",
+    re.IGNORECASE
+)
+
+def depends_on_history(query, history):
+    """Cek apakah pertanyaan hanya bermakna bersama percakapan sebelumnya"""
+    from utils.retrieval_cache import normalize_query
+
+    if not history:
+        return False
+    return bool(_FOLLOW_UP_PATTERN.search(query)) or len(normalize_query(query).split()) <= 2
+
+def truncate_tokens(text, max_tokens):
+    """Memotong teks menjadi paling banyak max_tokens token"""
+    from utils.embedding_pipeline import get_token_encoding
+
+    encoding = get_token_encoding()
+    if encoding:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+def pack_documents(docs, max_tokens):
+    """
+    Memilih chunk hasil retrieval (urut relevansi) yang muat dalam anggaran token
+
+    Chunk dengan teks sama hanya dimasukkan sekali. Chunk yang tidak muat
+    dilewati agar chunk berikutnya yang lebih pendek masih bisa masuk; chunk
+    teratas dipotong jika sendirian sudah melebihi anggaran.
+
+    Returns:
+        Tuple (list dokumen terpilih, total token)
+    """
+    from utils.embedding_pipeline import count_tokens
+
+    packed, seen, used = [], set(), 0
+    for doc in docs:
+        text = doc.page_content.strip()
+        if not text or text in seen:
+            continue
+        tokens = count_tokens(text)
+        if used + tokens > max_tokens:
+            if packed:
+                continue
+            text = truncate_tokens(text, max_tokens)
+            doc = type(doc)(page_content=text, metadata=doc.metadata)
+            tokens = count_tokens(text)
+        seen.add(text)
+        packed.append(doc)
+        used += tokens
+    return packed, used
+
+def pack_history(history, max_tokens):
+    """
+    Giliran percakapan terbaru yang muat dalam anggaran token
+
+    Args:
+        history: List (role, pesan) urut kronologis
+        max_tokens: Anggaran token riwayat
+
+    Returns:
+        Tuple (teks riwayat urut kronologis, total token)
+    """
+    from utils.embedding_pipeline import count_tokens
+
+    lines, used = [], 0
+    for role, message in reversed(history):
+        line = f"{'User' if role == 'user' else 'AI'}: {message}"
+        tokens = count_tokens(line)
+        if used + tokens > max_tokens:
+            # Giliran terakhir tetap disertakan (terpotong) agar pertanyaan lanjutan punya konteks
+            if not lines:
+                line = truncate_tokens(line, max_tokens)
+                lines.append(line)
+                used += count_tokens(line)
+            break
+        lines.append(line)
+        used += tokens
+    return "\n\n".join(reversed(lines)), used
+
+class BudgetedRAGChain:
+    """
+    Pengganti ConversationalRetrievalChain dengan satu panggilan LLM per giliran.
+
+    - Pertanyaan hanya dirumuskan ulang (panggilan LLM tambahan) jika ada riwayat
+      dan pertanyaan merujuk ke percakapan sebelumnya.
+    - Chunk hasil retrieval dan riwayat terbaru dikemas dalam anggaran token
+      (tiktoken) sebelum dimasukkan ke prompt.
+
+    Dipanggil seperti ConversationalRetrievalChain: chain({"question", "chat_history"},
+    callbacks=[...]) dan mengembalikan dict berisi answer dan source_documents.
+    """
+
+    def __init__(self, llm, retriever, prompt, context_tokens=RAG_CONTEXT_TOKENS,
+                 history_tokens=RAG_HISTORY_TOKENS, llm_kwargs=None):
+        self.llm = llm
+        self.retriever = retriever
+        self.prompt = prompt
+        self.context_tokens = context_tokens
+        self.history_tokens = history_tokens
+        self.llm_kwargs = llm_kwargs or {}
+
+    def standalone_question(self, question, history):
+        """Pertanyaan untuk retrieval (dirumuskan ulang dengan LLM hanya untuk pertanyaan lanjutan)"""
+        if not depends_on_history(question, history):
+            return question
+        history_text, _ = pack_history(history, self.history_tokens)
+        result = self.llm.invoke(CONDENSE_PROMPT.format(chat_history=history_text, question=question))
+        return str(getattr(result, "content", result)).strip() or question
+
+    def __call__(self, inputs, callbacks=None):
+        question = inputs["question"]
+        history = [tuple(turn) for turn in inputs.get("chat_history") or []]
+        # Pertanyaan saat ini sudah ditambahkan ke riwayat sebelum diproses
+        if history and history[-1] == ("user", question):
+            history = history[:-1]
+
+        try:
+            search_query = self.standalone_question(question, history)
+        except Exception as e:
+            logging.error(f"Error merumuskan ulang pertanyaan: {str(e)}")
+            search_query = question
+
+        docs, context_tokens = pack_documents(self.retriever.invoke(search_query), self.context_tokens)
+        history_text, history_tokens = pack_history(history, self.history_tokens)
+        prompt = self.prompt.format(
+            context="\n\n".join(doc.page_content for doc in docs),
+            chat_history=history_text,
+            question=question
+        )
+        logging.info(f"RAG satu panggilan: {len(docs)} chunk ({context_tokens} token), "
+                     f"riwayat {history_tokens} token")
+
+        result = self.llm.invoke(prompt, config={"callbacks": callbacks} if callbacks else None, **self.llm_kwargs)
+        return {
+            "question": question,
+            "standalone_question": search_query,
+            "answer": str(getattr(result, "content", result)),
+            "source_documents": docs
+        }
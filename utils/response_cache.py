@@ -0,0 +1,225 @@
+# Cache jawaban semantik: pertanyaan yang mirip dijawab dari jawaban sebelumnya tanpa memanggil LLM
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque
+
+import numpy as np
+
+from config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_MAX_SCOPES, RESPONSE_CACHE_THRESHOLD
+from utils.retrieval_cache import normalize_query
+
+# Jumlah lookup terakhir yang disimpan untuk memperkirakan hit rate pada ambang lain
+SIMILARITY_WINDOW = 500
+
+_cache = None
+_local_embeddings = None
+_cache_lock = threading.Lock()
+
+def history_key(history):
+    """
+    Bagian kunci cache dari riwayat percakapan
+
+    Semua mode jawaban menyertakan riwayat ke prompt (bukan hanya pertanyaan
+    lanjutan), sehingga seluruh riwayat ikut menjadi kunci; jawaban dari satu
+    percakapan tidak pernah dipakai di percakapan lain yang riwayatnya berbeda.
+
+    Returns:
+        "" untuk percakapan tanpa riwayat (jawaban dapat dipakai lintas sesi),
+        atau hash seluruh riwayat
+    """
+    if not history:
+        return ""
+    text = "\n".join(f"{role}: {message}" for role, message in history)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def key_terms(query):
+    """Angka dan kode dalam pertanyaan ("2023", "INV-2023-0042") yang harus sama persis agar jawaban dipakai ulang"""
+    return frozenset(token for token in normalize_query(query).split() if any(char.isdigit() for char in token))
+
+class _ScopeEntries:
+    """Pertanyaan, vektor ternormalisasi, dan jawaban untuk satu lingkup cache"""
+
+    def __init__(self):
+        self.vectors = None
+        self.questions = []
+        self.terms = []
+        self.answers = []
+        self.last_used = []
+        self.exact = {}
+
+class SemanticResponseCache:
+    """
+    Cache jawaban LLM berdasarkan kemiripan pertanyaan.
+
+    Setiap lingkup (scope) adalah kombinasi set dokumen (beserta parameter
+    chunking-nya), provider/model, model embedding, mode RAG, dan riwayat
+    percakapan, sehingga jawaban hanya dipakai ulang untuk prompt yang setara. Di dalam lingkup, pertanyaan
+    yang sama setelah normalisasi langsung cocok tanpa embedding; pertanyaan lain
+    cocok jika cosine similarity-nya dengan pertanyaan tersimpan mencapai ambang
+    dan angka/kode di dalamnya sama.
+    """
+
+    def __init__(self, max_entries=RESPONSE_CACHE_MAX_ENTRIES, max_scopes=RESPONSE_CACHE_MAX_SCOPES):
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        self._scopes = OrderedDict()
+        self._lock = threading.Lock()
+        self._clock = 0
+        self._similarities = deque(maxlen=SIMILARITY_WINDOW)
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _best_match(self, entries, vector, terms):
+        """Indeks dan kemiripan entri terdekat dengan angka/kode yang sama"""
+        if entries.vectors is None:
+            return None, 0.0
+        similarities = entries.vectors @ vector
+        mismatched = np.fromiter((entry_terms != terms for entry_terms in entries.terms), dtype=bool,
+                                 count=len(entries.terms))
+        similarities[mismatched] = -1.0
+        best = int(np.argmax(similarities))
+        return best, float(similarities[best])
+
+    def lookup(self, scope, query, embed, threshold=RESPONSE_CACHE_THRESHOLD):
+        """
+        Mencari jawaban tersimpan untuk pertanyaan
+
+        Args:
+            scope: Kunci lingkup (lihat build_scope)
+            query: Pertanyaan pengguna
+            embed: Fungsi teks -> vektor embedding (hanya dipanggil jika tidak ada yang sama persis)
+            threshold: Batas minimal cosine similarity
+
+        Returns:
+            Tuple (jawaban, similarity) atau None jika tidak ada yang cukup mirip
+        """
+        normalized = normalize_query(query)
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                self.misses += 1
+                self._similarities.append(0.0)
+                return None
+            self._scopes.move_to_end(scope)
+            index = entries.exact.get(normalized)
+            if index is not None:
+                entries.last_used[index] = self._tick()
+                self.hits += 1
+                self.exact_hits += 1
+                self._similarities.append(1.0)
+                return entries.answers[index], 1.0
+
+        vector = _normalize(embed(normalized))
+        with self._lock:
+            entries = self._scopes.get(scope)
+            index, similarity = self._best_match(entries, vector, key_terms(query)) if entries else (None, 0.0)
+            self._similarities.append(similarity)
+            if index is None or similarity < threshold:
+                self.misses += 1
+                return None
+            entries.last_used[index] = self._tick()
+            self.hits += 1
+            return entries.answers[index], similarity
+
+    def store(self, scope, query, answer, embed):
+        """Menyimpan jawaban (entri yang paling lama tidak dipakai dibuang jika lingkup penuh)"""
+        normalized = normalize_query(query)
+        vector = _normalize(embed(normalized))
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries is None:
+                entries = self._scopes[scope] = _ScopeEntries()
+                while len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)
+            self._scopes.move_to_end(scope)
+
+            index = entries.exact.get(normalized)
+            if index is None and len(entries.questions) >= self.max_entries:
+                index = int(np.argmin(entries.last_used))
+                del entries.exact[entries.questions[index]]
+            if index is None:
+                entries.vectors = vector[None, :] if entries.vectors is None else np.vstack([entries.vectors, vector])
+                entries.questions.append(normalized)
+                entries.terms.append(key_terms(query))
+                entries.answers.append(answer)
+                entries.last_used.append(self._tick())
+                index = len(entries.questions) - 1
+            else:
+                entries.vectors[index] = vector
+                entries.questions[index] = normalized
+                entries.terms[index] = key_terms(query)
+                entries.answers[index] = answer
+                entries.last_used[index] = self._tick()
+            entries.exact[normalized] = index
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+
+    def estimated_hit_rate(self, threshold):
+        """Perkiraan hit rate lookup terakhir jika ambang diganti (untuk tuning)"""
+        with self._lock:
+            similarities = list(self._similarities)
+        if not similarities:
+            return 0.0
+        return round(sum(similarity >= threshold for similarity in similarities) / len(similarities), 3)
+
+    def stats(self):
+        """Jumlah hit/miss, hit rate, dan jumlah entri tersimpan"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "scopes": len(self._scopes),
+                "entries": sum(len(entries.questions) for entries in self._scopes.values())
+            }
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+def build_scope(document_keys, provider, model, embedding_model, history, rag_mode=None, summary_keys=None):
+    """
+    Kunci lingkup cache
+
+    Args:
+        document_keys: Kunci indeks file dalam korpus (index_store_key, sudah memuat
+            parameter chunking); kosong untuk chat tanpa dokumen
+        provider: Provider LLM
+        model: Nama model LLM
+        embedding_model: Nama model embedding pertanyaan
+        history: Riwayat percakapan sebelum pertanyaan ini (list (role, pesan))
+        rag_mode: Mode RAG (lihat RAG_MODES), None untuk chat tanpa dokumen
+        summary_keys: Kunci indeks yang pohon ringkasannya sudah tersedia; pertanyaan
+            seluruh dokumen dijawab dari ringkasan hanya jika tersedia untuk semua file
+    """
+    return (tuple(sorted(document_keys)), provider, model, embedding_model, rag_mode, history_key(history),
+            tuple(sorted(summary_keys or ())))
+
+def get_local_embeddings():
+    """Embedding lokal untuk pertanyaan chat tanpa dokumen (tanpa jaringan, di bawah 1 ms per pertanyaan)"""
+    global _local_embeddings
+    with _cache_lock:
+        if _local_embeddings is None:
+            from utils.embeddings import HashingEmbeddings
+            _local_embeddings = HashingEmbeddings()
+        return _local_embeddings
+
+def get_response_cache():
+    """Cache jawaban tingkat proses (dipakai bersama semua sesi)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticResponseCache()
+            logging.info(f"Cache jawaban semantik aktif (ambang {RESPONSE_CACHE_THRESHOLD})")
+        return _cache
@@ -0,0 +1,107 @@
+# Cache hasil retrieval dan embedding query per versi indeks korpus
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+# Kata dipertahankan utuh (INV-2023-0042, 4.2.1); tanda baca lain dan kapitalisasi diabaikan
+_QUERY_TOKEN_PATTERN = re.compile(r"\w+(?:[-_/.]\w+)*")
+
+def normalize_query(query):
+    """Normalisasi query agar pengulangan dengan beda huruf besar, spasi, atau tanda baca dianggap sama"""
+    query = unicodedata.normalize("NFKC", query).lower()
+    return " ".join(_QUERY_TOKEN_PATTERN.findall(query))
+
+class RetrievalCache:
+    """
+    Cache LRU untuk retriever korpus.
+
+    - Embedding query dikunci dengan model embedding + query ternormalisasi dan
+      tetap berlaku walaupun dokumen berubah.
+    - Hasil top-k (id docstore) dikunci dengan versi indeks + query ternormalisasi
+      + parameter retriever; semua hasil dibuang saat versi indeks berubah.
+
+    Query yang diulang tidak lagi dikirim ke API embedding maupun dicari di FAISS.
+    """
+
+    def __init__(self, max_results=512, max_embeddings=2048):
+        self.max_results = max_results
+        self.max_embeddings = max_embeddings
+        self._results = OrderedDict()
+        self._embeddings = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.result_hits = 0
+        self.result_misses = 0
+        self.embedding_hits = 0
+        self.embedding_misses = 0
+
+    def invalidate(self, version=None):
+        """Membuang semua hasil retrieval (dipanggil saat dokumen ditambah/dihapus)"""
+        with self._lock:
+            self._results.clear()
+            self._version = version
+
+    @staticmethod
+    def _get(store, key):
+        value = store.get(key)
+        if value is not None:
+            store.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _put(store, key, value, max_size):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > max_size:
+            store.popitem(last=False)
+
+    def get_results(self, version, query, params=()):
+        """Id docstore hasil retrieval yang tersimpan, atau None"""
+        key = (normalize_query(query), params)
+        with self._lock:
+            if self._version is None:
+                self._version = version
+            # Retriever lama (versi sebelum invalidate) tidak memakai maupun mengisi cache
+            doc_keys = self._get(self._results, key) if version == self._version else None
+            if doc_keys is None:
+                self.result_misses += 1
+            else:
+                self.result_hits += 1
+            return doc_keys
+
+    def put_results(self, version, query, doc_keys, params=()):
+        with self._lock:
+            if version == self._version:
+                self._put(self._results, (normalize_query(query), params), tuple(doc_keys), self.max_results)
+
+    def embed_query(self, query, embeddings):
+        """Embedding query dari cache, atau dari embeddings.embed_query jika belum ada"""
+        from utils.embedding_cache import get_embedding_model_name
+
+        key = (getattr(embeddings, "model_name", None) or get_embedding_model_name(embeddings), normalize_query(query))
+        with self._lock:
+            vector = self._get(self._embeddings, key)
+            if vector is not None:
+                self.embedding_hits += 1
+                return list(vector)
+            self.embedding_misses += 1
+
+        vector = embeddings.embed_query(query)
+        with self._lock:
+            self._put(self._embeddings, key, tuple(vector), self.max_embeddings)
+        return vector
+
+    def stats(self):
+        """Jumlah hit/miss dan hit rate hasil retrieval dan embedding query"""
+        with self._lock:
+            lookups = self.result_hits + self.result_misses
+            return {
+                "result_hits": self.result_hits,
+                "result_misses": self.result_misses,
+                "result_hit_rate": round(self.result_hits / lookups, 3) if lookups else 0.0,
+                "embedding_hits": self.embedding_hits,
+                "embedding_misses": self.embedding_misses,
+                "cached_results": len(self._results),
+                "cached_embeddings": len(self._embeddings)
+            }
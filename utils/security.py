@@ -0,0 +1,26 @@
+# Utilitas keamanan untuk data aplikasi di disk
+import logging
+import os
+import stat
+
+def ensure_private_dir(path):
+    """
+    Membuat direktori data yang hanya bisa dibaca/ditulis user proses ini (0700)
+
+    Direktori yang sudah ada milik user lain ditolak, karena isinya (cache,
+    indeks) dibaca kembali oleh aplikasi.
+
+    Args:
+        path: Path direktori
+
+    Returns:
+        Path direktori
+    """
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"Direktori data {path} dimiliki user lain")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+        logging.info(f"Izin direktori data {path} diperketat menjadi 0700")
+    return path
@@ -0,0 +1,50 @@
+# Streaming token LLM ke UI
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Jeda minimal antar pembaruan tampilan (token pertama selalu langsung ditampilkan)
+STREAM_UPDATE_INTERVAL = 0.05
+
+class TokenStreamHandler(BaseCallbackHandler):
+    """
+    Callback langchain yang meneruskan teks jawaban yang sudah terkumpul ke
+    on_update setiap kali token baru datang.
+
+    Pembaruan dibatasi per STREAM_UPDATE_INTERVAL agar rerender UI tidak
+    memperlambat stream; panggil flush() setelah selesai untuk sisa token.
+    """
+
+    def __init__(self, on_update, min_interval=STREAM_UPDATE_INTERVAL):
+        self.on_update = on_update
+        self.min_interval = min_interval
+        self.text = ""
+        self._last_update = 0.0
+        self._pending = False
+
+    def on_llm_new_token(self, token, **kwargs):
+        self.text += token
+        now = time.monotonic()
+        if now - self._last_update >= self.min_interval:
+            self._last_update = now
+            self._pending = False
+            self.on_update(self.text)
+        else:
+            self._pending = True
+
+    def flush(self):
+        if self._pending and self.text:
+            self._pending = False
+            self.on_update(self.text)
+
+def stream_kwargs(llm):
+    """
+    Argumen invoke agar model chat mengirim token secara bertahap
+
+    Dengan invoke(stream=True) (bukan llm.stream) cache panggilan LLM tetap
+    dipakai dan token usage dihitung dari hasil akhir. Model non-chat
+    (mis. HuggingFaceHub) tidak mendukungnya dan dijalankan tanpa streaming.
+    """
+    from langchain_core.language_models import BaseChatModel
+
+    return {"stream": True} if isinstance(llm, BaseChatModel) else {}
@@ -0,0 +1,327 @@
+# Pohon ringkasan dokumen (chunk -> bagian -> dokumen) yang dibangun di background
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import SUMMARY_LLM_CONCURRENCY, SUMMARY_TREE_CACHE_ENTRIES, SUMMARY_WORKERS
+
+# Jumlah token chunk berurutan yang diringkas dalam satu panggilan LLM (level terbawah)
+LEAF_TOKENS = 2000
+# Jumlah ringkasan yang digabung menjadi satu ringkasan bagian di level berikutnya
+SECTION_FANOUT = 8
+# Batas token ringkasan yang dikirim saat menjawab pertanyaan seluruh dokumen
+SUMMARY_CONTEXT_TOKENS = 3000
+# Potongan teks yang dipakai jika panggilan LLM untuk satu node gagal
+FALLBACK_CHARS = 600
+
+WHOLE_DOCUMENT_KEYWORDS = (
+    "ringkas", "rangkum", "ikhtisar", "intisari", "garis besar", "gambaran umum",
+    "secara umum", "keseluruhan", "poin utama", "poin-poin utama", "risiko utama",
+    "kesimpulan dokumen", "tentang apa", "isi dokumen", "isi laporan",
+    "summary", "summarize", "summarise", "overview", "main points", "key points",
+    "main risks", "key risks", "key takeaways"
+)
+
+LEAF_PROMPT = """Ringkas bagian dokumen berikut dalam maksimal 150 kata, dalam bahasa yang sama dengan dokumen.
+Pertahankan angka, nama, tanggal, risiko, dan kesimpulan penting.
+
+Bagian dokumen:
+{text}
+
+Ringkasan:"""
+
+SECTION_PROMPT = """Berikut ringkasan beberapa bagian dokumen yang berurutan. Gabungkan menjadi satu
+ringkasan yang padu dalam maksimal 200 kata. Pertahankan angka, risiko, dan kesimpulan penting.
+
+{text}
+
+Ringkasan gabungan:"""
+
+DOCUMENT_PROMPT = """Berikut isi atau ringkasan bagian-bagian dokumen "{filename}". Tulis ringkasan
+keseluruhan dokumen dalam maksimal 300 kata: topik utama, temuan dan angka kunci, risiko, dan kesimpulan.
+
+{text}
+
+Ringkasan dokumen:"""
+
+_executor = None
+# Status job yang belum selesai atau gagal ("done" dibaca dari pohon tersimpan)
+_status = OrderedDict()
+# Pohon yang dipakai terakhir (LRU, SUMMARY_TREE_CACHE_ENTRIES); sisanya dibaca ulang dari disk
+_trees = OrderedDict()
+_lock = threading.Lock()
+
+def is_whole_document_question(query):
+    """Cek apakah pertanyaan menyangkut keseluruhan dokumen (ringkasan, poin/risiko utama)"""
+    query = query.lower()
+    return any(keyword in query for keyword in WHOLE_DOCUMENT_KEYWORDS)
+
+def vectorstore_chunks(vectorstore):
+    """Teks dan metadata chunk vectorstore FAISS sesuai urutan indeks (urutan dokumen)"""
+    chunks = []
+    for position in range(len(vectorstore.index_to_docstore_id)):
+        doc = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+        if hasattr(doc, "page_content"):
+            chunks.append((doc.page_content, doc.metadata))
+    return chunks
+
+def _group_by_tokens(texts, max_tokens):
+    """Mengelompokkan indeks teks berurutan dengan total token maksimal max_tokens"""
+    from utils.embedding_pipeline import count_tokens
+
+    groups, current, current_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = count_tokens(text)
+        if current and current_tokens + tokens > max_tokens:
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+def _page_range(pages):
+    pages = [page for page in pages if page is not None]
+    return [min(pages), max(pages)] if pages else None
+
+def _node_label(node):
+    pages = node.get("pages")
+    if not pages:
+        return ""
+    return f"(halaman {pages[0] + 1})" if pages[0] == pages[1] else f"(halaman {pages[0] + 1}–{pages[1] + 1})"
+
+def _summarize_all(llm, prompts, fallbacks, max_concurrency):
+    """
+    Menjalankan prompt ringkasan secara paralel dengan batas konkurensi
+
+    Node yang gagal memakai potongan teks aslinya agar pohon tetap lengkap.
+    """
+    results = llm.batch(prompts, config={"max_concurrency": max(1, max_concurrency)}, return_exceptions=True)
+    summaries = []
+    for result, fallback in zip(results, fallbacks):
+        if isinstance(result, Exception):
+            logging.error(f"Error meringkas bagian dokumen: {str(result)}")
+            summaries.append(fallback[:FALLBACK_CHARS])
+        else:
+            summaries.append(str(getattr(result, "content", result)).strip())
+    return summaries
+
+def build_summary_tree(chunks, llm, filename, max_concurrency=SUMMARY_LLM_CONCURRENCY):
+    """
+    Membangun pohon ringkasan dokumen
+
+    Chunk berurutan dikelompokkan per LEAF_TOKENS token dan diringkas (level 0),
+    ringkasan digabung per SECTION_FANOUT menjadi ringkasan bagian hingga tersisa
+    paling banyak SECTION_FANOUT bagian, lalu diringkas menjadi ringkasan dokumen.
+    Setiap level dijalankan paralel dengan maksimal max_concurrency panggilan LLM.
+
+    Args:
+        chunks: List (teks, metadata) chunk sesuai urutan dokumen
+        llm: Model chat langchain (mendukung batch)
+        filename: Nama file untuk prompt ringkasan dokumen
+        max_concurrency: Batas panggilan LLM paralel
+
+    Returns:
+        Dict pohon ringkasan: summary (ringkasan dokumen) dan levels (list level,
+        tiap node berisi summary, children, dan pages)
+    """
+    if not chunks:
+        raise ValueError("Tidak ada chunk untuk diringkas")
+    start_time = time.time()
+    texts = [text for text, _ in chunks]
+    pages = [metadata.get("page") if isinstance(metadata.get("page"), int) else None for _, metadata in chunks]
+    groups = _group_by_tokens(texts, LEAF_TOKENS)
+    levels = []
+    llm_calls = 0
+
+    if len(groups) > 1:
+        leaf_texts = ["\n\n".join(texts[i] for i in group) for group in groups]
+        summaries = _summarize_all(llm, [LEAF_PROMPT.format(text=text) for text in leaf_texts],
+                                   leaf_texts, max_concurrency)
+        llm_calls += len(groups)
+        levels.append([
+            {"summary": summary, "children": group, "pages": _page_range(pages[i] for i in group)}
+            for summary, group in zip(summaries, groups)
+        ])
+
+        while len(levels[-1]) > SECTION_FANOUT:
+            nodes = levels[-1]
+            sections = [list(range(i, min(i + SECTION_FANOUT, len(nodes)))) for i in range(0, len(nodes), SECTION_FANOUT)]
+            section_texts = ["\n\n".join(f"{_node_label(nodes[i])} {nodes[i]['summary']}".strip() for i in section)
+                             for section in sections]
+            summaries = _summarize_all(llm, [SECTION_PROMPT.format(text=text) for text in section_texts],
+                                       section_texts, max_concurrency)
+            llm_calls += len(sections)
+            levels.append([
+                {
+                    "summary": summary,
+                    "children": section,
+                    "pages": _page_range(page for i in section for page in (nodes[i]["pages"] or []))
+                }
+                for summary, section in zip(summaries, sections)
+            ])
+
+        document_text = "\n\n".join(f"{_node_label(node)} {node['summary']}".strip() for node in levels[-1])
+    else:
+        # Dokumen pendek: langsung diringkas dari teks chunk
+        document_text = "\n\n".join(texts)
+
+    summary = _summarize_all(llm, [DOCUMENT_PROMPT.format(filename=filename, text=document_text)],
+                             [document_text], max_concurrency)[0]
+    llm_calls += 1
+
+    return {
+        "filename": filename,
+        "model": getattr(llm, "model_name", None) or getattr(llm, "model", None),
+        "chunk_count": len(chunks),
+        "llm_calls": llm_calls,
+        "build_time": round(time.time() - start_time, 2),
+        "summary": summary,
+        "levels": levels
+    }
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+        return _executor
+
+def _remember_tree(store_key, tree):
+    """Menyimpan pohon di cache LRU proses (dipanggil dengan _lock)"""
+    _trees[store_key] = tree
+    _trees.move_to_end(store_key)
+    while len(_trees) > SUMMARY_TREE_CACHE_ENTRIES:
+        _trees.popitem(last=False)
+
+def _set_status(store_key, status):
+    """Mencatat status job (dipanggil dengan _lock); status "failed" terlama dibuang jika melewati batas"""
+    if status == "done":
+        _status.pop(store_key, None)
+        return
+    _status[store_key] = status
+    _status.move_to_end(store_key)
+    failed = [key for key, value in _status.items() if value == "failed"]
+    for key in failed[:max(0, len(_status) - SUMMARY_TREE_CACHE_ENTRIES)]:
+        del _status[key]
+
+def get_summary_tree(store_key):
+    """Pohon ringkasan untuk indeks file (dari cache proses atau disk), None jika belum ada"""
+    if not store_key:
+        return None
+    with _lock:
+        if store_key in _trees:
+            _trees.move_to_end(store_key)
+            return _trees[store_key]
+    from utils.index_store import load_summary_tree
+
+    tree = load_summary_tree(store_key)
+    if tree is not None:
+        with _lock:
+            _remember_tree(store_key, tree)
+    return tree
+
+def get_summary_status(store_key):
+    """Status pohon ringkasan: "queued", "running", "done", "failed", atau None"""
+    with _lock:
+        status = _status.get(store_key)
+    if status is None and get_summary_tree(store_key) is not None:
+        return "done"
+    return status
+
+def _run(store_key, chunks, llm, filename):
+    from utils.index_store import save_summary_tree
+
+    with _lock:
+        _set_status(store_key, "running")
+    try:
+        tree = build_summary_tree(chunks, llm, filename)
+        with _lock:
+            _remember_tree(store_key, tree)
+            _set_status(store_key, "done")
+        save_summary_tree(store_key, tree)
+        logging.info(f"Pohon ringkasan {filename} selesai ({tree['llm_calls']} panggilan LLM, {tree['build_time']} detik)")
+    except Exception as e:
+        with _lock:
+            _set_status(store_key, "failed")
+        logging.error(f"Error membangun pohon ringkasan {filename}: {str(e)}")
+
+def schedule_summary_tree(store_key, vectorstore, llm, filename):
+    """
+    Menjadwalkan pembangunan pohon ringkasan di background (sekali per indeks)
+
+    Args:
+        store_key: Kunci indeks file (lihat index_store_key)
+        vectorstore: Vectorstore FAISS file
+        llm: Model chat untuk meringkas
+        filename: Nama file
+
+    Returns:
+        Status pohon ringkasan (lihat get_summary_status)
+    """
+    status = get_summary_status(store_key)
+    if status in ("queued", "running", "done"):
+        return status
+
+    chunks = vectorstore_chunks(vectorstore)
+    with _lock:
+        _set_status(store_key, "queued")
+    _get_executor().submit(_run, store_key, chunks, llm, filename)
+    return "queued"
+
+def get_or_schedule_summary_trees(files, llm=None):
+    """
+    Pohon ringkasan semua file korpus; pohon yang belum ada dijadwalkan di background
+
+    Pohon dibangun saat pertama kali dibutuhkan (pertanyaan seluruh dokumen),
+    bukan untuk setiap upload. Selama belum selesai, pertanyaan dijawab dari
+    retrieval biasa.
+
+    Args:
+        files: Dict file_hash -> {"info", "vectorstore"} (lihat DocumentCorpus.files)
+        llm: Model chat untuk meringkas; None untuk tidak menjadwalkan
+
+    Returns:
+        List pohon sesuai urutan file, atau None jika belum semua tersedia
+    """
+    from config import SUMMARY_TREE_ENABLED
+
+    trees = []
+    for entry in files.values():
+        store_key = entry["info"].get("store_key")
+        tree = get_summary_tree(store_key)
+        if tree is None and store_key and llm is not None and SUMMARY_TREE_ENABLED:
+            schedule_summary_tree(store_key, entry["vectorstore"], llm, entry["info"]["filename"])
+        trees.append(tree)
+    if not trees or any(tree is None for tree in trees):
+        return None
+    return trees
+
+def build_summary_context(trees, max_tokens=SUMMARY_CONTEXT_TOKENS):
+    """
+    Konteks untuk pertanyaan seluruh dokumen dari pohon ringkasan
+
+    Ringkasan dokumen semua file didahulukan, lalu ringkasan bagian level teratas
+    ditambahkan selama masih dalam batas token.
+    """
+    from utils.embedding_pipeline import count_tokens
+
+    parts = [f"### {tree['filename']}\n{tree['summary']}" for tree in trees]
+    used = sum(count_tokens(part) for part in parts)
+    for tree in trees:
+        if not tree["levels"]:
+            continue
+        lines = []
+        for node in tree["levels"][-1]:
+            line = f"- {_node_label(node)} {node['summary']}".replace("-  ", "- ")
+            tokens = count_tokens(line)
+            if used + tokens > max_tokens:
+                break
+            lines.append(line)
+            used += tokens
+        if lines:
+            parts.append(f"### Bagian-bagian {tree['filename']}\n" + "\n".join(lines))
+    return "\n\n".join(parts)
@@ -0,0 +1,160 @@
+# Text splitter berbasis jumlah token (tiktoken) dengan satu kali pemindaian teks
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+
+# Pemisah dipindai sekaligus dengan satu regex; grup menentukan level batas
+# (semakin kecil semakin disukai sebagai titik potong, setara urutan separator
+# ["\n\n", "\n", ".", " ", ""] pada RecursiveCharacterTextSplitter)
+_SEPARATOR_PATTERN = re.compile(r"([.!?][ \t]+|\n(?:[ \t]*\n\s*)?)")
+_WORD_PATTERN = re.compile(r"\S+\s*|\s+")
+
+PARAGRAPH_LEVEL = 0
+LINE_LEVEL = 1
+SENTENCE_LEVEL = 2
+WORD_LEVEL = 3
+TOKEN_LEVEL = 4
+
+# Di atas jumlah potongan ini penghitungan token dibagi ke beberapa thread
+# (tiktoken melepas GIL saat encode)
+_PARALLEL_MIN_PIECES = 20000
+_PIECES_PER_TASK = 4096
+
+def _separator_level(separator):
+    if separator.count("\n") >= 2:
+        return PARAGRAPH_LEVEL
+    if "\n" in separator:
+        return LINE_LEVEL
+    return SENTENCE_LEVEL
+
+class TokenTextSplitter:
+    """
+    Pengganti RecursiveCharacterTextSplitter yang mengukur chunk dalam token.
+
+    Teks dipindai satu kali menjadi potongan (paragraf/baris/kalimat beserta
+    separatornya), token tiap potongan dihitung dengan tiktoken, lalu potongan
+    digabung secara greedy. Saat chunk penuh, titik potong dipilih pada batas
+    dengan level terbaik (paragraf > baris > kalimat) di paruh kedua chunk.
+    Output split_documents sama dengan splitter langchain: satu Document per
+    chunk dengan salinan metadata dokumen asal.
+    """
+
+    def __init__(self, chunk_size=128, chunk_overlap=12, max_workers=None):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap harus lebih kecil dari chunk_size")
+        from utils.embedding_pipeline import get_token_encoding
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self._encoding = get_token_encoding()
+
+    def _count_batch(self, pieces):
+        if self._encoding is None:
+            return [(len(piece) + 3) // 4 for piece in pieces]
+        encode = self._encoding.encode_ordinary
+        return [len(encode(piece)) for piece in pieces]
+
+    def _count_tokens(self, pieces):
+        if len(pieces) < _PARALLEL_MIN_PIECES or self.max_workers <= 1:
+            return self._count_batch(pieces)
+        batches = [pieces[i:i + _PIECES_PER_TASK] for i in range(0, len(pieces), _PIECES_PER_TASK)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return [count for counts in executor.map(self._count_batch, batches) for count in counts]
+
+    def _split_oversized(self, piece, level):
+        """Memecah potongan yang lebih besar dari chunk_size per kata (atau per token)"""
+        words = _WORD_PATTERN.findall(piece)
+        sub_pieces, sub_levels = [], []
+        for word, count in zip(words, self._count_batch(words)):
+            if count <= self.chunk_size:
+                sub_pieces.append(word)
+                sub_levels.append(WORD_LEVEL)
+            elif self._encoding is None:
+                step = self.chunk_size * 4
+                sub_pieces.extend(word[i:i + step] for i in range(0, len(word), step))
+                sub_levels.extend([TOKEN_LEVEL] * len(range(0, len(word), step)))
+            else:
+                tokens = self._encoding.encode_ordinary(word)
+                for i in range(0, len(tokens), self.chunk_size):
+                    sub_pieces.append(self._encoding.decode(tokens[i:i + self.chunk_size]))
+                    sub_levels.append(TOKEN_LEVEL)
+        sub_levels[-1] = level
+        return sub_pieces, sub_levels
+
+    def _pieces(self, text):
+        """Memindai teks menjadi (potongan, level batas di akhir potongan, jumlah token)"""
+        parts = _SEPARATOR_PATTERN.split(text)
+        pieces = [a + b for a, b in zip(parts[0::2], parts[1::2])]
+        levels = [_separator_level(separator) for separator in parts[1::2]]
+        if parts[-1]:
+            pieces.append(parts[-1])
+            levels.append(PARAGRAPH_LEVEL)
+        counts = self._count_tokens(pieces)
+
+        if max(counts, default=0) <= self.chunk_size:
+            return pieces, levels, counts
+
+        split_pieces, split_levels, split_counts = [], [], []
+        for piece, level, count in zip(pieces, levels, counts):
+            if count <= self.chunk_size:
+                split_pieces.append(piece)
+                split_levels.append(level)
+                split_counts.append(count)
+                continue
+            sub_pieces, sub_levels = self._split_oversized(piece, level)
+            split_pieces.extend(sub_pieces)
+            split_levels.extend(sub_levels)
+            split_counts.extend(self._count_batch(sub_pieces))
+        return split_pieces, split_levels, split_counts
+
+    def _best_cut(self, levels, prefix, start, end):
+        """Batas potong terbaik di (start, end]: level terkecil, lalu posisi terakhir"""
+        min_tokens = prefix[start] + self.chunk_size // 2
+        best, best_level = end, levels[end - 1]
+        for j in range(end - 1, start, -1):
+            if prefix[j] < min_tokens:
+                break
+            if levels[j - 1] < best_level:
+                best, best_level = j, levels[j - 1]
+        return best
+
+    def split_text(self, text):
+        """
+        Memecah teks menjadi chunks dengan maksimal chunk_size token
+
+        Returns:
+            List string chunk (tanpa whitespace di awal/akhir)
+        """
+        pieces, levels, counts = self._pieces(text)
+        prefix = [0, *accumulate(counts)]
+        size, overlap = self.chunk_size, self.chunk_overlap
+        chunks = []
+        start = 0
+
+        for i in range(len(pieces)):
+            while prefix[i + 1] - prefix[start] > size and i > start:
+                cut = self._best_cut(levels, prefix, start, i)
+                chunks.append("".join(pieces[start:cut]))
+                # Overlap: potongan terakhir chunk sebelumnya, selama chunk berikutnya muat
+                new_start = cut
+                while (new_start - 1 > start
+                       and prefix[cut] - prefix[new_start - 1] <= overlap
+                       and prefix[i + 1] - prefix[new_start - 1] <= size):
+                    new_start -= 1
+                start = new_start
+
+        if start < len(pieces):
+            chunks.append("".join(pieces[start:]))
+        return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+    def split_documents(self, documents):
+        """Memecah Document menjadi chunks dengan metadata dokumen asal"""
+        from langchain_core.documents import Document
+
+        return [
+            Document(page_content=chunk, metadata=dict(doc.metadata))
+            for doc in documents
+            for chunk in self.split_text(doc.page_content)
+        ]
@@ -0,0 +1,279 @@
+# Penyimpanan file upload per sesi dengan kuota disk global dan eviction LRU
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from config import APP_DATA_DIR, UPLOAD_DIR, UPLOAD_MIN_AGE_SECONDS, UPLOAD_QUOTA_MB
+
+# Path yang sedang dibaca proses ini (misalnya worker PyMuPDF) tidak boleh dihapus
+_pinned = Counter()
+_lock = threading.Lock()
+# Kunci penandatangan token "sid" (hanya ada di memori server, berganti setiap proses dimulai)
+_SESSION_SECRET = secrets.token_bytes(32)
+# ID sesi upload -> ID sesi runtime Streamlit (tab browser) yang sedang memakainya
+_session_owners = {}
+# Total byte file upload di UPLOAD_DIR, diperbarui setiap tulis/hapus (None = belum dihitung)
+_usage_bytes = None
+
+def sign_session_id(session_id):
+    """Token untuk query parameter URL: ID sesi + tanda tangan HMAC"""
+    signature = hmac.new(_SESSION_SECRET, session_id.encode("utf-8"), hashlib.sha256).hexdigest()[:32]
+    return f"{session_id}.{signature}"
+
+def verify_session_token(token):
+    """
+    Memeriksa token dari URL
+
+    Returns:
+        ID sesi jika tanda tangannya valid, selain itu None
+    """
+    session_id, _, signature = str(token or "").rpartition(".")
+    if not session_id or not hmac.compare_digest(sign_session_id(session_id), f"{session_id}.{signature}"):
+        return None
+    return session_id
+
+def _runtime_session_id():
+    """ID sesi runtime Streamlit (satu per tab browser), None di luar Streamlit"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx else None
+    except Exception:
+        return None
+
+def _is_active_runtime_session(runtime_session_id):
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance().is_active_session(runtime_session_id)
+    except Exception:
+        return False
+
+def claim_upload_session(session_id, runtime_session_id):
+    """
+    Mengklaim ID sesi upload untuk satu tab browser
+
+    Klaim ditolak jika ID masih dipakai tab lain yang masih terhubung, sehingga
+    URL yang disalin ke tab kedua tidak ikut memakai file dan job tab pertama.
+    Setelah refresh, tab lama sudah terputus sehingga klaim berhasil.
+
+    Returns:
+        True jika klaim berhasil
+    """
+    with _lock:
+        owner = _session_owners.get(session_id)
+        if owner not in (None, runtime_session_id) and _is_active_runtime_session(owner):
+            return False
+        _prune_session_owners()
+        _session_owners[session_id] = runtime_session_id
+        return True
+
+def _prune_session_owners():
+    """Membuang klaim tab yang sudah terputus (klaim tersebut tidak lagi menolak tab lain)"""
+    expired = [session_id for session_id, owner in _session_owners.items()
+               if owner is None or not _is_active_runtime_session(owner)]
+    for session_id in expired:
+        del _session_owners[session_id]
+
+def get_upload_session_id():
+    """
+    ID sesi Streamlit untuk namespace upload dan job ingestion (dibuat jika belum ada)
+
+    ID dibuat di server dan disimpan di query parameter URL ("sid") dalam bentuk
+    token bertanda tangan HMAC, sehingga setelah browser di-refresh sesi baru
+    tetap bisa mengambil file dan job ingestion miliknya. Token yang tidak valid
+    (ditebak/diubah, atau dari proses server sebelumnya) dan token yang masih
+    dipakai tab lain diabaikan; sesi tersebut mendapat ID baru.
+    """
+    import streamlit as st
+
+    if not st.session_state.get("session_id"):
+        runtime_session_id = _runtime_session_id()
+        session_id = verify_session_token(st.query_params.get("sid"))
+        if session_id is None or not claim_upload_session(session_id, runtime_session_id):
+            session_id = uuid.uuid4().hex
+            claim_upload_session(session_id, runtime_session_id)
+        st.session_state.session_id = session_id
+    token = sign_session_id(st.session_state.session_id)
+    if st.query_params.get("sid") != token:
+        st.query_params["sid"] = token
+    return st.session_state.session_id
+
+def _scan_uploads():
+    """Semua file upload sebagai (mtime, ukuran, path)"""
+    entries = []
+    for root, _, files in os.walk(UPLOAD_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+def _add_usage(delta):
+    """Memperbarui total pemakaian disk upload; direktori hanya dipindai sekali per proses"""
+    global _usage_bytes
+    with _lock:
+        if _usage_bytes is None:
+            _usage_bytes = sum(size for _, size, _ in _scan_uploads())
+        else:
+            _usage_bytes = max(0, _usage_bytes + delta)
+        return _usage_bytes
+
+def _session_dir(session_id):
+    # ID sesi dibersihkan agar tidak bisa keluar dari UPLOAD_DIR
+    return UPLOAD_DIR / (re.sub(r"[^A-Za-z0-9_-]", "", str(session_id)) or "default")
+
+def store_upload(uploaded_file, file_hash, session_id, pin=False):
+    """
+    Menyimpan file upload ke direktori sesi dengan nama berdasarkan hash isi
+
+    File dengan isi sama di sesi yang sama hanya ditulis sekali; sesi lain yang
+    mengunggah file bernama sama tidak saling menimpa.
+
+    Args:
+        uploaded_file: File yang diunggah
+        file_hash: Hash SHA-256 isi file
+        session_id: ID sesi pemilik file
+        pin: Tandai file sedang dipakai (lepas dengan release_upload)
+
+    Returns:
+        Path ke file
+    """
+    from utils.security import ensure_private_dir
+
+    session_dir = _session_dir(session_id)
+    ensure_private_dir(APP_DATA_DIR)
+    ensure_private_dir(UPLOAD_DIR)
+    session_dir.mkdir(mode=0o700, exist_ok=True)
+    file_path = session_dir / f"{file_hash[:32]}{Path(uploaded_file.name).suffix.lower()}"
+
+    if pin:
+        with _lock:
+            _pinned[str(file_path)] += 1
+    try:
+        if file_path.exists():
+            # Perbarui waktu akses untuk LRU
+            os.utime(file_path)
+        else:
+            # Tulis ke file sementara lalu rename agar pembaca tidak melihat file setengah jadi
+            fd, tmp_path = tempfile.mkstemp(dir=session_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(uploaded_file.getbuffer())
+            os.replace(tmp_path, file_path)
+            enforce_upload_quota(added_bytes=os.path.getsize(file_path))
+    except Exception:
+        if pin:
+            release_upload(file_path)
+        raise
+    return str(file_path)
+
+def release_upload(file_path):
+    """Melepas tanda "sedang dipakai" dari store_upload(pin=True)"""
+    with _lock:
+        key = str(file_path)
+        _pinned[key] -= 1
+        if _pinned[key] <= 0:
+            del _pinned[key]
+
+def enforce_upload_quota(max_bytes=None, added_bytes=0):
+    """
+    Menghapus file upload yang paling lama tidak dipakai hingga total di bawah kuota
+
+    Total pemakaian dilacak bertahap, sehingga direktori upload hanya dipindai
+    saat kuota terlampaui. File yang sedang dipakai atau baru dipakai
+    (UPLOAD_MIN_AGE_SECONDS) dilewati.
+
+    Args:
+        max_bytes: Kuota dalam byte (default UPLOAD_QUOTA_MB)
+        added_bytes: Ukuran file yang baru ditulis
+
+    Returns:
+        Jumlah byte yang dibebaskan
+    """
+    global _usage_bytes
+    max_bytes = UPLOAD_QUOTA_MB * 1024 * 1024 if max_bytes is None else max_bytes
+    if _add_usage(added_bytes) <= max_bytes:
+        return 0
+
+    entries = _scan_uploads()
+    total = sum(size for _, size, _ in entries)
+
+    freed = 0
+    now = time.time()
+    with _lock:
+        pinned = set(_pinned)
+    for mtime, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        if path in pinned or now - mtime < UPLOAD_MIN_AGE_SECONDS:
+            continue
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            continue
+    with _lock:
+        # Hasil pemindaian menyelaraskan ulang total (misalnya file dihapus di luar aplikasi)
+        _usage_bytes = total - freed
+
+    if freed:
+        # Hapus direktori sesi yang sudah kosong
+        for session_dir in UPLOAD_DIR.iterdir():
+            if session_dir.is_dir():
+                try:
+                    session_dir.rmdir()
+                except OSError:
+                    pass
+        logging.info(f"{freed / 1e6:.1f} MB file upload lama dihapus (kuota {max_bytes / 1e6:.0f} MB)")
+    if total - freed > max_bytes:
+        logging.warning(f"Kuota upload terlampaui ({(total - freed) / 1e6:.0f} MB), semua file masih dipakai")
+    return freed
+
+def remove_session_uploads(session_id):
+    """
+    Menghapus semua file upload milik satu sesi
+
+    File yang masih dipakai job yang berjalan (store_upload(pin=True)) dilewati;
+    batalkan job sesi lebih dulu (IngestionJobManager.cancel_session). Sisa file
+    dihapus oleh eviction kuota setelah dilepas.
+
+    Returns:
+        Jumlah file yang dilewati karena masih dipakai
+    """
+    session_dir = _session_dir(session_id)
+    if not session_dir.exists():
+        return 0
+    with _lock:
+        pinned = set(_pinned)
+    skipped = 0
+    removed = 0
+    for path in session_dir.iterdir():
+        if str(path) in pinned:
+            skipped += 1
+            continue
+        try:
+            size = path.stat().st_size
+            path.unlink()
+            removed += size
+        except OSError:
+            continue
+    if removed:
+        _add_usage(-removed)
+    try:
+        session_dir.rmdir()
+    except OSError:
+        pass
+    if skipped:
+        logging.info(f"{skipped} file upload sesi masih dipakai job ingestion, dihapus setelah dilepas")
+    return skipped
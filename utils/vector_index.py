@@ -0,0 +1,415 @@
+# Pemilihan tipe indeks FAISS berdasarkan ukuran korpus (Flat, IVF, IVF-PQ, shard)
+import bisect
+import logging
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Di bawah batas ini pencarian exact (Flat) masih cepat dan tidak butuh training
+FLAT_MAX_VECTORS = 20000
+# Di atas batas ini vektor dikompresi dengan Product Quantization
+IVF_PQ_MIN_VECTORS = 200000
+# Jumlah titik training per centroid yang disarankan FAISS
+TRAINING_POINTS_PER_CENTROID = 39
+MAX_TRAINING_SAMPLE = 256000
+# Di atas jumlah vektor ini korpus dipecah menjadi shard berukuran tetap yang dicari paralel
+SHARD_SIZE = 1000000
+# Thread pencarian shard (dipakai bersama semua sesi)
+SEARCH_THREADS = os.cpu_count() or 1
+
+_search_pool = None
+_search_pool_lock = threading.Lock()
+
+VECTOR_COMPRESSION = {
+    "float16": "float16 (hemat 50%, hampir tanpa kehilangan akurasi)",
+    "int8": "int8 (hemat 75%)",
+    "none": "float32 (tanpa kompresi)"
+}
+
+def _get_search_pool():
+    """Thread pool bersama untuk pencarian shard (dibuat sekali)"""
+    global _search_pool
+    with _search_pool_lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(max_workers=SEARCH_THREADS, thread_name_prefix="faiss-shard")
+        return _search_pool
+
+class ShardedIndex:
+    """
+    Indeks FAISS yang dipecah menjadi shard berukuran tetap (maksimal shard_size vektor).
+
+    Label tetap berurutan sesuai urutan penambahan seperti satu indeks biasa,
+    sehingga index_to_docstore_id langchain tetap berlaku: shard ke-i menyimpan
+    label [offset_i, offset_i + ntotal_i) dan hanya shard terakhir yang bertambah.
+    Setiap query dicari di semua shard secara paralel (FAISS melepas GIL saat
+    search) lalu top-k digabung. Shard baru adalah salinan template yang sudah
+    di-training, jadi korpus yang terus bertambah tidak perlu training ulang.
+    """
+
+    def __init__(self, template, shard_size=SHARD_SIZE, shard_params=None):
+        import faiss
+
+        self.template = template
+        self.shard_size = shard_size
+        self.shard_params = shard_params or describe_index(template)
+        self.shards = []
+        self.d = template.d
+        self.metric_type = template.metric_type
+        self.is_trained = True
+        self._descending = template.metric_type == faiss.METRIC_INNER_PRODUCT
+
+    @property
+    def ntotal(self):
+        return sum(shard.ntotal for shard in self.shards)
+
+    def _offsets(self):
+        offsets, total = [], 0
+        for shard in self.shards:
+            offsets.append(total)
+            total += shard.ntotal
+        return offsets
+
+    def add(self, x):
+        import faiss
+
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        start = 0
+        while start < len(x):
+            if not self.shards or self.shards[-1].ntotal >= self.shard_size:
+                self.shards.append(faiss.clone_index(self.template))
+            shard = self.shards[-1]
+            end = min(len(x), start + self.shard_size - shard.ntotal)
+            shard.add(x[start:end])
+            start = end
+
+    def search(self, x, k):
+        """Top-k dari semua shard (format hasil sama dengan index.search FAISS)"""
+        return _search_parts(zip(self._offsets(), self.shards), x, k, self._descending)
+
+    def _locate(self, key):
+        for offset, shard in zip(self._offsets(), self.shards):
+            if key < offset + shard.ntotal:
+                return shard, key - offset
+        raise IndexError(f"Label {key} di luar indeks ({self.ntotal} vektor)")
+
+    def reconstruct(self, key):
+        shard, local_key = self._locate(int(key))
+        _ensure_direct_map(shard)
+        return shard.reconstruct(int(local_key))
+
+    def reconstruct_n(self, i0, ni):
+        """Vektor berlabel [i0, i0 + ni); hanya shard yang mencakup rentang itu yang direkonstruksi"""
+        end = min(i0 + ni, self.ntotal)
+        parts = []
+        for offset, shard in zip(self._offsets(), self.shards):
+            start, stop = max(i0, offset), min(end, offset + shard.ntotal)
+            if start < stop:
+                _ensure_direct_map(shard)
+                parts.append(shard.reconstruct_n(start - offset, stop - start))
+        return np.vstack(parts) if parts else np.zeros((0, self.d), dtype=np.float32)
+
+    def reset(self):
+        self.shards = []
+
+    def remove_ids(self, ids):
+        """
+        Menghapus label dari shard pemiliknya; label sesudahnya bergeser turun
+        seperti IndexFlat.remove_ids sehingga label tetap berurutan
+
+        Returns:
+            Jumlah vektor yang dihapus
+        """
+        labels = np.unique(np.asarray(ids, dtype=np.int64))
+        removed = 0
+        for offset, shard in zip(self._offsets(), self.shards):
+            local = labels[(labels >= offset) & (labels < offset + shard.ntotal)] - offset
+            if len(local):
+                removed += remove_labels(shard, local)
+        self.shards = [shard for shard in self.shards if shard.ntotal] or self.shards[-1:]
+        return removed
+
+    def describe(self):
+        """Parameter indeks untuk file_info"""
+        shard_params = self.shard_params
+        return {"type": "sharded", "factory": f"{len(self.shards)}x[{shard_params.get('factory', shard_params['type'])}]",
+                "shards": len(self.shards), "shard_size": self.shard_size, "ntotal": self.ntotal,
+                "nprobe": shard_params.get("nprobe"), "shard_params": shard_params,
+                "bytes_per_vector": shard_params.get("bytes_per_vector")}
+
+class IndexUnion:
+    """
+    Tampilan read-only beberapa indeks FAISS (mis. indeks per file) sebagai satu indeks.
+
+    Indeks ke-i memegang label [offset_i, offset_i + ntotal_i); pencarian
+    dijalankan paralel di semua indeks lalu top-k digabung seperti ShardedIndex.
+    Indeks di dalamnya tidak disalin maupun diubah, sehingga indeks yang dipakai
+    bersama antar sesi (memory-mapped) tetap satu salinan.
+    """
+
+    def __init__(self, indexes):
+        import faiss
+
+        self.indexes = list(indexes)
+        self.offsets, total = [], 0
+        for index in self.indexes:
+            self.offsets.append(total)
+            total += index.ntotal
+        self.ntotal = total
+        self.d = self.indexes[0].d if self.indexes else 0
+        self._descending = bool(self.indexes) and self.indexes[0].metric_type == faiss.METRIC_INNER_PRODUCT
+
+    def search(self, x, k):
+        """Top-k dari semua indeks (format hasil sama dengan index.search FAISS)"""
+        return _search_parts(zip(self.offsets, self.indexes), x, k, self._descending)
+
+    def locate(self, label):
+        """Posisi indeks dan label lokal untuk label gabungan"""
+        position = bisect.bisect_right(self.offsets, int(label)) - 1
+        if position < 0 or label >= self.ntotal:
+            raise IndexError(f"Label {label} di luar indeks ({self.ntotal} vektor)")
+        return position, int(label) - self.offsets[position]
+
+def _search_parts(parts, x, k, descending=False):
+    """Mencari (offset, indeks) secara paralel lalu menggabungkan top-k dengan label offset + label lokal"""
+    x = np.ascontiguousarray(x, dtype=np.float32)
+    parts = [(offset, index) for offset, index in parts if index.ntotal]
+    if not parts:
+        missing = -np.inf if descending else np.inf
+        return np.full((len(x), k), missing, dtype=np.float32), np.full((len(x), k), -1, dtype=np.int64)
+
+    if len(parts) == 1:
+        results = [parts[0][1].search(x, k)]
+    else:
+        results = list(_get_search_pool().map(lambda item: item[1].search(x, k), parts))
+
+    distances = np.hstack([distance for distance, _ in results])
+    labels = np.hstack([np.where(label >= 0, label + offset, -1)
+                        for (offset, _), (_, label) in zip(parts, results)])
+    order = np.argsort(-distances if descending else distances, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(distances, order, axis=1), np.take_along_axis(labels, order, axis=1)
+
+def choose_index_params(n_vectors, dim, compression="float16", allow_shards=True):
+    """
+    Memilih tipe indeks FAISS dari jumlah vektor
+
+    Args:
+        n_vectors: Jumlah vektor di korpus
+        dim: Dimensi vektor
+        compression: Kompresi vektor untuk IVF ("float16", "int8", "none")
+        allow_shards: Izinkan ShardedIndex untuk korpus di atas SHARD_SIZE
+            (indeks yang disimpan ke disk harus berupa indeks FAISS biasa)
+
+    Returns:
+        Dict parameter indeks (type, factory, nlist, nprobe, ...)
+    """
+    if allow_shards and n_vectors > SHARD_SIZE:
+        # Tiap shard memakai tipe indeks untuk ukuran satu shard penuh
+        shard_params = choose_index_params(SHARD_SIZE, dim, compression, allow_shards=False)
+        shards = math.ceil(n_vectors / SHARD_SIZE)
+        return {"type": "sharded", "factory": f"{shards}x[{shard_params['factory']}]", "shards": shards,
+                "shard_size": SHARD_SIZE, "nprobe": shard_params.get("nprobe"), "shard_params": shard_params,
+                "bytes_per_vector": shard_params.get("bytes_per_vector")}
+
+    if n_vectors < FLAT_MAX_VECTORS:
+        return {"type": "flat", "factory": "Flat"}
+
+    nlist = int(min(65536, max(64, 4 * math.sqrt(n_vectors))))
+    nprobe = max(8, nlist // 32)
+
+    if n_vectors >= IVF_PQ_MIN_VECTORS:
+        # m sub-quantizer harus membagi dimensi; ~dim/16 byte per vektor
+        m = max(m for m in range(1, min(dim, 96) + 1) if dim % m == 0 and m <= max(8, dim // 16))
+        return {"type": "ivf_pq", "factory": f"IVF{nlist},PQ{m}x8", "nlist": nlist, "nprobe": nprobe,
+                "pq_m": m, "bytes_per_vector": m}
+
+    storage = {"float16": "SQfp16", "int8": "SQ8"}.get(compression, "Flat")
+    bytes_per_vector = {"SQfp16": dim * 2, "SQ8": dim, "Flat": dim * 4}[storage]
+    return {"type": "ivf", "factory": f"IVF{nlist},{storage}", "nlist": nlist, "nprobe": nprobe,
+            "storage": storage, "bytes_per_vector": bytes_per_vector}
+
+def describe_index(index):
+    """Parameter indeks FAISS yang sedang dipakai (untuk file_info)"""
+    import faiss
+
+    if isinstance(index, ShardedIndex):
+        return index.describe()
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except Exception:
+        return {"type": "flat", "factory": "Flat", "ntotal": index.ntotal}
+    index_type = "ivf_pq" if "PQ" in type(faiss.downcast_index(ivf)).__name__ else "ivf"
+    return {"type": index_type, "nlist": ivf.nlist, "nprobe": ivf.nprobe, "ntotal": index.ntotal,
+            "bytes_per_vector": ivf.code_size}
+
+def _ensure_direct_map(index):
+    """Indeks IVF membutuhkan direct map untuk reconstruct"""
+    import faiss
+
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        if ivf.direct_map.no():
+            ivf.make_direct_map()
+    except Exception:
+        pass
+
+def stores_exact_vectors(index):
+    """Cek apakah indeks menyimpan vektor float32 utuh (Flat/IVF-Flat), bukan hasil kuantisasi"""
+    import faiss
+
+    if isinstance(index, ShardedIndex):
+        return stores_exact_vectors(index.template)
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except Exception:
+        return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+    return ivf.code_size == ivf.d * 4
+
+def remove_labels(index, labels):
+    """
+    Menghapus vektor berlabel tertentu; label sisanya bergeser turun seperti
+    IndexFlat.remove_ids, sesuai asumsi index_to_docstore_id langchain
+
+    Pada indeks IVF, remove_ids tidak menggeser label, jadi ID yang tersimpan
+    di inverted list dinomori ulang di tempat. Kode vektor (SQ/PQ) tidak
+    didekode maupun dikuantisasi ulang, sehingga penghapusan tidak menurunkan recall.
+
+    Returns:
+        Jumlah vektor yang dihapus
+    """
+    import faiss
+
+    labels = np.unique(np.asarray(labels, dtype=np.int64))
+    if not len(labels):
+        return 0
+    if isinstance(index, ShardedIndex):
+        return index.remove_ids(labels)
+    try:
+        ivf = faiss.extract_index_ivf(index)
+    except Exception:
+        return index.remove_ids(labels)
+
+    # Direct map (untuk reconstruct) tidak mendukung penghapusan; dibuat ulang saat dibutuhkan
+    ivf.make_direct_map(False)
+    removed = index.remove_ids(labels)
+    invlists = ivf.invlists
+    for list_no in range(ivf.nlist):
+        size = invlists.list_size(list_no)
+        if size:
+            ids = faiss.rev_swig_ptr(invlists.get_ids(list_no), size)
+            ids -= np.searchsorted(labels, ids)
+    return removed
+
+def reconstruct_all(index):
+    """Mengambil seluruh vektor dari indeks (urut sesuai label 0..ntotal-1)"""
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    _ensure_direct_map(index)
+    return index.reconstruct_n(0, index.ntotal)
+
+def _trained_empty_index(vectors, params, seed=42):
+    """Indeks FAISS kosong sesuai parameter, di-training pada sampel vektor jika perlu"""
+    import faiss
+
+    n, dim = vectors.shape
+    index = faiss.index_factory(dim, params["factory"], faiss.METRIC_L2)
+
+    if not index.is_trained:
+        sample_size = min(n, max(params.get("nlist", 1) * TRAINING_POINTS_PER_CENTROID, 50000), MAX_TRAINING_SAMPLE)
+        sample = vectors[np.random.default_rng(seed).choice(n, sample_size, replace=False)]
+        index.train(sample)
+        faiss.extract_index_ivf(index).nprobe = params.get("nprobe", 1)
+    return index
+
+def build_faiss_index(vectors, params, seed=42):
+    """
+    Membangun indeks FAISS sesuai parameter; training dilakukan pada sampel
+
+    Args:
+        vectors: Matriks float32 (n, dim)
+        params: Hasil choose_index_params
+
+    Returns:
+        Indeks FAISS (atau ShardedIndex) yang sudah berisi semua vektor
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if params["type"] == "sharded":
+        index = ShardedIndex(_trained_empty_index(vectors, params["shard_params"], seed), params["shard_size"],
+                             params["shard_params"])
+    else:
+        index = _trained_empty_index(vectors, params, seed)
+    index.add(vectors)
+    return index
+
+def optimize_vectorstore_index(vectorstore, compression="float16", force=False, allow_shards=True, vectors=None):
+    """
+    Mengganti indeks vectorstore dengan tipe yang sesuai ukurannya
+
+    Indeks hanya dibangun ulang jika tipe yang dipilih berbeda dari yang dipakai
+    (transisi Flat -> IVF -> IVF-PQ -> shard), sehingga biayanya teramortisasi.
+    Indeks baru dibangun dari vektor float32 asli: yang diberikan lewat vectors,
+    atau yang diambil dari indeks lama jika indeks itu menyimpan vektor utuh.
+    Indeks terkuantisasi (SQ/PQ) tidak pernah dibangun ulang dari rekonstruksinya
+    sendiri; tanpa vektor asli indeks tersebut dipertahankan.
+
+    Args:
+        allow_shards: Lihat choose_index_params (False untuk indeks yang disimpan ke disk)
+        vectors: Vektor float32 asli urut label (opsional)
+
+    Returns:
+        Dict parameter indeks yang dipakai
+    """
+    index = vectorstore.index
+    params = choose_index_params(index.ntotal, index.d, compression, allow_shards=allow_shards)
+    if isinstance(index, ShardedIndex):
+        # Jumlah shard berubah seiring korpus bertambah
+        vectorstore.index_params = index.describe()
+    current = getattr(vectorstore, "index_params", None) or describe_index(index)
+
+    if not force and current.get("type") == params["type"]:
+        # nlist tidak disesuaikan untuk perubahan kecil ukuran korpus
+        vectorstore.index_params = current
+        return current
+
+    if vectors is None and not stores_exact_vectors(index):
+        logging.info(f"Indeks {current.get('type')} dipertahankan: vektor asli tidak tersedia untuk "
+                     f"membangun {params['factory']} tanpa kuantisasi ulang")
+        vectorstore.index_params = current
+        return current
+
+    logging.info(f"Membangun ulang indeks {index.ntotal} vektor sebagai {params['factory']}")
+    vectorstore.index = build_faiss_index(reconstruct_all(index) if vectors is None else vectors, params)
+    vectorstore.index_params = params
+    return params
+
+def delete_from_vectorstore(vectorstore, doc_ids):
+    """
+    Menghapus chunk dari vectorstore FAISS tanpa embedding ulang
+
+    Vektor dihapus dengan remove_labels (Flat, IVF, IVF-PQ, dan ShardedIndex):
+    biayanya sebanding dengan jumlah label yang tersimpan, tanpa training ulang
+    dan tanpa kuantisasi ulang vektor yang tersisa. Pemetaan IdArray tetap
+    berupa IdArray setelah penghapusan.
+    """
+    from utils.chunk_store import IdArray
+
+    index_to_docstore_id = vectorstore.index_to_docstore_id
+    doc_ids = set(doc_ids)
+    index = vectorstore.index
+    if isinstance(index_to_docstore_id, IdArray):
+        keep = ~index_to_docstore_id.mask_of(doc_ids)
+    else:
+        keep = np.fromiter((index_to_docstore_id[label] not in doc_ids for label in range(index.ntotal)),
+                           dtype=bool, count=index.ntotal)
+
+    remove_labels(index, np.flatnonzero(~keep))
+
+    if isinstance(index_to_docstore_id, IdArray):
+        index_to_docstore_id.compact(keep)
+    else:
+        vectorstore.index_to_docstore_id = dict(enumerate(
+            index_to_docstore_id[label] for label in np.flatnonzero(keep).tolist()
+        ))
+    vectorstore.docstore.delete(list(doc_ids))
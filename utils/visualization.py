@@ -139,14 +139,50 @@ def create_visualization(df, column_names=None):
     except Exception as e:
         st.error(f"Error membuat visualisasi: {str(e)}")
 
+REVENUE_TERMS = ['revenue', 'sales', 'pendapatan', 'penjualan']
+EXPENSE_TERMS = ['cost', 'expense', 'biaya', 'beban']
+PROFIT_TERMS = ['profit', 'laba', 'rugi', 'income']
+
+def _matching_cols(columns, terms):
+    return [col for col in columns if any(term in str(col).lower() for term in terms)]
+
+def compute_financial_summary(df, financial_cols):
+    """
+    Menghitung total dan rasio keuangan langsung dari DataFrame (tanpa LLM)
+    
+    Args:
+        df: DataFrame data keuangan (satu baris per periode)
+        financial_cols: Kolom keuangan yang dihitung
+        
+    Returns:
+        Dict dengan "totals" (total per kolom), "latest" (nilai periode terakhir),
+        dan "ratios" (margin laba dan rasio biaya terhadap pendapatan, dalam persen)
+    """
+    numeric_cols = [col for col in financial_cols if pd.api.types.is_numeric_dtype(df[col])]
+    totals = {col: float(df[col].sum()) for col in numeric_cols}
+    latest = {col: float(df[col].dropna().iloc[-1]) for col in numeric_cols if df[col].notna().any()}
+    
+    ratios = {}
+    revenue_cols = [col for col in _matching_cols(numeric_cols, REVENUE_TERMS) if latest.get(col)]
+    if revenue_cols:
+        revenue_col = revenue_cols[0]
+        revenue = latest[revenue_col]
+        for col in _matching_cols(numeric_cols, PROFIT_TERMS):
+            if col in latest and col not in revenue_cols:
+                ratios[f"Margin {col}"] = latest[col] / revenue * 100
+        for col in _matching_cols(numeric_cols, EXPENSE_TERMS):
+            if col in latest and col not in revenue_cols:
+                # Biaya di laporan keuangan sering ditulis negatif "(750.000)"
+                ratios[f"{col} / {revenue_col}"] = abs(latest[col]) / revenue * 100
+    return {"totals": totals, "latest": latest, "ratios": ratios}
+
 def visualize_financial_data(df):
     """Visualisasi khusus untuk data keuangan"""
     # Deteksi kolom keuangan
-    financial_cols = [col for col in df.columns if any(term in col.lower() 
-                     for term in ['revenue', 'profit', 'sales', 'cost', 'expense', 
-                                 'pendapatan', 'biaya', 'penjualan', 'laba', 'rugi'])]
+    financial_cols = _matching_cols(df.columns, REVENUE_TERMS + EXPENSE_TERMS + PROFIT_TERMS)
     
-    date_cols = [col for col in df.columns if df[col].dtype == 'datetime64[ns]' or 'date' in col.lower() or 'tanggal' in col.lower()]
+    date_cols = [col for col in df.columns if df[col].dtype == 'datetime64[ns]' or any(term in str(col).lower() 
+                 for term in ['date', 'tanggal', 'periode', 'period', 'tahun', 'year'])]
     
     if not financial_cols:
         st.warning("Tidak dapat mendeteksi kolom keuangan dalam data.")
@@ -154,6 +190,19 @@ def visualize_financial_data(df):
     
     st.subheader("📊 Analisis Keuangan")
     
+    # Total dan rasio dihitung langsung dari data, bukan ditebak oleh LLM
+    summary = compute_financial_summary(df, financial_cols)
+    if summary["totals"]:
+        st.write("Total per kolom:")
+        total_cols = st.columns(min(len(summary["totals"]), 4))
+        for i, (col, total) in enumerate(summary["totals"].items()):
+            total_cols[i % len(total_cols)].metric(f"Total {col}", f"{total:,.2f}")
+    if summary["ratios"]:
+        st.write("Rasio periode terakhir:")
+        ratio_cols = st.columns(min(len(summary["ratios"]), 4))
+        for i, (name, value) in enumerate(summary["ratios"].items()):
+            ratio_cols[i % len(ratio_cols)].metric(name, f"{value:.2f}%")
+    
     # Grafik tren keuangan
     if date_cols:
         date_col = st.selectbox("Pilih kolom tanggal:", date_cols)
@@ -189,11 +238,9 @@ def visualize_financial_data(df):
     st.subheader("Proporsi Komponen Keuangan")
     
     # Pilih metrik pendapatan dan biaya
-    revenue_cols = [col for col in financial_cols if any(term in col.lower() 
-                   for term in ['revenue', 'sales', 'pendapatan', 'penjualan'])]
+    revenue_cols = _matching_cols(financial_cols, REVENUE_TERMS)
     
-    expense_cols = [col for col in financial_cols if any(term in col.lower() 
-                   for term in ['cost', 'expense', 'biaya'])]
+    expense_cols = _matching_cols(financial_cols, EXPENSE_TERMS)
     
     if revenue_cols and expense_cols:
         # Grafik waterfall
@@ -211,7 +258,7 @@ def visualize_financial_data(df):
                 measure = ["relative"] * len(exp_cols) + ["total"]
                 x = exp_cols + ["Profit"]
                 
-                y = [latest_data[col] * -1 for col in exp_cols]  # Biaya sebagai nilai negatif
+                y = [-abs(latest_data[col]) for col in exp_cols]  # Biaya sebagai nilai negatif
                 y.append(latest_data[rev_col] + sum(y))  # Profit = Revenue - Total Expense
                 
                 # Buat waterfall chart